@@ -0,0 +1,64 @@
+"""
+批量入库命令行工具：加载、分块、嵌入并索引多个PDF或整个目录，结束时打印每个文件的吞吐量报告。
+
+在 backend 目录下运行，例如:
+    python bulk_ingest.py reports/ --loading-method pymupdf --provider openai --model text-embedding-3-small \
+        --vector-db milvus --index-mode flat --chunking-method by_paragraphs
+"""
+import argparse
+import json
+import logging
+from services.bulk_ingestion_service import BulkIngestionService
+from services.embedding_service import EmbeddingConfig
+from services.vector_store_service import VectorDBConfig
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingest PDFs into a single vector collection")
+    parser.add_argument("paths", nargs="+", help="PDF files or directories")
+    parser.add_argument("--loading-method", required=True)
+    parser.add_argument("--provider", required=True, help="embedding provider")
+    parser.add_argument("--model", required=True, help="embedding model")
+    parser.add_argument("--vector-db", default="milvus")
+    parser.add_argument("--index-mode", default="flat")
+    parser.add_argument("--chunking-method", default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--strategy", default=None)
+    parser.add_argument("--chunking-strategy", default=None)
+    parser.add_argument("--collection-prefix", default="bulk")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--insert-batch-size", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = BulkIngestionService()
+    file_paths = service.collect_pdfs(args.paths)
+    result = service.ingest(
+        file_paths,
+        args.loading_method,
+        EmbeddingConfig(provider=args.provider, model_name=args.model),
+        VectorDBConfig(provider=args.vector_db, index_mode=args.index_mode),
+        chunking_method=args.chunking_method,
+        chunk_size=args.chunk_size,
+        strategy=args.strategy,
+        chunking_strategy=args.chunking_strategy,
+        collection_prefix=args.collection_prefix,
+        max_workers=args.max_workers,
+        batch_size=args.batch_size,
+        insert_batch_size=args.insert_batch_size,
+        progress_callback=lambda done, total, **counters: print(f"[{done}/{total}] {counters}")
+    )
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(BulkIngestionService.format_report(result["files"]))
+        print(
+            f"\ncollection: {result['collection_name']}  files: {result['total_files']} "
+            f"(failed {result['failed_files']})  vectors: {result['total_vectors']}  "
+            f"time: {result['processing_time']:.2f}s  ({result['vectors_per_second']:.2f} vectors/s)"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,32 @@
 import os
+import asyncio
 import json
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Body, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from services.loading_service import LoadingService
+from fastapi.responses import JSONResponse, StreamingResponse
+from services.loading_service import LoadingService, page_to_chunk
 from services.chunking_service import ChunkingService
-from services.embedding_service import EmbeddingService, EmbeddingConfig
+from services.embedding_service import EmbeddingService, EmbeddingConfig, EmbeddingFactory
+from services.embedding_store import is_embedding_file, read_embedding_header, load_embedding_file, iter_embeddings, document_files
 from services.vector_store_service import VectorStoreService, VectorDBConfig
 from services.search_service import SearchService
 from services.parsing_service import ParsingService
+from services.pipeline_service import IngestionPipeline
+from services.bulk_ingestion_service import BulkIngestionService
+from services.loading_cache import LoadingCache
+from services.embedding_cache import EmbeddingCache
+from services.loading_executor import loading_executor, LoadingExecutor, ExecutorSaturatedError
+from services.job_service import job_service, JobContext
+from services.milvus_connection import milvus_connections
+from services.collection_cache import collection_cache
+from services.lexical_index import lexical_indexes
+from services.model_registry import embedding_model_registry
+from utils.upload import save_upload_file
 import logging
 from enum import Enum
-from utils.config import VectorDBProvider
+from utils.config import VectorDBProvider, BULK_INGEST_CONFIG
 import pandas as pd
 from pathlib import Path
 from services.generation_service import GenerationService
@@ -22,7 +37,22 @@ from services.evaluation_service import EvaluationService
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时预先建立Milvus连接并预加载嵌入模型，关闭时断开连接池并停止后台线程池"""
+    try:
+        milvus_connections.acquire()
+    except Exception as e:
+        # 连接失败不阻止启动，首次请求时会重新尝试连接
+        logger.error(f"Error connecting to Milvus on startup: {str(e)}")
+    # 预加载失败只记录错误，首次使用时会再次加载
+    EmbeddingFactory.preload()
+    yield
+    job_service.shutdown()
+    loading_executor.shutdown()
+    milvus_connections.close_all()
+
+app = FastAPI(lifespan=lifespan)
 
 # 确保必要的目录存在
 os.makedirs("temp", exist_ok=True)
@@ -39,6 +69,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    """加载/解析任务的并发槽位和队列已满时返回429及排队信息"""
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+        content={
+            "detail": str(exc),
+            "method": exc.key,
+            "limit": exc.limit,
+            "queue_position": exc.queue_position,
+            "retry_after": exc.retry_after
+        }
+    )
+
+def _process_document(temp_path: str, file_hash: str, loading_method: str, chunking_option: str, chunk_size: int, metadata: dict) -> dict:
+    """在执行器线程中加载并分块文档"""
+    loading_service = LoadingService()
+    raw_text = loading_service.load_pdf(temp_path, loading_method, file_hash=file_hash)
+    metadata["total_pages"] = loading_service.get_total_pages()
+    
+    page_map = loading_service.get_page_map()
+    
+    chunking_service = ChunkingService()
+    return chunking_service.chunk_text(
+        raw_text, 
+        chunking_option, 
+        metadata,
+        page_map=page_map,
+        chunk_size=chunk_size
+    )
+
 @app.post("/process")
 async def process_file(
     file: UploadFile = File(...),
@@ -46,44 +108,41 @@ async def process_file(
     chunking_option: str = Form(...),
     chunk_size: int = Form(1000)
 ):
+    temp_path = None
     try:
-        # 保存上传的文件
-        temp_path = os.path.join("temp", file.filename)
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # 分块流式保存上传的文件，同时计算内容哈希
+        upload = await save_upload_file(file)
+        temp_path = upload["path"]
         
         # 准备元数据
         metadata = {
             "filename": file.filename,
             "loading_method": loading_method,
-            "original_file_size": len(content),
+            "original_file_size": upload["size"],
             "processing_date": datetime.now().isoformat(),
             "chunking_method": chunking_option,
         }
         
-        loading_service = LoadingService()
-        raw_text = loading_service.load_pdf(temp_path, loading_method)
-        metadata["total_pages"] = loading_service.get_total_pages()
-        
-        page_map = loading_service.get_page_map()
-        
-        chunking_service = ChunkingService()
-        chunks = chunking_service.chunk_text(
-            raw_text, 
-            chunking_option, 
-            metadata,
-            page_map=page_map,
-            chunk_size=chunk_size
+        # 加载和分块是CPU密集操作，放到有界执行器中运行，避免阻塞事件循环
+        chunks = await loading_executor.run(
+            LoadingExecutor.limit_key(loading_method),
+            _process_document,
+            temp_path,
+            upload["sha256"],
+            loading_method,
+            chunking_option,
+            chunk_size,
+            metadata
         )
         
-        # 清理临时文件
-        os.remove(temp_path)
-        
         return {"chunks": chunks}
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         raise
+    finally:
+        # 清理临时文件
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
 
 @app.post("/save")
 async def save_chunks(data: dict):
@@ -140,6 +199,47 @@ async def list_documents():
         logger.error(f"Error listing documents: {str(e)}")
         raise
 
+def _embed_document(doc_id: str, provider: str, model: str, progress_callback=None) -> tuple:
+    """为已加载或已分块的文档创建嵌入并保存，返回 (保存路径, 嵌入结果, 吞吐量统计)"""
+    # 直接使用完整文件名查找
+    loaded_path = os.path.join("01-loaded-docs", doc_id)
+    chunked_path = os.path.join("01-chunked-docs", doc_id)
+    
+    doc_path = None
+    if os.path.exists(loaded_path):
+        doc_path = loaded_path
+    elif os.path.exists(chunked_path):
+        doc_path = chunked_path
+        
+    if not doc_path:
+        raise FileNotFoundError(f"Document not found: {doc_id}")
+        
+    with open(doc_path, 'r', encoding='utf-8') as f:
+        doc_data = json.load(f)
+    
+    # 创建 EmbeddingConfig 和 EmbeddingService
+    config = EmbeddingConfig(provider=provider, model_name=model)
+    embedding_service = EmbeddingService()
+    
+    # 准备输入数据
+    input_data = {
+        "chunks": doc_data["chunks"],
+        "metadata": {
+            "filename": doc_data["filename"],
+            "total_chunks": doc_data["total_chunks"],
+            "total_pages": doc_data["total_pages"],
+            "loading_method": doc_data["loading_method"],
+            "chunking_method": doc_data["chunking_method"]
+        }
+    }
+    
+    # 创建嵌入
+    embeddings, stats = embedding_service.create_embeddings(input_data, config, progress_callback=progress_callback)
+    
+    # 保存嵌入结果
+    output_path = embedding_service.save_embeddings(doc_id, embeddings)
+    return output_path, embeddings, stats
+
 @app.post("/embed")
 async def embed_document(data: dict = Body(...)):
     try:
@@ -149,49 +249,15 @@ async def embed_document(data: dict = Body(...)):
         
         if not all([doc_id, provider, model]):
             raise HTTPException(status_code=400, detail="Missing required parameters")
-            
-        # 直接使用完整文件名查找
-        loaded_path = os.path.join("01-loaded-docs", doc_id)
-        chunked_path = os.path.join("01-chunked-docs", doc_id)
-        
-        doc_path = None
-        if os.path.exists(loaded_path):
-            doc_path = loaded_path
-        elif os.path.exists(chunked_path):
-            doc_path = chunked_path
-            
-        if not doc_path:
-            raise HTTPException(status_code=404, detail=f"Document not found: {doc_id}")
-            
-        with open(doc_path, 'r', encoding='utf-8') as f:
-            doc_data = json.load(f)
-        
-        # 创建 EmbeddingConfig 和 EmbeddingService
-        config = EmbeddingConfig(provider=provider, model_name=model)
-        embedding_service = EmbeddingService()
-        
-        # 准备输入数据
-        input_data = {
-            "chunks": doc_data["chunks"],
-            "metadata": {
-                "filename": doc_data["filename"],
-                "total_chunks": doc_data["total_chunks"],
-                "total_pages": doc_data["total_pages"],
-                "loading_method": doc_data["loading_method"],
-                "chunking_method": doc_data["chunking_method"]
-            }
-        }
         
-        # 创建嵌入 - 只接收两个返回值
-        embeddings, _ = embedding_service.create_embeddings(input_data, config)
-        
-        # 保存嵌入结果
-        output_path = embedding_service.save_embeddings(doc_id, embeddings)
+        output_path, embeddings, stats = _embed_document(doc_id, provider, model)
         
         return {
             "status": "success",
             "message": "Embeddings created successfully",
             "filepath": output_path,
+            "embedding_time": stats["embedding_time"],
+            "chunks_per_second": stats["chunks_per_second"],
             "embeddings": embeddings  # 添加embeddings到响应中
         }
         
@@ -212,25 +278,26 @@ async def list_embedded_docs():
             return {"documents": []}
             
         for filename in os.listdir(embedded_dir):
-            if filename.endswith('.json'):
+            # JSON 文件或二进制格式的 .npy 向量文件（元数据在同名 .meta.jsonl 中）
+            if is_embedding_file(filename):
                 file_path = os.path.join(embedded_dir, filename)
                 logger.info(f"Reading file: {file_path}")
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        # 使用实际的文件名，而不是文档名
-                        doc_info = {
-                            "name": filename,  # 保持原始文件名
-                            "metadata": {
-                                "document_name": data.get("document_name", filename),
-                                "embedding_model": data.get("embedding_model", ""),
-                                "embedding_provider": data.get("embedding_provider", ""),
-                                "embedding_timestamp": data.get("created_at", ""),
-                                "vector_dimension": data.get("vector_dimension", 0)
-                            }
+                    data = read_embedding_header(file_path)
+                    # 使用实际的文件名，而不是文档名
+                    doc_info = {
+                        "name": filename,  # 保持原始文件名
+                        "metadata": {
+                            "document_name": data.get("document_name", filename),
+                            "embedding_model": data.get("embedding_model", ""),
+                            "embedding_provider": data.get("embedding_provider", ""),
+                            "embedding_timestamp": data.get("created_at", ""),
+                            "vector_dimension": data.get("vector_dimension", 0),
+                            "format": data.get("format", "json")
                         }
-                        logger.info(f"Added document info: {doc_info}")
-                        documents.append(doc_info)
+                    }
+                    logger.info(f"Added document info: {doc_info}")
+                    documents.append(doc_info)
                 except Exception as e:
                     logger.error(f"Error reading file {file_path}: {str(e)}")
                     
@@ -240,23 +307,31 @@ async def list_embedded_docs():
         logger.error(f"Error listing embedded documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _index_document(file_id: str, vector_db: str, index_mode: str, progress_callback=None, collection_name: str = None) -> dict:
+    """将 02-embedded-docs 中的嵌入文件索引到向量数据库；指定 collection_name 时增量写入已有collection"""
+    embedding_file = os.path.join("02-embedded-docs", file_id)
+    if not os.path.exists(embedding_file):
+        raise FileNotFoundError(f"Embedding file not found: {file_id}")
+        
+    config = VectorDBConfig(provider=vector_db, index_mode=index_mode)
+    vector_store_service = VectorStoreService()
+    return vector_store_service.index_embeddings(
+        embedding_file, config, progress_callback=progress_callback, collection_name=collection_name
+    )
+
 @app.post("/index")
 async def index_embeddings(data: dict):
     try:
         file_id = data.get("fileId")
         vector_db = data.get("vectorDb")
         index_mode = data.get("indexMode")
+        # 可选：指定已有collection时以 upsert 方式增量写入
+        collection_name = data.get("collectionName")
         
         if not all([file_id, vector_db, index_mode]):
             raise ValueError("Missing required fields")
-            
-        embedding_file = os.path.join("02-embedded-docs", file_id)
-        if not os.path.exists(embedding_file):
-            raise FileNotFoundError(f"Embedding file not found: {file_id}")
-            
-        config = VectorDBConfig(provider=vector_db, index_mode=index_mode)
-        vector_store_service = VectorStoreService()
-        result = vector_store_service.index_embeddings(embedding_file, config)
+        
+        result = _index_document(file_id, vector_db, index_mode, collection_name=collection_name)
         
         return result
     except Exception as e:
@@ -302,9 +377,10 @@ async def search(
     collection_id: str = Body(...),
     top_k: int = Body(3),
     threshold: float = Body(0.7),
-    word_count_threshold: int = Body(100)
+    word_count_threshold: int = Body(100),
+    mode: str = Body("dense")
 ):
-    """执行向量搜索"""
+    """执行向量搜索；mode=hybrid 时融合向量检索与 BM25 词法检索的结果"""
     try:
         # Log the incoming search request details
         logger.info(f"Search request - Query: {query}, Collection: {collection_id}, Top K: {top_k}, Threshold: {threshold}, Word Count Threshold: {word_count_threshold}")
@@ -319,7 +395,8 @@ async def search(
             collection_id=collection_id,
             top_k=top_k,
             threshold=threshold,
-            word_count_threshold=word_count_threshold
+            word_count_threshold=word_count_threshold,
+            mode=mode
         )
         
         # Log the search results
@@ -333,6 +410,37 @@ async def search(
             detail=str(e)
         )
 
+@app.post("/search/batch")
+async def search_batch(
+    queries: List[str] = Body(...),
+    collection_id: str = Body(...),
+    top_k: int = Body(3),
+    threshold: float = Body(0.7),
+    word_count_threshold: int = Body(100),
+    mode: str = Body("dense")
+):
+    """批量执行向量搜索：查询一次批量嵌入，并以多向量请求提交检索"""
+    try:
+        logger.info(f"Batch search request - Queries: {len(queries)}, Collection: {collection_id}, Top K: {top_k}, Threshold: {threshold}, Word Count Threshold: {word_count_threshold}")
+        search_service = SearchService()
+        # 批量嵌入和检索是同步调用，放到线程中执行，避免大批量查询阻塞事件循环
+        results = await asyncio.to_thread(
+            search_service.search_batch,
+            queries=queries,
+            collection_id=collection_id,
+            top_k=top_k,
+            threshold=threshold,
+            word_count_threshold=word_count_threshold,
+            mode=mode
+        )
+        return {"results": results}
+    except Exception as e:
+        logger.error(f"Error performing batch search: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+
 @app.get("/collections/{provider}")
 async def get_provider_collections(provider: str):
     """Get collections for a specific vector database provider"""
@@ -499,31 +607,39 @@ async def get_embedded_doc(doc_name: str):
                 detail=f"Document {doc_name} not found"
             )
             
-        with open(file_path, 'r', encoding='utf-8') as f:
-            doc_data = json.load(f)
-            logger.info(f"Successfully read document: {doc_name}")
-            
-            return {
-                "embeddings": [
-                    {
-                        "embedding": embedding["embedding"],
-                        "metadata": {
-                            "document_name": doc_data.get("document_name", doc_name),
-                            "chunk_id": idx + 1,
-                            "total_chunks": len(doc_data["embeddings"]),
-                            "content": embedding["metadata"].get("content", ""),
-                            "page_number": embedding["metadata"].get("page_number", ""),
-                            "page_range": embedding["metadata"].get("page_range", ""),
-                            # "chunking_method": embedding["metadata"].get("chunking_method", ""),
-                            "embedding_model": doc_data.get("embedding_model", ""),
-                            "embedding_provider": doc_data.get("embedding_provider", ""),
-                            "embedding_timestamp": doc_data.get("created_at", ""),
-                            "vector_dimension": doc_data.get("vector_dimension", 0)
-                        }
+        if file_path.endswith(".npy"):
+            # 二进制格式：还原为与JSON相同的结构，向量从内存映射的矩阵逐行转换
+            doc_data = load_embedding_file(file_path)
+            doc_data["embeddings"] = [
+                {"embedding": embedding["embedding"].tolist(), "metadata": embedding["metadata"]}
+                for embedding in iter_embeddings(doc_data)
+            ]
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                doc_data = json.load(f)
+        logger.info(f"Successfully read document: {doc_name}")
+        
+        return {
+            "embeddings": [
+                {
+                    "embedding": embedding["embedding"],
+                    "metadata": {
+                        "document_name": doc_data.get("document_name", doc_name),
+                        "chunk_id": idx + 1,
+                        "total_chunks": len(doc_data["embeddings"]),
+                        "content": embedding["metadata"].get("content", ""),
+                        "page_number": embedding["metadata"].get("page_number", ""),
+                        "page_range": embedding["metadata"].get("page_range", ""),
+                        # "chunking_method": embedding["metadata"].get("chunking_method", ""),
+                        "embedding_model": doc_data.get("embedding_model", ""),
+                        "embedding_provider": doc_data.get("embedding_provider", ""),
+                        "embedding_timestamp": doc_data.get("created_at", ""),
+                        "vector_dimension": doc_data.get("vector_dimension", 0)
                     }
-                    for idx, embedding in enumerate(doc_data["embeddings"])
-                ]
-            }
+                }
+                for idx, embedding in enumerate(doc_data["embeddings"])
+            ]
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -541,55 +657,116 @@ async def delete_embedded_doc(doc_name: str):
                 detail=f"Document {doc_name} not found"
             )
             
-        os.remove(file_path)
+        for path in document_files(file_path):
+            if os.path.exists(path):
+                os.remove(path)
         return {"message": f"Document {doc_name} deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting embedded document {doc_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _parse_document(temp_path: str, file_hash: str, loading_method: str, parsing_option: str, metadata: dict) -> dict:
+    """在执行器线程中加载并解析文档"""
+    loading_service = LoadingService()
+    raw_text = loading_service.load_pdf(temp_path, loading_method, file_hash=file_hash)
+    metadata["total_pages"] = loading_service.get_total_pages()
+    
+    page_map = loading_service.get_page_map()
+    
+    parsing_service = ParsingService()
+    return parsing_service.parse_pdf(
+        raw_text, 
+        parsing_option, 
+        metadata,
+        page_map=page_map
+    )
+
 @app.post("/parse")
 async def parse_file(
     file: UploadFile = File(...),
     loading_method: str = Form(...),
     parsing_option: str = Form(...)
 ):
+    temp_path = None
     try:
-        # Save uploaded file
-        temp_path = os.path.join("temp", file.filename)
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Stream the upload to a unique temp file and hash it on the way
+        upload = await save_upload_file(file)
+        temp_path = upload["path"]
         
         # Prepare metadata
         metadata = {
             "filename": file.filename,
             "loading_method": loading_method,
-            "original_file_size": len(content),
+            "original_file_size": upload["size"],
             "processing_date": datetime.now().isoformat(),
             "parsing_method": parsing_option,
         }
         
-        loading_service = LoadingService()
-        raw_text = loading_service.load_pdf(temp_path, loading_method)
-        metadata["total_pages"] = loading_service.get_total_pages()
-        
-        page_map = loading_service.get_page_map()
-        
-        parsing_service = ParsingService()
-        parsed_content = parsing_service.parse_pdf(
-            raw_text, 
-            parsing_option, 
-            metadata,
-            page_map=page_map
+        # Run CPU-bound loading and parsing in the bounded executor
+        parsed_content = await loading_executor.run(
+            LoadingExecutor.limit_key(loading_method),
+            _parse_document,
+            temp_path,
+            upload["sha256"],
+            loading_method,
+            parsing_option,
+            metadata
         )
         
-        # Clean up temp file
-        os.remove(temp_path)
-        
         return {"parsed_content": parsed_content}
     except Exception as e:
         logger.error(f"Error parsing file: {str(e)}")
         raise
+    finally:
+        # Clean up temp file
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _load_document(temp_path: str, file_hash: str, filename: str, loading_method: str, strategy: str, chunking_strategy: str, chunking_options: dict, parallel: bool, metadata: dict, progress_callback=None) -> dict:
+    """在执行器线程或后台任务中加载文档并保存到 01-loaded-docs"""
+    # 使用 LoadingService 逐页加载文档，页面直接转换为chunks并流式写入文件，
+    # 不在内存中保留完整的 page_map 和拼接文本
+    loading_service = LoadingService()
+    pages = loading_service.iter_pages(
+        temp_path, 
+        loading_method, 
+        strategy=strategy,
+        chunking_strategy=chunking_strategy,
+        chunking_options=chunking_options,
+        parallel=parallel,
+        file_hash=file_hash
+    )
+    
+    def page_chunks():
+        # 转换成标准化的chunks格式，同时统计总页数（save_document 在生成器耗尽后读取）
+        for idx, page in enumerate(pages, 1):
+            metadata["total_pages"] = max(metadata["total_pages"], page["page"])
+            if progress_callback:
+                progress_callback(page["page"], loading_service.total_pages or None)
+            yield page_to_chunk(page, idx)
+    
+    # 使用 LoadingService 保存文档，传递strategy参数
+    filepath = loading_service.save_document(
+        filename=filename,
+        chunks=page_chunks(),
+        metadata=metadata,
+        loading_method=loading_method,
+        strategy=strategy,
+        chunking_strategy=chunking_strategy,
+    )
+    
+    # 读取保存的文档以返回
+    with open(filepath, "r", encoding="utf-8") as f:
+        document_data = json.load(f)
+    
+    response = {
+        "loaded_content": document_data,
+        "filepath": filepath,
+        "cache_hit": loading_service.cache_hit
+    }
+    if parallel:
+        response["page_timings"] = loading_service.get_page_timings()
+    return response
 
 @app.post("/load")
 async def load_file(
@@ -597,14 +774,14 @@ async def load_file(
     loading_method: str = Form(...),
     strategy: str = Form(None),
     chunking_strategy: str = Form(None),
-    chunking_options: str = Form(None)
+    chunking_options: str = Form(None),
+    parallel: bool = Form(False)
 ):
+    temp_path = None
     try:
-        # 保存上传的文件
-        temp_path = os.path.join("temp", file.filename)
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # 分块流式保存上传的文件，同时计算内容哈希
+        upload = await save_upload_file(file)
+        temp_path = upload["path"]
         
         # 准备元数据
         metadata = {
@@ -622,58 +799,496 @@ async def load_file(
         if chunking_options:
             chunking_options_dict = json.loads(chunking_options)
         
-        # 使用 LoadingService 加载文档
-        loading_service = LoadingService()
-        raw_text = loading_service.load_pdf(
-            temp_path, 
-            loading_method, 
-            strategy=strategy,
-            chunking_strategy=chunking_strategy,
-            chunking_options=chunking_options_dict
+        # 加载是CPU密集操作，放到有界执行器中运行；hi_res 等慢策略有更低的并发上限
+        return await loading_executor.run(
+            LoadingExecutor.limit_key(loading_method, strategy),
+            _load_document,
+            temp_path,
+            upload["sha256"],
+            file.filename,
+            loading_method,
+            strategy,
+            chunking_strategy,
+            chunking_options_dict,
+            parallel,
+            metadata
         )
+    except Exception as e:
+        logger.error(f"Error loading file: {str(e)}")
+        raise
+    finally:
+        # 清理临时文件
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _load_job(context: JobContext, temp_path: str, file_hash: str, filename: str, loading_method: str, strategy: str, chunking_strategy: str, chunking_options: dict, parallel: bool, metadata: dict) -> dict:
+    """后台加载任务，结果中只保留文档摘要，完整内容通过 /documents/{doc_name} 获取"""
+    try:
+        # 与 /load 共用加载执行器的并发上限，hi_res 等慢策略在线程中等待槽位
+        with loading_executor.slot(LoadingExecutor.limit_key(loading_method, strategy)):
+            context.set_stage("loading", unit="pages")
+            response = _load_document(
+                temp_path, file_hash, filename, loading_method, strategy, chunking_strategy,
+                chunking_options, parallel, metadata, progress_callback=context.progress_callback
+            )
+        document = response.pop("loaded_content")
+        response.update({
+            "document_name": os.path.basename(response["filepath"]),
+            "total_pages": document["total_pages"],
+            "total_chunks": document["total_chunks"]
+        })
+        return response
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _embed_job(context: JobContext, doc_id: str, provider: str, model: str) -> dict:
+    """后台嵌入任务，结果中不包含向量，完整内容通过 /embedded-docs/{doc_name} 获取"""
+    context.set_stage("embedding", unit="chunks")
+    output_path, embeddings, stats = _embed_document(doc_id, provider, model, progress_callback=context.progress_callback)
+    return {
+        "filepath": output_path,
+        "document_name": os.path.basename(output_path),
+        "total_chunks": len(embeddings),
+        "embedding_time": stats["embedding_time"],
+        "chunks_per_second": stats["chunks_per_second"]
+    }
+
+def _index_job(context: JobContext, file_id: str, vector_db: str, index_mode: str, collection_name: str = None) -> dict:
+    """后台索引任务"""
+    context.set_stage("indexing", unit="vectors")
+    return _index_document(
+        file_id, vector_db, index_mode, progress_callback=context.progress_callback, collection_name=collection_name
+    )
+
+@app.post("/jobs/load")
+async def submit_load_job(
+    file: UploadFile = File(...),
+    loading_method: str = Form(...),
+    strategy: str = Form(None),
+    chunking_strategy: str = Form(None),
+    chunking_options: str = Form(None),
+    parallel: bool = Form(False)
+):
+    """提交后台加载任务，立即返回任务ID"""
+    try:
+        # 分块流式保存上传的文件，临时文件由任务结束时清理
+        upload = await save_upload_file(file)
         
-        metadata["total_pages"] = loading_service.get_total_pages()
-        
-        page_map = loading_service.get_page_map()
+        metadata = {
+            "filename": file.filename,
+            "total_chunks": 0,
+            "total_pages": 0,
+            "loading_method": loading_method,
+            "loading_strategy": strategy,
+            "chunking_strategy": chunking_strategy,
+            "timestamp": datetime.now().isoformat()
+        }
+        chunking_options_dict = json.loads(chunking_options) if chunking_options else None
         
-        # 转换成标准化的chunks格式
-        chunks = []
-        for idx, page in enumerate(page_map, 1):
-            chunk_metadata = {
-                "chunk_id": idx,
-                "page_number": page["page"],
-                "page_range": str(page["page"]),
-                "word_count": len(page["text"].split())
-            }
-            if "metadata" in page:
-                chunk_metadata.update(page["metadata"])
-            
-            chunks.append({
-                "content": page["text"],
-                "metadata": chunk_metadata
-            })
-        
-        # 使用 LoadingService 保存文档，传递strategy参数
-        filepath = loading_service.save_document(
-            filename=file.filename,
-            chunks=chunks,
-            metadata=metadata,
-            loading_method=loading_method,
-            strategy=strategy,
-            chunking_strategy=chunking_strategy,
+        job_id = job_service.submit(
+            "load",
+            _load_job,
+            {
+                "filename": file.filename,
+                "loading_method": loading_method,
+                "strategy": strategy,
+                "chunking_strategy": chunking_strategy,
+                "chunking_options": chunking_options_dict,
+                "parallel": parallel
+            },
+            upload["path"], upload["sha256"], file.filename, loading_method, strategy, chunking_strategy,
+            chunking_options_dict, parallel, metadata,
+            cleanup_paths=[upload["path"]]
         )
-        
-        # 读取保存的文档以返回
-        with open(filepath, "r", encoding="utf-8") as f:
-            document_data = json.load(f)
-        
-        # 清理临时文件
-        os.remove(temp_path)
-        
-        return {"loaded_content": document_data, "filepath": filepath}
+        return {"job_id": job_id, "status": "queued"}
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error loading file: {str(e)}")
+        logger.error(f"Error submitting load job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/jobs/embed")
+async def submit_embed_job(data: dict = Body(...)):
+    """提交后台嵌入任务，参数与 /embed 相同"""
+    doc_id = data.get("documentId")
+    provider = data.get("provider")
+    model = data.get("model")
+    if not all([doc_id, provider, model]):
+        raise HTTPException(status_code=400, detail="Missing required parameters")
+    
+    job_id = job_service.submit(
+        "embed",
+        _embed_job,
+        {"documentId": doc_id, "provider": provider, "model": model},
+        doc_id, provider, model
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/index")
+async def submit_index_job(data: dict = Body(...)):
+    """提交后台索引任务，参数与 /index 相同"""
+    file_id = data.get("fileId")
+    vector_db = data.get("vectorDb")
+    index_mode = data.get("indexMode")
+    collection_name = data.get("collectionName")
+    if not all([file_id, vector_db, index_mode]):
+        raise HTTPException(status_code=400, detail="Missing required fields")
+    
+    job_id = job_service.submit(
+        "index",
+        _index_job,
+        {"fileId": file_id, "vectorDb": vector_db, "indexMode": index_mode, "collectionName": collection_name},
+        file_id, vector_db, index_mode, collection_name
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+def _run_pipeline(temp_path: str, file_hash: str, filename: str, options: dict, progress_callback=None) -> dict:
+    """在执行器线程或后台任务中执行 加载 → 分块 → 嵌入 → 索引 流水线"""
+    pipeline = IngestionPipeline()
+    return pipeline.run(
+        temp_path,
+        filename,
+        options["loading_method"],
+        EmbeddingConfig(provider=options["provider"], model_name=options["model"]),
+        VectorDBConfig(provider=options["vector_db"], index_mode=options["index_mode"]),
+        chunking_method=options.get("chunking_method"),
+        chunk_size=options.get("chunk_size") or 1000,
+        strategy=options.get("strategy"),
+        chunking_strategy=options.get("chunking_strategy"),
+        chunking_options=options.get("chunking_options"),
+        parallel=options.get("parallel", False),
+        file_hash=file_hash,
+        save_loaded=options.get("save_loaded", False),
+        save_chunked=options.get("save_chunked", False),
+        save_embedded=options.get("save_embedded", False),
+        progress_callback=progress_callback
+    )
+
+def _pipeline_job(context: JobContext, temp_path: str, file_hash: str, filename: str, options: dict) -> dict:
+    """后台流水线任务，进度以已索引向量数计，同时上报已加载页数和已分块数"""
+    try:
+        with loading_executor.slot(LoadingExecutor.limit_key(options["loading_method"], options.get("strategy"))):
+            context.set_stage("pipeline", unit="vectors")
+            return _run_pipeline(temp_path, file_hash, filename, options, progress_callback=context.progress_callback)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _pipeline_options(
+    loading_method: str, provider: str, model: str, vector_db: str, index_mode: str,
+    chunking_method: str, chunk_size: int, strategy: str, chunking_strategy: str, chunking_options: str,
+    parallel: bool, save_loaded: bool, save_chunked: bool, save_embedded: bool
+) -> dict:
+    """整理流水线表单参数"""
+    return {
+        "loading_method": loading_method,
+        "provider": provider,
+        "model": model,
+        "vector_db": vector_db,
+        "index_mode": index_mode,
+        "chunking_method": chunking_method or None,
+        "chunk_size": chunk_size,
+        "strategy": strategy,
+        "chunking_strategy": chunking_strategy,
+        "chunking_options": json.loads(chunking_options) if chunking_options else None,
+        "parallel": parallel,
+        "save_loaded": save_loaded,
+        "save_chunked": save_chunked,
+        "save_embedded": save_embedded
+    }
+
+@app.post("/pipeline")
+async def run_pipeline(
+    file: UploadFile = File(...),
+    loading_method: str = Form(...),
+    provider: str = Form(...),
+    model: str = Form(...),
+    vector_db: str = Form(...),
+    index_mode: str = Form(...),
+    chunking_method: str = Form(None),
+    chunk_size: int = Form(1000),
+    strategy: str = Form(None),
+    chunking_strategy: str = Form(None),
+    chunking_options: str = Form(None),
+    parallel: bool = Form(False),
+    save_loaded: bool = Form(False),
+    save_chunked: bool = Form(False),
+    save_embedded: bool = Form(False)
+):
+    """
+    一次请求完成 加载 → 分块 → 嵌入 → 索引，中间结果在内存中流式传递，
+    只有 save_loaded/save_chunked/save_embedded 为真时才写出对应的中间文件
+    """
+    temp_path = None
+    try:
+        upload = await save_upload_file(file)
+        temp_path = upload["path"]
+        options = _pipeline_options(
+            loading_method, provider, model, vector_db, index_mode, chunking_method, chunk_size,
+            strategy, chunking_strategy, chunking_options, parallel, save_loaded, save_chunked, save_embedded
+        )
+        # 流水线包含PDF解析，与 /load 共用加载执行器的并发上限
+        return await loading_executor.run(
+            LoadingExecutor.limit_key(loading_method, strategy),
+            _run_pipeline,
+            temp_path,
+            upload["sha256"],
+            file.filename,
+            options
+        )
+    except Exception as e:
+        logger.error(f"Error running pipeline: {str(e)}")
+        raise
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+@app.post("/jobs/pipeline")
+async def submit_pipeline_job(
+    file: UploadFile = File(...),
+    loading_method: str = Form(...),
+    provider: str = Form(...),
+    model: str = Form(...),
+    vector_db: str = Form(...),
+    index_mode: str = Form(...),
+    chunking_method: str = Form(None),
+    chunk_size: int = Form(1000),
+    strategy: str = Form(None),
+    chunking_strategy: str = Form(None),
+    chunking_options: str = Form(None),
+    parallel: bool = Form(False),
+    save_loaded: bool = Form(False),
+    save_chunked: bool = Form(False),
+    save_embedded: bool = Form(False)
+):
+    """提交后台流水线任务，参数与 /pipeline 相同"""
+    try:
+        upload = await save_upload_file(file)
+        options = _pipeline_options(
+            loading_method, provider, model, vector_db, index_mode, chunking_method, chunk_size,
+            strategy, chunking_strategy, chunking_options, parallel, save_loaded, save_chunked, save_embedded
+        )
+        job_id = job_service.submit(
+            "pipeline",
+            _pipeline_job,
+            dict(options, filename=file.filename),
+            upload["path"], upload["sha256"], file.filename, options,
+            cleanup_paths=[upload["path"]]
+        )
+        return {"job_id": job_id, "status": "queued"}
+    except HTTPException:
         raise
+    except Exception as e:
+        logger.error(f"Error submitting pipeline job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _bulk_ingest_job(context: JobContext, file_paths: List[str], filenames: List[str], temp_paths: List[str], options: dict) -> dict:
+    """后台批量入库任务，进度以已完成文件数计；上传的临时文件在任务结束时清理"""
+    try:
+        context.set_stage("bulk_ingest", unit="files", total=len(file_paths))
+        return BulkIngestionService().ingest(
+            file_paths,
+            options["loading_method"],
+            EmbeddingConfig(provider=options["provider"], model_name=options["model"]),
+            VectorDBConfig(provider=options["vector_db"], index_mode=options["index_mode"]),
+            chunking_method=options.get("chunking_method"),
+            chunk_size=options.get("chunk_size") or 1000,
+            strategy=options.get("strategy"),
+            chunking_strategy=options.get("chunking_strategy"),
+            chunking_options=options.get("chunking_options"),
+            filenames=filenames,
+            collection_prefix=options.get("collection_prefix") or "bulk",
+            progress_callback=context.progress_callback
+        )
+    finally:
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+def _bulk_ingest_directory(directory: str) -> str:
+    """将 directory 参数解析为真实路径，只允许位于 BULK_INGEST_ROOT 之内的目录"""
+    root = BULK_INGEST_CONFIG["root"]
+    if not root:
+        raise HTTPException(status_code=400, detail="Directory ingestion is disabled, set BULK_INGEST_ROOT to enable it")
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, resolved]) != root:
+        raise HTTPException(status_code=400, detail="Directory must be inside BULK_INGEST_ROOT")
+    if not os.path.isdir(resolved):
+        raise HTTPException(status_code=400, detail=f"Directory not found: {directory}")
+    return resolved
+
+@app.post("/jobs/bulk-ingest")
+async def submit_bulk_ingest_job(
+    files: List[UploadFile] = File(None),
+    directory: str = Form(None),
+    loading_method: str = Form(...),
+    provider: str = Form(...),
+    model: str = Form(...),
+    vector_db: str = Form(...),
+    index_mode: str = Form(...),
+    chunking_method: str = Form(None),
+    chunk_size: int = Form(1000),
+    strategy: str = Form(None),
+    chunking_strategy: str = Form(None),
+    chunking_options: str = Form(None),
+    collection_prefix: str = Form("bulk")
+):
+    """
+    提交批量入库任务：上传多个PDF，或指定 BULK_INGEST_ROOT 下的目录（相对路径或其中的绝对路径），全部写入同一个collection，
+    任务结果中包含每个文件的吞吐量报告
+    """
+    temp_paths = []
+    try:
+        file_paths, filenames = [], []
+        for file in files or []:
+            upload = await save_upload_file(file)
+            temp_paths.append(upload["path"])
+            file_paths.append(upload["path"])
+            filenames.append(file.filename)
+        if directory:
+            directory_files = BulkIngestionService.collect_pdfs([_bulk_ingest_directory(directory)])
+            file_paths.extend(directory_files)
+            filenames.extend(os.path.basename(path) for path in directory_files)
+        if not file_paths:
+            raise HTTPException(status_code=400, detail="No PDF files to ingest")
+        
+        options = {
+            "loading_method": loading_method,
+            "provider": provider,
+            "model": model,
+            "vector_db": vector_db,
+            "index_mode": index_mode,
+            "chunking_method": chunking_method or None,
+            "chunk_size": chunk_size,
+            "strategy": strategy,
+            "chunking_strategy": chunking_strategy,
+            "chunking_options": json.loads(chunking_options) if chunking_options else None,
+            "collection_prefix": collection_prefix
+        }
+        job_id = job_service.submit(
+            "bulk_ingest",
+            _bulk_ingest_job,
+            dict(options, filenames=filenames, directory=directory),
+            file_paths, filenames, temp_paths, options,
+            cleanup_paths=temp_paths
+        )
+        return {"job_id": job_id, "status": "queued", "total_files": len(file_paths)}
+    except Exception as e:
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Error submitting bulk ingest job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/jobs")
+async def list_jobs(type: Optional[str] = Query(None), limit: int = Query(50)):
+    """列出后台任务"""
+    return {"jobs": job_service.list(job_type=type, limit=limit)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """获取后台任务的阶段、进度、吞吐量和预计剩余时间"""
+    job = job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """取消排队中或运行中的后台任务"""
+    job = job_service.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get("/loading-queue")
+async def get_loading_queue():
+    """获取各加载方法的并发和排队情况"""
+    return {"queues": loading_executor.stats()}
+
+@app.get("/milvus/connections")
+async def get_milvus_connections():
+    """获取Milvus连接池中各连接的状态和健康检查统计"""
+    return milvus_connections.stats()
+
+@app.get("/embedding-models")
+async def get_embedding_models():
+    """获取常驻嵌入模型的内存占用、加载耗时和命中统计"""
+    return embedding_model_registry.stats()
+
+@app.post("/embedding-models/preload")
+async def preload_embedding_model(provider: str = Body(...), model: str = Body(...)):
+    """预先加载指定的嵌入模型"""
+    return await asyncio.to_thread(EmbeddingFactory.preload, [(provider, model)])
+
+@app.delete("/embedding-models")
+async def evict_embedding_models(provider: Optional[str] = None, model: Optional[str] = None):
+    """卸载常驻的嵌入模型，未指定时卸载全部"""
+    if model is not None:
+        model = EmbeddingFactory.model_key(provider, model)
+    return {"evicted": embedding_model_registry.evict(provider, model)}
+
+@app.post("/embedding-models/onnx/parity")
+async def check_onnx_parity(model: str = Body(...), texts: Optional[List[str]] = Body(None), quantize: Optional[bool] = Body(None)):
+    """比较 ONNX 嵌入模型与原 PyTorch 模型的输出（首次调用时会导出模型）"""
+    try:
+        from services.onnx_embedding import parity_check
+        return await asyncio.to_thread(parity_check, model, texts, quantize)
+    except Exception as e:
+        logger.error(f"Error checking ONNX parity: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/collection-cache/stats")
+async def get_collection_cache_stats():
+    """获取collection元数据缓存的命中统计和缓存内容"""
+    return collection_cache.stats()
+
+@app.get("/lexical-index/stats")
+async def get_lexical_index_stats():
+    """获取已加载的词法（BM25）索引的统计信息"""
+    return lexical_indexes.stats()
+
+@app.get("/loading-cache/stats")
+async def get_loading_cache_stats():
+    """获取已加载文档缓存的统计信息"""
+    try:
+        return LoadingCache().stats()
+    except Exception as e:
+        logger.error(f"Error getting loading cache stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/loading-cache")
+async def clear_loading_cache():
+    """清空已加载文档缓存"""
+    try:
+        removed = LoadingCache().clear()
+        return {"message": f"Removed {removed} cached documents"}
+    except Exception as e:
+        logger.error(f"Error clearing loading cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/embedding-cache/stats")
+async def get_embedding_cache_stats():
+    """获取嵌入向量缓存的统计信息"""
+    try:
+        return EmbeddingCache().stats()
+    except Exception as e:
+        logger.error(f"Error getting embedding cache stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/embedding-cache")
+async def clear_embedding_cache():
+    """清空嵌入向量缓存"""
+    try:
+        removed = EmbeddingCache().clear()
+        return {"message": f"Removed {removed} cached embeddings"}
+    except Exception as e:
+        logger.error(f"Error clearing embedding cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chunk")
 async def chunk_document(data: dict = Body(...)):
@@ -773,6 +1388,102 @@ async def evaluate_search(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/evaluate/stream")
+async def evaluate_search_stream(
+    file: UploadFile = File(...),
+    collection_id: str = Form(...),
+    top_k: int = Form(10),
+    threshold: float = Form(0.7),
+    concurrency: Optional[int] = Form(None),
+    run_id: Optional[str] = Form(None),
+    resume: bool = Form(True),
+    format: str = Form("ndjson")
+):
+    """
+    流式评估：行并发检索，每完成一行输出一条结果（NDJSON，format=sse 时为 Server-Sent Events），
+    结果同时写入 06-evaluation-result/<run_id>，中断后以相同参数重新提交即可从断点继续；
+    指定的 run_id 已有不同参数或collection版本下的结果时返回400
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    file_content = await file.read()
+    evaluation_service = EvaluationService()
+    # 在开始流式输出之前检查 run，参数与已有结果不一致时仍可返回400
+    try:
+        run = await evaluation_service.resolve_run(file_content, collection_id, top_k, threshold, run_id, resume)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    events = evaluation_service.stream_evaluation(
+        file_content=file_content,
+        collection_id=collection_id,
+        top_k=top_k,
+        threshold=threshold,
+        concurrency=concurrency,
+        run_id=run["run_id"],
+        resume=resume
+    )
+    
+    async def encode():
+        try:
+            async for event in events:
+                data = json.dumps(event, ensure_ascii=False)
+                yield f"event: {event['type']}\ndata: {data}\n\n" if format == "sse" else f"{data}\n"
+        except Exception as e:
+            logger.error(f"Error during streaming evaluation: {str(e)}")
+            data = json.dumps({"type": "failed", "error": str(e)}, ensure_ascii=False)
+            yield f"event: failed\ndata: {data}\n\n" if format == "sse" else f"{data}\n"
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(encode(), media_type=media_type)
+
+@app.post("/evaluate/sweep")
+async def evaluate_search_sweep(
+    file: UploadFile = File(...),
+    collection_ids: str = Form(...),
+    top_ks: str = Form("1,3,5,10"),
+    thresholds: str = Form("0.5,0.6,0.7,0.8"),
+    word_count_threshold: int = Form(20),
+    refresh: bool = Form(False)
+) -> Dict[str, Any]:
+    """
+    参数扫描评估：一次上传比较多个collection、top_k 和阈值的组合，每个collection输出一张比较表
+    
+    参数:
+        file: 包含评估数据的CSV文件
+        collection_ids: 逗号分隔的集合ID
+        top_ks: 逗号分隔的 top_k 列表，每个值须在 1 到 EVALUATION_MAX_TOP_K 之间
+        thresholds: 逗号分隔的相似度阈值列表
+        word_count_threshold: 文本字数阈值
+        refresh: 为真时忽略缓存的原始检索结果
+    """
+    try:
+        file_content = await file.read()
+        evaluation_service = EvaluationService()
+        return await evaluation_service.sweep_evaluation(
+            file_content=file_content,
+            collection_ids=[value.strip() for value in collection_ids.split(",") if value.strip()],
+            top_ks=[int(value) for value in top_ks.split(",") if value.strip()],
+            thresholds=[float(value) for value in thresholds.split(",") if value.strip()],
+            word_count_threshold=word_count_threshold,
+            refresh=refresh
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error during evaluation sweep: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/evaluate/runs/{run_id}")
+async def get_evaluation_run(run_id: str):
+    """获取评估 run 的参数、状态和已完成行数"""
+    try:
+        run = EvaluationService().get_run(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if run is None:
+        raise HTTPException(status_code=404, detail="Evaluation run not found")
+    return run
+
 @app.post("/save-search")
 async def save_search_results(request: Request):
     try:
@@ -0,0 +1,326 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+import numpy as np
+from botocore.exceptions import BotoCoreError, ClientError
+from services.token_batcher import split_by_tokens, token_batches, token_counter
+from utils.config import EMBEDDING_ASYNC_CONFIG
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Bedrock 中表示限流或服务端暂时不可用的错误码
+BEDROCK_RETRYABLE_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException"
+}
+
+# 未配置 OPENAI_BASE_URL / OPENAI_API_BASE 时使用的地址
+OPENAI_DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+class RetryableEmbeddingError(Exception):
+    """嵌入请求被限流（429）、服务端错误（5xx）或网络错误，可以退避后重试"""
+    def __init__(self, message: str, status: int = None, retry_after: float = None):
+        self.status = status
+        self.retry_after = retry_after
+        super().__init__(message)
+
+class EmbeddingRequestError(Exception):
+    """嵌入请求失败且不可重试（如400、401）"""
+
+def estimate_tokens(texts: List[str]) -> int:
+    """按约4个字符一个token粗略估算一批文本的token数，用于未指定分词器时的TPM预算"""
+    return sum(len(text) // 4 + 1 for text in texts)
+
+class OpenAIEmbeddingClient:
+    """
+    直接调用 OpenAI 兼容的 /embeddings 接口的异步客户端，base_url 可配置，便于对本地模拟服务测试
+    """
+    def __init__(self, model: str, api_key: str = None, base_url: str = None, timeout: float = None):
+        self.model = model
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self._client = httpx.AsyncClient(
+            base_url=(base_url or EMBEDDING_ASYNC_CONFIG["openai_base_url"] or OPENAI_DEFAULT_BASE_URL).rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=timeout or EMBEDDING_ASYNC_CONFIG["timeout"]
+        )
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        try:
+            response = await self._client.post("/embeddings", json={"model": self.model, "input": texts})
+        except httpx.TransportError as e:
+            raise RetryableEmbeddingError(f"OpenAI request failed: {str(e)}")
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get("retry-after")
+            raise RetryableEmbeddingError(
+                f"OpenAI returned {response.status_code}",
+                status=response.status_code,
+                retry_after=float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else None
+            )
+        if response.status_code >= 400:
+            raise EmbeddingRequestError(f"OpenAI returned {response.status_code}: {response.text[:500]}")
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        if len(data) != len(texts):
+            raise EmbeddingRequestError(f"OpenAI returned {len(data)} embeddings for {len(texts)} inputs")
+        return [item["embedding"] for item in data]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+class BedrockEmbeddingClient:
+    """
+    Bedrock 嵌入的异步包装：boto3 是同步客户端，请求放到线程中执行。
+    Titan 模型每次请求一条文本，Cohere 模型每次最多 96 条。
+    请求体和结果的处理与 langchain 的 BedrockEmbeddings 一致（换行替换为空格、合并 model_kwargs、可选归一化），
+    保证与 embed_query 得到的查询向量以及已有collection中的向量一致。
+    """
+    def __init__(self, client: Any, model_id: str, model_kwargs: Dict[str, Any] = None, normalize: bool = False):
+        self.client = client
+        self.model_id = model_id
+        self.model_kwargs = model_kwargs or {}
+        self.normalize = normalize
+        self.is_cohere = model_id.startswith("cohere.")
+
+    @property
+    def batch_size(self) -> int:
+        return 96 if self.is_cohere else 1
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self._invoke, texts)
+
+    def _invoke(self, texts: List[str]) -> List[List[float]]:
+        texts = [text.replace(os.linesep, " ") for text in texts]
+        body = dict(self.model_kwargs)
+        if self.is_cohere:
+            body.setdefault("input_type", "search_document")
+            body["texts"] = texts
+        else:
+            body["inputText"] = texts[0]
+        try:
+            response = self.client.invoke_model(
+                body=json.dumps(body),
+                modelId=self.model_id,
+                accept="application/json",
+                contentType="application/json"
+            )
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if code in BEDROCK_RETRYABLE_CODES or status == 429 or (status or 0) >= 500:
+                raise RetryableEmbeddingError(f"Bedrock returned {code or status}", status=status)
+            raise EmbeddingRequestError(f"Bedrock returned {code or status}: {str(e)}")
+        except BotoCoreError as e:
+            raise RetryableEmbeddingError(f"Bedrock request failed: {str(e)}")
+        result = json.loads(response["body"].read())
+        vectors = result["embeddings"] if self.is_cohere else [result["embedding"]]
+        if self.normalize:
+            vectors = [(np.asarray(vector) / np.linalg.norm(vector)).tolist() for vector in vectors]
+        return vectors
+
+    async def aclose(self) -> None:
+        pass
+
+class AsyncEmbeddingExecutor:
+    """
+    异步嵌入执行器：同时保持最多 max_in_flight 个批次的请求，
+    每个请求发出前按 RPM/TPM 预算预约令牌；遇到 429/5xx 时只对失败的批次指数退避重试，
+    结果按输入顺序返回。
+    """
+    def __init__(self, max_in_flight: int = None, request_limiter: RateLimiter = None, token_limiter: RateLimiter = None,
+                 max_retries: int = None, backoff_base: float = None, backoff_max: float = None,
+                 count_tokens: Callable[[List[str]], int] = None):
+        self.max_in_flight = max_in_flight or EMBEDDING_ASYNC_CONFIG["max_in_flight"]
+        self.request_limiter = request_limiter or RateLimiter(0)
+        self.token_limiter = token_limiter or RateLimiter(0)
+        self.max_retries = max_retries if max_retries is not None else EMBEDDING_ASYNC_CONFIG["max_retries"]
+        self.backoff_base = backoff_base if backoff_base is not None else EMBEDDING_ASYNC_CONFIG["backoff_base"]
+        self.backoff_max = backoff_max if backoff_max is not None else EMBEDDING_ASYNC_CONFIG["backoff_max"]
+        self.count_tokens = count_tokens or estimate_tokens
+        self.stats = {"requests": 0, "retries": 0, "rate_limited_seconds": 0.0}
+
+    async def embed_batches(self, client: Any, batches: List[List[str]], progress_callback: Callable[[int, int], None] = None) -> List[List[float]]:
+        """
+        并发嵌入多个批次
+
+        参数:
+            client: 提供 async embed(texts) 的客户端
+            batches: 文本批次列表
+            progress_callback: 可选的进度回调，参数为 (已完成文本数, 总文本数)
+
+        返回:
+            按输入顺序排列的向量列表（所有批次展开）
+        """
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        total = sum(len(batch) for batch in batches)
+        done = 0
+
+        async def run(index: int) -> None:
+            nonlocal done
+            async with semaphore:
+                results[index] = await self._send_with_retry(client, batches[index])
+            done += len(batches[index])
+            if progress_callback:
+                progress_callback(done, total)
+
+        tasks = [asyncio.ensure_future(run(index)) for index in range(len(batches))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def _send_with_retry(self, client: Any, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            delay = max(self.request_limiter.reserve(1), self.token_limiter.reserve(self.count_tokens(texts)))
+            if delay > 0:
+                self.stats["rate_limited_seconds"] += delay
+                await asyncio.sleep(delay)
+            self.stats["requests"] += 1
+            try:
+                return await client.embed(texts)
+            except RetryableEmbeddingError as e:
+                if attempt >= self.max_retries:
+                    raise
+                # 指数退避加随机抖动，服务端给出 Retry-After 时以其为准
+                backoff = e.retry_after or min(self.backoff_max, self.backoff_base * 2 ** attempt) * (0.5 + random.random() / 2)
+                attempt += 1
+                self.stats["retries"] += 1
+                logger.warning(f"Embedding batch of {len(texts)} failed ({str(e)}), retry {attempt}/{self.max_retries} in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+
+# 进程内共享的 RPM/TPM 预算，按提供商区分
+_limiters: Dict[str, tuple] = {}
+
+def provider_limiters(provider: str) -> tuple:
+    """
+    获取提供商共享的 (RPM限流器, TPM限流器)，同一进程内所有文档的请求共同消耗预算
+
+    参数:
+        provider: 嵌入提供商
+
+    返回:
+        (request_limiter, token_limiter)
+    """
+    provider = getattr(provider, "value", provider)
+    if provider not in _limiters:
+        budget = EMBEDDING_ASYNC_CONFIG["budgets"].get(provider, {})
+        _limiters[provider] = (
+            RateLimiter.per_minute(budget.get("requests_per_minute", 0)),
+            RateLimiter.per_minute(budget.get("tokens_per_minute", 0))
+        )
+    return _limiters[provider]
+
+def merge_piece_vectors(vectors: List[List[float]], piece_tokens: List[List[int]]) -> List[List[float]]:
+    """
+    把分段嵌入的向量合并回每条文本：按各段token数加权平均后归一化（与 langchain 的 OpenAIEmbeddings 一致）
+
+    参数:
+        vectors: 所有文本段的向量，顺序与 piece_tokens 展开后一致
+        piece_tokens: 每条文本各段的token数
+
+    返回:
+        每条文本一个向量
+    """
+    merged, offset = [], 0
+    for tokens in piece_tokens:
+        text_vectors = vectors[offset:offset + len(tokens)]
+        offset += len(tokens)
+        if len(tokens) == 1:
+            merged.append(text_vectors[0])
+            continue
+        average = np.average(np.asarray(text_vectors, dtype=np.float64), axis=0, weights=tokens)
+        merged.append((average / np.linalg.norm(average)).tolist())
+    return merged
+
+def run_coroutine(factory: Callable[[], Any]) -> Any:
+    """
+    在同步代码中运行协程；调用线程已有运行中的事件循环时（如在 async 接口中直接调用），改在新线程中运行
+
+    参数:
+        factory: 返回协程对象的无参函数
+
+    返回:
+        协程的返回值
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(factory())
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(lambda: asyncio.run(factory())).result()
+
+def embed_texts(provider: str, model_name: str, texts: List[str], embedding_function: Any = None,
+                batches: List[List[str]] = None, progress_callback: Callable[[int, int], None] = None) -> List[List[float]]:
+    """
+    使用异步执行器为远程提供商（OpenAI、Bedrock）嵌入文本
+
+    参数:
+        provider: 嵌入提供商
+        model_name: 嵌入模型名称
+        texts: 文本列表
+        embedding_function: 已创建的嵌入函数，Bedrock 复用其中的 boto3 客户端
+        batches: 预先划分的批次，未提供时 OpenAI 按token数打包、Bedrock 按模型支持的条数划分
+        progress_callback: 可选的进度回调，参数为 (已完成文本数, 总文本数)
+
+    返回:
+        与 texts 顺序一致的向量列表
+    """
+    provider = getattr(provider, "value", provider)
+    request_limiter, token_limiter = provider_limiters(provider)
+    executor = AsyncEmbeddingExecutor(request_limiter=request_limiter, token_limiter=token_limiter)
+
+    async def run():
+        piece_tokens = None
+        if provider == "openai":
+            client = OpenAIEmbeddingClient(model_name)
+            # TPM 预算按与打包相同的分词器计数
+            count = token_counter(model_name)
+            executor.count_tokens = lambda batch: sum(count(text) for text in batch)
+            request_texts = texts
+            if batches is None:
+                pieces = [split_by_tokens(text, model_name) for text in texts]
+                if any(len(text_pieces) > 1 for text_pieces in pieces):
+                    # 超过单条输入上限的文本分段嵌入，完成后按各段token数加权平均
+                    request_texts = [piece for text_pieces in pieces for piece, _ in text_pieces]
+                    piece_tokens = [[tokens for _, tokens in text_pieces] for text_pieces in pieces]
+            request_batches = batches or token_batches(request_texts, model_name)
+        elif provider == "bedrock":
+            client = BedrockEmbeddingClient(
+                embedding_function.client,
+                model_name,
+                model_kwargs=getattr(embedding_function, "model_kwargs", None),
+                normalize=getattr(embedding_function, "normalize", False)
+            )
+            request_batches = batches or [texts[i:i + client.batch_size] for i in range(0, len(texts), client.batch_size)]
+        else:
+            raise ValueError(f"Async embedding is not supported for provider: {provider}")
+        try:
+            vectors = await executor.embed_batches(client, request_batches, progress_callback)
+        finally:
+            await client.aclose()
+        return merge_piece_vectors(vectors, piece_tokens) if piece_tokens else vectors
+
+    start_time = time.time()
+    vectors = run_coroutine(run)
+    elapsed = time.time() - start_time
+    logger.info(
+        f"Async embedded {len(texts)} texts with {provider}/{model_name} in {elapsed:.2f}s: "
+        f"{executor.stats['requests']} requests, {executor.stats['retries']} retries, "
+        f"{executor.stats['rate_limited_seconds']:.2f}s waiting for rate limits"
+    )
+    return vectors
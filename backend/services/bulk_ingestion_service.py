@@ -0,0 +1,396 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List
+from pymilvus import utility
+from services.loading_service import LoadingService, page_to_chunk
+from services.loading_cache import LoadingCache
+from services.chunking_service import ChunkingService
+from services.embedding_service import EmbeddingService, EmbeddingConfig
+from services.collection_cache import collection_cache
+from services.lexical_index import lexical_indexes
+from services.vector_store_service import VectorStoreService, VectorDBConfig
+from utils.config import BULK_INGEST_CONFIG, LOADING_CACHE_CONFIG, VectorDBProvider
+
+logger = logging.getLogger(__name__)
+
+def _extract_document(file_path: str, method: str, strategy: str, chunking_strategy: str, chunking_options: dict) -> dict:
+    """
+    子进程工作函数：提取单个PDF的全部页面。
+    缓存由主进程统一读写，避免多个进程并发修改缓存索引。
+
+    返回:
+        dict: {"pages": 页面列表, "total_pages": 总页数, "seconds": 提取耗时}
+    """
+    start_time = time.time()
+    loading_service = LoadingService()
+    loading_service.cache = None
+    pages = list(loading_service.iter_pages(
+        file_path,
+        method,
+        strategy=strategy,
+        chunking_strategy=chunking_strategy,
+        chunking_options=chunking_options
+    ))
+    return {
+        "pages": pages,
+        "total_pages": loading_service.total_pages or max((page["page"] for page in pages), default=0),
+        "seconds": time.time() - start_time
+    }
+
+class BulkIngestionService:
+    """
+    批量入库服务：一次处理多个PDF（或整个目录），写入同一个collection。
+
+    - 各文件的页面提取在进程池中并行执行，最多保留 2 倍进程数的文件在途；
+    - 所有文件的chunk进入同一个缓冲区，嵌入调用按 batch_size 凑满后发出，不受单个文件大小影响；
+    - 向量按 insert_batch_size 分组写入Milvus，而不是每个文件单独插入；
+    - 结束时输出每个文件的页数、chunk数、耗时和吞吐量。
+
+    一次 ingest 调用的中间状态保存在实例上，同一实例不能并发执行多个批次。
+    """
+    def __init__(self):
+        self.chunking_service = ChunkingService()
+        self.embedding_service = EmbeddingService()
+        self.vector_store_service = VectorStoreService()
+        self.cache = LoadingCache() if LOADING_CACHE_CONFIG["enabled"] else None
+
+    @staticmethod
+    def collect_pdfs(paths: List[str]) -> List[str]:
+        """
+        展开输入路径：目录按文件名排序收集其中（含子目录）的PDF，文件原样保留
+
+        参数:
+            paths: 文件或目录路径列表
+
+        返回:
+            PDF文件路径列表
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in sorted(os.walk(path)):
+                    files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(".pdf"))
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                raise FileNotFoundError(f"File not found: {path}")
+        return files
+
+    def ingest(
+        self,
+        file_paths: List[str],
+        loading_method: str,
+        embedding_config: EmbeddingConfig,
+        vector_db_config: VectorDBConfig,
+        chunking_method: str = None,
+        chunk_size: int = 1000,
+        strategy: str = None,
+        chunking_strategy: str = None,
+        chunking_options: dict = None,
+        filenames: List[str] = None,
+        collection_prefix: str = "bulk",
+        max_workers: int = None,
+        batch_size: int = None,
+        insert_batch_size: int = None,
+        progress_callback=None
+    ) -> Dict[str, Any]:
+        """
+        批量加载、分块、嵌入并索引多个PDF
+
+        参数:
+            file_paths: PDF文件路径列表
+            loading_method: 加载方法
+            embedding_config: 嵌入配置对象
+            vector_db_config: 向量数据库配置对象
+            chunking_method: 分块方法，为空时每页一个chunk
+            chunk_size: 固定大小分块时的块大小
+            strategy: unstructured 加载策略
+            chunking_strategy: unstructured 分块策略
+            chunking_options: unstructured 分块参数
+            filenames: 与 file_paths 对应的原始文件名（上传的临时文件），默认取路径中的文件名
+            collection_prefix: collection名称前缀
+            max_workers: 提取进程数，默认取 BULK_INGEST_CONFIG
+            batch_size: 每次嵌入调用的chunk数，默认取 BULK_INGEST_CONFIG
+            insert_batch_size: 每次写入Milvus的向量数，默认取 BULK_INGEST_CONFIG
+            progress_callback: 可选的进度回调，参数为 (已完成文件数, 文件总数, pages=, chunks=, vectors=)，
+                可通过抛出异常中断处理
+
+        返回:
+            包含collection名称、汇总数量、总耗时和每个文件吞吐量报告的结果字典
+        """
+        if vector_db_config.provider != VectorDBProvider.MILVUS:
+            raise ValueError(f"Unsupported vector database: {vector_db_config.provider}")
+
+        start_time = time.time()
+        max_workers = max(1, min(max_workers or BULK_INGEST_CONFIG["max_workers"], len(file_paths) or 1))
+        batch_size = batch_size or BULK_INGEST_CONFIG["batch_size"]
+        insert_batch_size = insert_batch_size or BULK_INGEST_CONFIG["insert_batch_size"]
+        filenames = filenames or [os.path.basename(path) for path in file_paths]
+
+        self._reports = [
+            {
+                "filename": filename,
+                "status": "pending",
+                "pages": 0,
+                "chunks": 0,
+                "vectors": 0,
+                "cache_hit": False,
+                "load_seconds": 0.0,
+                "pages_per_second": 0.0,
+                "completed_seconds": None,
+                "chunks_per_second": 0.0,
+                "error": None
+            }
+            for filename in filenames
+        ]
+        self._pending_chunks = []
+        self._pending_rows = []
+        self._collection = None
+        self._collection_name = None
+        self._alias = None
+        self._embedding_function = None
+        self._embedding_config = embedding_config
+        self._start_time = start_time
+        # 每个文件开始处理（提交提取或读取缓存）的时间，用于计算该文件自身的吞吐量
+        self._file_started = {}
+        self._collection_prefix = collection_prefix
+        self._batch_size = batch_size
+        self._insert_batch_size = insert_batch_size
+        self._progress_callback = progress_callback
+        self._files_done = 0
+        options = (loading_method, strategy, chunking_strategy, chunking_options)
+
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                in_flight = {}
+                next_file = 0
+                try:
+                    while next_file < len(file_paths) or in_flight:
+                        while next_file < len(file_paths) and len(in_flight) < max_workers * 2:
+                            doc_index = next_file
+                            next_file += 1
+                            self._file_started[doc_index] = time.time()
+                            cached = self._load_from_cache(doc_index, file_paths[doc_index], options)
+                            if cached is not None:
+                                self._add_document(doc_index, cached, embedding_config, vector_db_config, chunking_method, chunk_size)
+                                continue
+                            future = executor.submit(_extract_document, file_paths[doc_index], *options)
+                            in_flight[future] = doc_index
+
+                        if not in_flight:
+                            continue
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            doc_index = in_flight.pop(future)
+                            try:
+                                extracted = future.result()
+                            except Exception as e:
+                                logger.error(f"Error loading {file_paths[doc_index]}: {str(e)}")
+                                self._reports[doc_index].update({"status": "failed", "error": str(e)})
+                                self._file_done()
+                                continue
+                            self._store_in_cache(file_paths[doc_index], options, extracted)
+                            self._add_document(doc_index, extracted, embedding_config, vector_db_config, chunking_method, chunk_size)
+                except BaseException:
+                    for future in in_flight:
+                        future.cancel()
+                    raise
+
+            # 处理剩余不足一批的chunk和向量
+            self._embed_pending(embedding_config, vector_db_config, flush=True)
+            self._insert_pending(flush=True)
+            if self._collection is not None:
+                self.vector_store_service._finalize_milvus_collection(self._collection, vector_db_config)
+        except BaseException:
+            if self._collection_name:
+                self._drop_collection(self._collection_name)
+            raise
+
+        processing_time = time.time() - start_time
+        reports = self._reports
+        total_vectors = sum(report["vectors"] for report in reports)
+        logger.info(self.format_report(reports))
+        return {
+            "collection_name": self._collection_name,
+            "database": vector_db_config.provider,
+            "index_mode": vector_db_config.index_mode,
+            "embedding_provider": embedding_config.provider,
+            "embedding_model": embedding_config.model_name,
+            "total_files": len(file_paths),
+            "failed_files": sum(1 for report in reports if report["status"] == "failed"),
+            "total_pages": sum(report["pages"] for report in reports),
+            "total_chunks": sum(report["chunks"] for report in reports),
+            "total_vectors": total_vectors,
+            "processing_time": processing_time,
+            "vectors_per_second": total_vectors / processing_time if processing_time else 0.0,
+            "files": reports
+        }
+
+    def _load_from_cache(self, doc_index: int, file_path: str, options: tuple):
+        """主进程中查询加载缓存，命中时直接读取页面，不再提交到进程池"""
+        if not self.cache:
+            return None
+        key = self._cache_key(file_path, options)
+        entry = self.cache.get(key)
+        if not entry:
+            return None
+        start_time = time.time()
+        pages = list(self.cache.iter_pages(key))
+        self._reports[doc_index]["cache_hit"] = True
+        return {"pages": pages, "total_pages": entry["total_pages"], "seconds": time.time() - start_time}
+
+    def _store_in_cache(self, file_path: str, options: tuple, extracted: dict) -> None:
+        """将子进程提取的页面写入加载缓存，写入失败不影响入库"""
+        if not self.cache:
+            return
+        try:
+            self.cache.put(self._cache_key(file_path, options), extracted["pages"], extracted["total_pages"])
+        except Exception as e:
+            logger.error(f"Error writing loading cache: {str(e)}")
+
+    def _cache_key(self, file_path: str, options: tuple) -> str:
+        """与 LoadingService 相同的缓存键规则：strategy 和分块参数只对 unstructured 生效"""
+        loading_method, strategy, chunking_strategy, chunking_options = options
+        if loading_method != "unstructured":
+            strategy, chunking_strategy, chunking_options = None, None, None
+        return LoadingCache.make_key(
+            LoadingCache.file_hash(file_path),
+            loading_method,
+            strategy=strategy,
+            chunking_strategy=chunking_strategy,
+            chunking_options=chunking_options
+        )
+
+    def _add_document(self, doc_index: int, extracted: dict, embedding_config: EmbeddingConfig, vector_db_config: VectorDBConfig,
+                      chunking_method: str, chunk_size: int) -> None:
+        """对已提取的文档分块，放入共享的嵌入缓冲区，凑满一批即发出嵌入调用"""
+        pages = extracted["pages"]
+        if chunking_method:
+            chunks = list(self.chunking_service.iter_chunks(pages, chunking_method, chunk_size=chunk_size))
+        else:
+            chunks = [page_to_chunk(page, idx) for idx, page in enumerate(pages, 1)]
+
+        report = self._reports[doc_index]
+        report.update({
+            "status": "embedding" if chunks else "completed",
+            "pages": extracted["total_pages"],
+            "chunks": len(chunks),
+            "load_seconds": round(extracted["seconds"], 3),
+            "pages_per_second": round(extracted["total_pages"] / extracted["seconds"], 2) if extracted["seconds"] else 0.0
+        })
+        if not chunks:
+            self._file_done()
+            return
+
+        for chunk in chunks:
+            chunk["metadata"]["total_chunks"] = len(chunks)
+            self._pending_chunks.append((doc_index, chunk))
+        self._embed_pending(embedding_config, vector_db_config)
+
+    def _embed_pending(self, embedding_config: EmbeddingConfig, vector_db_config: VectorDBConfig, flush: bool = False) -> None:
+        """嵌入缓冲区中的chunk：每批可能包含多个文件的chunk；flush 时处理剩余不足一批的部分"""
+        batch_size = self._batch_size
+        while len(self._pending_chunks) >= batch_size or (flush and self._pending_chunks):
+            batch = self._pending_chunks[:batch_size]
+            del self._pending_chunks[:batch_size]
+
+            if self._embedding_function is None:
+                self._embedding_function = self.embedding_service.embedding_factory.create_embedding_function(embedding_config)
+            results = self.embedding_service.embed_chunks(
+                [chunk for _, chunk in batch],
+                embedding_config,
+                embedding_function=self._embedding_function
+            )
+
+            if self._collection is None:
+                self._alias = vector_db_config._connect_to_milvus()
+                self._collection_name = self.vector_store_service._make_collection_name(self._collection_prefix, embedding_config.provider)
+                self._collection = self.vector_store_service._create_milvus_collection(
+                    self._collection_name, len(results[0]["embedding"]), vector_db_config, self._alias
+                )
+
+            # 每个chunk记录来源文件，document_name 和 total_chunks 取各自文件的值
+            for (doc_index, _), result in zip(batch, results):
+                result["metadata"]["filename"] = self._reports[doc_index]["filename"]
+                result["metadata"]["total_chunks"] = self._reports[doc_index]["chunks"]
+                self._pending_rows.append((doc_index, result["metadata"], result["embedding"]))
+            self._insert_pending()
+
+    def _insert_pending(self, flush: bool = False) -> None:
+        """按 insert_batch_size 分组写入Milvus，并在文件的全部向量写入后记录其完成时间"""
+        insert_batch_size = self._insert_batch_size
+        while len(self._pending_rows) >= insert_batch_size or (flush and self._pending_rows):
+            group = self._pending_rows[:insert_batch_size]
+            del self._pending_rows[:insert_batch_size]
+            columns = self.vector_store_service._build_milvus_columns(
+                [metadata for _, metadata, _ in group],
+                [vector for _, _, vector in group],
+                [self._reports[doc_index]["filename"] for doc_index, _, _ in group],
+                self._embedding_config.provider,
+                self._embedding_config.model_name
+            )
+            inserted = self.vector_store_service._insert_with_retry(self._collection, columns)
+            logger.info(f"Inserted {inserted} vectors into {self._collection_name}")
+
+            for doc_index, _, _ in group:
+                report = self._reports[doc_index]
+                report["vectors"] += 1
+                if report["vectors"] == report["chunks"]:
+                    now = time.time()
+                    file_seconds = now - self._file_started[doc_index]
+                    report.update({
+                        "status": "completed",
+                        # completed_seconds 为相对整个批次开始的完成时间，chunks_per_second 按该文件自身的处理时长计算
+                        "completed_seconds": round(now - self._start_time, 3),
+                        "chunks_per_second": round(report["chunks"] / file_seconds, 2) if file_seconds else 0.0
+                    })
+                    self._file_done()
+
+    def _file_done(self) -> None:
+        """记录一个文件处理结束（完成或失败）并上报进度"""
+        self._files_done += 1
+        if self._progress_callback:
+            self._progress_callback(
+                self._files_done,
+                len(self._reports),
+                pages=sum(report["pages"] for report in self._reports),
+                chunks=sum(report["chunks"] for report in self._reports),
+                vectors=sum(report["vectors"] for report in self._reports)
+            )
+
+    def _drop_collection(self, collection_name: str) -> None:
+        """批量入库失败或被取消时删除未写完的collection"""
+        try:
+            if utility.has_collection(collection_name, using=self._alias):
+                utility.drop_collection(collection_name, using=self._alias)
+                collection_cache.invalidate(collection_name)
+                lexical_indexes.drop(collection_name)
+                logger.info(f"Dropped partial collection {collection_name}")
+        except Exception as e:
+            logger.error(f"Error dropping partial collection {collection_name}: {str(e)}")
+
+    @staticmethod
+    def format_report(reports: List[Dict[str, Any]]) -> str:
+        """
+        将每个文件的吞吐量报告格式化为文本表格
+
+        参数:
+            reports: ingest 返回结果中的 files 列表
+
+        返回:
+            多行文本
+        """
+        header = f"{'file':<40} {'status':<10} {'pages':>6} {'chunks':>7} {'load_s':>8} {'pages/s':>8} {'done_s':>8} {'chunks/s':>9}"
+        lines = [header, "-" * len(header)]
+        for report in reports:
+            done = report["completed_seconds"]
+            lines.append(
+                f"{report['filename'][:40]:<40} {report['status']:<10} {report['pages']:>6} {report['chunks']:>7} "
+                f"{report['load_seconds']:>8.2f} {report['pages_per_second']:>8.2f} "
+                f"{(f'{done:.2f}' if done is not None else '-'):>8} {report['chunks_per_second']:>9.2f}"
+            )
+            if report["error"]:
+                lines.append(f"    error: {report['error']}")
+        return "\n".join(lines)
@@ -36,57 +36,8 @@ class ChunkingService:
             if not page_map:
                 raise ValueError("Page map is required for chunking.")
             
-            chunks = []
+            chunks = list(self.iter_chunks(page_map, method, chunk_size=chunk_size))
             total_pages = len(page_map)
-            
-            if method == "by_pages":
-                # 直接使用 page_map 中的每页作为一个 chunk
-                for page_data in page_map:
-                    chunk_metadata = {
-                        "chunk_id": len(chunks) + 1,
-                        "page_number": page_data['page'],
-                        "page_range": str(page_data['page']),
-                        "word_count": len(page_data['text'].split())
-                    }
-                    chunks.append({
-                        "content": page_data['text'],
-                        "metadata": chunk_metadata
-                    })
-            
-            elif method == "fixed_size":
-                # 对每页内容进行固定大小分块
-                for page_data in page_map:
-                    page_chunks = self._fixed_size_chunks(page_data['text'], chunk_size)
-                    for idx, chunk in enumerate(page_chunks, 1):
-                        chunk_metadata = {
-                            "chunk_id": len(chunks) + 1,
-                            "page_number": page_data['page'],
-                            "page_range": str(page_data['page']),
-                            "word_count": len(chunk["text"].split())
-                        }
-                        chunks.append({
-                            "content": chunk["text"],
-                            "metadata": chunk_metadata
-                        })
-            
-            elif method in ["by_paragraphs", "by_sentences"]:
-                # 对每页内容进行段落或句子分块
-                splitter_method = self._paragraph_chunks if method == "by_paragraphs" else self._sentence_chunks
-                for page_data in page_map:
-                    page_chunks = splitter_method(page_data['text'])
-                    for chunk in page_chunks:
-                        chunk_metadata = {
-                            "chunk_id": len(chunks) + 1,
-                            "page_number": page_data['page'],
-                            "page_range": str(page_data['page']),
-                            "word_count": len(chunk["text"].split())
-                        }
-                        chunks.append({
-                            "content": chunk["text"],
-                            "metadata": chunk_metadata
-                        })
-            else:
-                raise ValueError(f"Unsupported chunking method: {method}")
 
             # 创建标准化的文档数据结构
             document_data = {
@@ -105,6 +56,47 @@ class ChunkingService:
             logger.error(f"Error in chunk_text: {str(e)}")
             raise
 
+    def iter_chunks(self, pages, method: str, chunk_size: int = 1000):
+        """
+        以生成器方式逐页分块，可以直接消费 LoadingService.iter_pages 的输出，
+        每次只处理一页，不需要完整的 page_map
+        
+        Args:
+            pages: 页面迭代器，每个元素包含 'page' 和 'text'
+            method: 分块方法，支持 'by_pages', 'fixed_size', 'by_paragraphs', 'by_sentences'
+            chunk_size: 固定大小分块时的块大小
+            
+        Yields:
+            包含 content 和 metadata 的分块字典，chunk_id 从1开始连续编号
+        
+        Raises:
+            ValueError: 当分块方法不支持时
+        """
+        if method == "by_pages":
+            splitter_method = lambda text: [{"text": text}]
+        elif method == "fixed_size":
+            splitter_method = lambda text: self._fixed_size_chunks(text, chunk_size)
+        elif method == "by_paragraphs":
+            splitter_method = self._paragraph_chunks
+        elif method == "by_sentences":
+            splitter_method = self._sentence_chunks
+        else:
+            raise ValueError(f"Unsupported chunking method: {method}")
+        
+        chunk_id = 0
+        for page_data in pages:
+            for chunk in splitter_method(page_data['text']):
+                chunk_id += 1
+                yield {
+                    "content": chunk["text"],
+                    "metadata": {
+                        "chunk_id": chunk_id,
+                        "page_number": page_data['page'],
+                        "page_range": str(page_data['page']),
+                        "word_count": len(chunk["text"].split())
+                    }
+                }
+
     def _fixed_size_chunks(self, text: str, chunk_size: int) -> list[dict]:
         """
         将文本按固定大小分块
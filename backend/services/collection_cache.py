@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from pymilvus import Collection
+from utils.config import COLLECTION_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class CollectionInfo:
+    """已加载collection的句柄和检索所需的元数据"""
+    def __init__(self, name: str, collection: Collection, embedding_provider: str, embedding_model: str,
+                 dimension: int, index_type: Optional[str], num_entities: int):
+        self.name = name
+        self.collection = collection
+        self.embedding_provider = embedding_provider
+        self.embedding_model = embedding_model
+        self.dimension = dimension
+        self.index_type = index_type
+        self.num_entities = num_entities
+        self.loaded_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "embedding_provider": self.embedding_provider,
+            "embedding_model": self.embedding_model,
+            "dimension": self.dimension,
+            "index_type": self.index_type,
+            "num_entities": self.num_entities,
+            "loaded_at": self.loaded_at
+        }
+
+class CollectionMetadataCache:
+    """
+    进程内共享的collection元数据缓存
+
+    检索时不再每次执行 Collection()、load()、num_entities 和抽样查询：
+    第一次访问某个collection时加载并读取嵌入提供商/模型、向量维度、索引类型和实体数，
+    之后直接返回缓存的句柄。索引、增量写入、删除collection时调用 invalidate；
+    其他进程（如批量入库命令行）修改的collection在 ttl 秒后重新读取。
+    """
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl if ttl is not None else COLLECTION_CACHE_CONFIG["ttl"]
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CollectionInfo] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, collection_name: str, alias: str) -> CollectionInfo:
+        """
+        获取collection的缓存信息，未命中或已过期时加载collection并读取元数据
+
+        参数:
+            collection_name: collection名称
+            alias: 连接池分配的连接别名
+
+        返回:
+            CollectionInfo，其中 collection 为已加载的句柄
+        """
+        with self._lock:
+            info = self._entries.get(collection_name)
+            if info is not None and (not self.ttl or time.time() - info.loaded_at < self.ttl):
+                self._hits += 1
+                return info
+            self._misses += 1
+
+        info = self._load(collection_name, alias)
+        with self._lock:
+            self._entries[collection_name] = info
+        return info
+
+    def _load(self, collection_name: str, alias: str) -> CollectionInfo:
+        logger.info(f"Loading collection: {collection_name}")
+        collection = Collection(collection_name, using=alias)
+        collection.load()
+
+        # 从collection中读取embedding配置
+        sample_entity = collection.query(
+            expr="id >= 0",
+            output_fields=["embedding_provider", "embedding_model"],
+            limit=1
+        )
+        if not sample_entity:
+            raise ValueError(f"Collection {collection_name} is empty")
+
+        vector_field = next(field for field in collection.schema.fields if field.name == "vector")
+        index_type = None
+        if collection.indexes:
+            index_type = collection.indexes[0].params.get("index_type")
+
+        info = CollectionInfo(
+            name=collection_name,
+            collection=collection,
+            embedding_provider=sample_entity[0]["embedding_provider"],
+            embedding_model=sample_entity[0]["embedding_model"],
+            dimension=int(vector_field.params.get("dim", 0)),
+            index_type=index_type,
+            num_entities=collection.num_entities
+        )
+        logger.info(f"Cached collection info: {info.to_dict()}")
+        return info
+
+    def invalidate(self, collection_name: str = None) -> None:
+        """
+        使缓存失效，在collection被重建、增量写入或删除后调用
+
+        参数:
+            collection_name: collection名称，为空时清空全部缓存
+        """
+        with self._lock:
+            if collection_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(collection_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计信息
+
+        返回:
+            命中/未命中次数和各collection的缓存内容
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "collections": [info.to_dict() for info in self._entries.values()]
+            }
+
+# 进程内共享的collection元数据缓存
+collection_cache = CollectionMetadataCache()
@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+import numpy as np
+from utils.config import EMBEDDING_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    嵌入向量的磁盘缓存（SQLite）
+
+    以 提供商 + 模型 + 用途（document/query）+ 规范化文本的 SHA-256 作为键，向量以 float32 字节保存。
+    同一文档换一种分块方式重新嵌入、重复调用 /embed，或评估时重复的检索问题，都可以直接复用已有向量。
+    用途区分文档和查询，因为部分模型（如 bge、Cohere）对两者使用不同的前缀或 input_type。
+    总大小超过上限时按最近访问时间（LRU）淘汰，命中/未命中/淘汰计数保存在同一数据库中。
+    """
+    # 同一进程内的所有实例共享一把写锁；已初始化的数据库路径不再重复建表
+    _lock = threading.Lock()
+    _initialized = set()
+
+    def __init__(self, db_path: str = None, max_bytes: int = None):
+        """
+        初始化缓存
+
+        参数:
+            db_path: SQLite 数据库路径，默认读取配置
+            max_bytes: 缓存向量的总大小上限（字节），默认读取配置
+        """
+        self.db_path = db_path or EMBEDDING_CACHE_CONFIG["db_path"]
+        self.max_bytes = max_bytes or EMBEDDING_CACHE_CONFIG["max_bytes"]
+        if self.db_path not in self._initialized:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        key TEXT PRIMARY KEY,
+                        provider TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        dimension INTEGER NOT NULL,
+                        vector BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL,
+                        last_access REAL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+                conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                conn.executemany(
+                    "INSERT OR IGNORE INTO stats (name, value) VALUES (?, 0)",
+                    [("hits",), ("misses",), ("evictions",)]
+                )
+            self._initialized.add(self.db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """规范化文本：Unicode NFC、合并连续空白、去掉首尾空白"""
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+    @classmethod
+    def make_key(cls, provider: str, model: str, text: str, kind: str = "document") -> str:
+        """
+        生成缓存键
+
+        参数:
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+            text: 原始文本
+            kind: document（文档块）或 query（检索问题）
+
+        返回:
+            缓存键
+        """
+        raw = "\x00".join([str(provider), model, kind, cls.normalize(text)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, provider: str, model: str, texts: List[str], kind: str = "document") -> List[Optional[List[float]]]:
+        """
+        批量查询缓存，命中的条目更新最近访问时间
+
+        参数:
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+            texts: 文本列表
+            kind: document 或 query
+
+        返回:
+            与 texts 顺序一致的列表，命中为向量，未命中为 None
+        """
+        keys = [self.make_key(provider, model, text, kind) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._connect() as conn:
+            unique_keys = list(dict.fromkeys(keys))
+            # SQLite 单条语句的参数个数有限，分批查询
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        vectors = [found.get(key) for key in keys]
+        hits = sum(1 for vector in vectors if vector is not None)
+        with self._lock, self._connect() as conn:
+            if found:
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(time.time(), key) for key in found]
+                )
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'hits'", (hits,))
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'misses'", (len(keys) - hits,))
+        return vectors
+
+    def put_many(self, provider: str, model: str, texts: List[str], vectors: List[Any], kind: str = "document") -> None:
+        """
+        批量写入缓存，写入后按 LRU 淘汰超出上限的条目
+
+        参数:
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+            texts: 文本列表
+            vectors: 与 texts 对应的向量列表
+            kind: document 或 query
+        """
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((self.make_key(provider, model, text, kind), str(provider), model, len(blob) // 4, blob, len(blob), now, now))
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, provider, model, dimension, vector, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # 调用方需持有写锁；按最近访问时间从旧到新分批删除，直到总大小不超过上限
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        evicted = 0
+        while total_bytes > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM embeddings ORDER BY last_access LIMIT 1000").fetchall()
+            if not rows:
+                break
+            batch = []
+            for key, size in rows:
+                if total_bytes <= self.max_bytes:
+                    break
+                batch.append((key,))
+                total_bytes -= size
+            conn.executemany("DELETE FROM embeddings WHERE key = ?", batch)
+            evicted += len(batch)
+        if evicted:
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'evictions'", (evicted,))
+            logger.info(f"Evicted {evicted} embedding cache entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        返回:
+            包含条目数、总大小、上限以及命中/未命中/淘汰计数和命中率的字典
+        """
+        with self._connect() as conn:
+            entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+            stats = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        return {
+            "entries": entries,
+            "total_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            **stats,
+            "hit_rate": stats.get("hits", 0) / lookups if lookups else 0.0
+        }
+
+    def clear(self) -> int:
+        """
+        清空缓存条目（保留统计计数）
+
+        返回:
+            删除的条目数
+        """
+        with self._lock, self._connect() as conn:
+            return conn.execute("DELETE FROM embeddings").rowcount
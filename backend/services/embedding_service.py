@@ -1,12 +1,23 @@
 import os
 import dotenv
 dotenv.load_dotenv()
-import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
 import boto3
+from services.embedding_store import EMBEDDED_DOCS_DIR, write_embedding_file, read_embedding_header, is_embedding_file
+from services.model_registry import embedding_model_registry
+from services.embedding_cache import EmbeddingCache
+from services.async_embedding import embed_texts, provider_limiters
+from services.token_batcher import token_batches
+from utils.config import EMBEDDING_REGISTRY_CONFIG, EMBEDDING_BATCH_CONFIG, EMBEDDING_ASYNC_CONFIG, EMBEDDING_CACHE_CONFIG, ONNX_EMBEDDING_CONFIG
+from utils.rate_limiter import RateLimiter
 from langchain_community.embeddings import BedrockEmbeddings, OpenAIEmbeddings, HuggingFaceEmbeddings
 
+logger = logging.getLogger(__name__)
+
 class EmbeddingProvider(str, Enum):
     """
     嵌入提供商枚举类，定义支持的嵌入模型提供商
@@ -14,6 +25,7 @@ class EmbeddingProvider(str, Enum):
     OPENAI = "openai"
     BEDROCK = "bedrock"
     HUGGINGFACE = "huggingface"
+    ONNX = "onnx"
 
 class EmbeddingConfig:
     """
@@ -34,103 +46,239 @@ class EmbeddingConfig:
 class EmbeddingService:
     """
     嵌入服务类，提供创建和管理文本嵌入的功能
+    
+    属性:
+        embedding_factory (EmbeddingFactory): 嵌入函数工厂
+        cache (EmbeddingCache): 嵌入向量缓存，配置中禁用时为 None
     """
-    def __init__(self):
-        """初始化嵌入服务，创建嵌入工厂实例"""
+    def __init__(self, cache: EmbeddingCache = None):
+        """
+        初始化嵌入服务，创建嵌入工厂实例
+        
+        参数:
+            cache: 嵌入向量缓存，默认按配置创建
+        """
         self.embedding_factory = EmbeddingFactory()
+        self.cache = cache if cache is not None else (EmbeddingCache() if EMBEDDING_CACHE_CONFIG["enabled"] else None)
 
-    def create_embeddings(self, input_data: dict, config: EmbeddingConfig) -> tuple:
+    def create_embeddings(self, input_data: dict, config: EmbeddingConfig, progress_callback=None) -> tuple:
         """
         创建文本块的嵌入向量并返回必要的信息
         
         参数:
             input_data: 包含文本块和元数据的输入数据字典
             config: 嵌入配置对象
+            progress_callback: 可选的进度回调，参数为 (已处理块数, 总块数)，另以关键字参数传入 chunks_per_second，
+                可通过抛出异常中断处理
             
         返回:
-            包含嵌入结果和元数据的元组
+            (嵌入结果列表, 统计信息)，统计信息包含 embedding_time 和 chunks_per_second
         """
-        embedding_function = self.embedding_factory.create_embedding_function(config)
-        
         chunks = input_data.get('chunks', [])
         filename = input_data.get('metadata', {}).get('filename', '')  # 获取文件名
         
-        # 批处理大小
-        BATCH_SIZE = 20
+        # 每次交给 embed_chunks 的chunk数，按提供商配置
+        window_size = EMBEDDING_BATCH_CONFIG["window_size"].get(str(config.provider), 20)
+        results = []
+        start_time = time.time()
+        
+        def report(processed):
+            if progress_callback:
+                elapsed = time.time() - start_time
+                progress_callback(processed, len(chunks), chunks_per_second=round(processed / elapsed, 2) if elapsed else 0.0)
+        
+        for i in range(0, len(chunks), window_size):
+            batch = chunks[i:i + window_size]
+            done = len(results)
+            results.extend(self.embed_chunks(
+                batch,
+                config,
+                filename=filename,
+                total_chunks=len(chunks),
+                # 异步执行器每完成一个请求报告一次进度
+                progress_callback=lambda processed, _total: report(done + processed)
+            ))
+            report(len(results))
+        
+        embedding_time = time.time() - start_time
+        chunks_per_second = len(results) / embedding_time if embedding_time else 0.0
+        logger.info(f"Embedded {len(results)} chunks with {config.provider}/{config.model_name} in {embedding_time:.2f}s ({chunks_per_second:.2f} chunks/s)")
+        
+        # metadata已经包含在每个embedding中，这里只返回吞吐量统计
+        return results, {"embedding_time": embedding_time, "chunks_per_second": chunks_per_second}
+
+    def embed_chunks(self, chunks: list, config: EmbeddingConfig, filename: str = "", total_chunks: int = None, embedding_function=None, progress_callback=None) -> list:
+        """
+        为一批文本块创建嵌入向量，供 create_embeddings 和流式处理管道按批调用
+        
+        参数:
+            chunks: 文本块列表，每个元素包含 content 和 metadata
+            config: 嵌入配置对象
+            filename: 文档文件名，写入每个结果的metadata
+            total_chunks: 文档的总块数，未知时为 None（记录为0）
+            embedding_function: 已创建的嵌入函数，未提供时按配置创建（全部命中缓存时不创建）
+            progress_callback: 可选的进度回调，参数为 (本批已完成块数, 本批块数)，仅异步执行器在每个请求完成时调用
+            
+        返回:
+            嵌入结果列表，每个元素包含 embedding 和 metadata
+        """
+        texts = [chunk.get("content", "") for chunk in chunks]
+        embedding_vectors = self._embed_documents_cached(config, texts, embedding_function, progress_callback)
+        
+        # 将结果与原始chunk数据组合
         results = []
+        for chunk, embedding_vector in zip(chunks, embedding_vectors):
+            metadata = {
+                "chunk_id": chunk["metadata"]["chunk_id"],
+                "page_number": chunk["metadata"]["page_number"],
+                "page_range": chunk["metadata"]["page_range"],
+                "content": chunk["content"],
+                "word_count": chunk["metadata"]["word_count"],
+                # "chunking_method": input_data.get("chunking_method", "loaded"),
+                "total_chunks": total_chunks or 0,
+                "embedding_provider": config.provider,
+                "embedding_model": config.model_name,
+                "embedding_timestamp": datetime.now().isoformat(),
+                "vector_dimension": len(embedding_vector),
+                "filename": filename  # 添加文件名到metadata
+            }
+            
+            results.append({
+                "embedding": embedding_vector,
+                "metadata": metadata
+            })
+        return results
+
+    def _embed_documents_cached(self, config: EmbeddingConfig, texts: list, embedding_function=None, progress_callback=None) -> list:
+        """
+        嵌入一批文档文本：先查缓存，只为未命中的文本调用模型，新向量写回缓存
+        
+        参数:
+            config: 嵌入配置对象
+            texts: 文本列表
+            embedding_function: 已创建的嵌入函数，未提供时按需创建
+            progress_callback: 传给异步执行器的进度回调
+            
+        返回:
+            与 texts 顺序一致的向量列表
+        """
+        vectors = self._cache_get(config, texts, "document")
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            return vectors
         
-        # 如果是OpenAI，使用批处理
-        if config.provider == EmbeddingProvider.OPENAI:
-            for i in range(0, len(chunks), BATCH_SIZE):
-                batch = chunks[i:i + BATCH_SIZE]
-                # 提取当前批次的文本内容
-                texts = [chunk.get("content", "") for chunk in batch]
-                
-                # 批量获取embeddings
-                embedding_vectors = embedding_function.embed_documents(texts)
-                
-                # 将结果与原始chunk数据组合
-                for chunk, embedding_vector in zip(batch, embedding_vectors):
-                    metadata = {
-                        "chunk_id": chunk["metadata"]["chunk_id"],
-                        "page_number": chunk["metadata"]["page_number"],
-                        "page_range": chunk["metadata"]["page_range"],
-                        "content": chunk["content"],
-                        "word_count": chunk["metadata"]["word_count"],
-                        # "chunking_method": input_data.get("chunking_method", "loaded"),
-                        "total_chunks": len(chunks),
-                        "embedding_provider": config.provider,
-                        "embedding_model": config.model_name,
-                        "embedding_timestamp": datetime.now().isoformat(),
-                        "vector_dimension": len(embedding_vector),
-                        "filename": filename  # 添加文件名到metadata
-                    }
-                    
-                    embedding_result = {
-                        "embedding": embedding_vector,
-                        "metadata": metadata
-                    }
-                    results.append(embedding_result)
+        missing_texts = [texts[i] for i in missing]
+        embedding_function = embedding_function or self.embedding_factory.create_embedding_function(config)
+        new_vectors = self._embed_documents(config, missing_texts, embedding_function, progress_callback)
+        self._cache_put(config, missing_texts, new_vectors, "document")
+        for i, vector in zip(missing, new_vectors):
+            vectors[i] = vector
+        return vectors
+
+    def _embed_documents(self, config: EmbeddingConfig, texts: list, embedding_function, progress_callback=None) -> list:
+        """按提供商选择批量方式调用模型嵌入文本"""
+        # OpenAI 和 Bedrock 由异步执行器并发请求；HuggingFace 按长度排序后分批前向计算；ONNX 模型内部已按长度分批
+        if config.provider in (EmbeddingProvider.OPENAI, EmbeddingProvider.BEDROCK) and EMBEDDING_ASYNC_CONFIG["enabled"]:
+            embedding_vectors = embed_texts(
+                config.provider, config.model_name, texts,
+                embedding_function=embedding_function,
+                progress_callback=progress_callback
+            )
+        elif config.provider == EmbeddingProvider.OPENAI:
+            # 按token数打包，每批一次请求
+            embedding_vectors = []
+            for batch in token_batches(texts, config.model_name):
+                embedding_vectors.extend(embedding_function.embed_documents(batch))
+        elif config.provider == EmbeddingProvider.HUGGINGFACE:
+            embedding_vectors = self._embed_length_sorted(embedding_function, texts)
+        elif config.provider == EmbeddingProvider.BEDROCK:
+            embedding_vectors = self._embed_concurrent(embedding_function, texts)
+        elif config.provider == EmbeddingProvider.ONNX:
+            embedding_vectors = embedding_function.embed_documents(texts)
         else:
-            # 对其他提供商保持原有的逐个处理逻辑
-            for chunk in chunks:
-                embedding_vector = embedding_function.embed_query(chunk["content"])
-                metadata = {
-                    "chunk_id": chunk["metadata"]["chunk_id"],
-                    "page_number": chunk["metadata"]["page_number"],
-                    "page_range": chunk["metadata"]["page_range"],
-                    "content": chunk["content"],
-                    "word_count": chunk["metadata"]["word_count"],
-                    # "chunking_method": input_data.get("chunking_method", "loaded"),
-                    "total_chunks": len(chunks),
-                    "embedding_provider": config.provider,
-                    "embedding_model": config.model_name,
-                    "embedding_timestamp": datetime.now().isoformat(),
-                    "vector_dimension": len(embedding_vector),
-                    "filename": filename  # 添加文件名到metadata
-                }
-                
-                embedding_result = {
-                    "embedding": embedding_vector,
-                    "metadata": metadata
-                }
-                results.append(embedding_result)
+            embedding_vectors = [embedding_function.embed_query(text) for text in texts]
+        return embedding_vectors
+
+    def _cache_get(self, config: EmbeddingConfig, texts: list, kind: str) -> list:
+        # 缓存读取失败不影响嵌入，按全部未命中处理
+        if self.cache is None:
+            return [None] * len(texts)
+        try:
+            return self.cache.get_many(config.provider, EmbeddingFactory.model_key(config.provider, config.model_name), texts, kind)
+        except Exception as e:
+            logger.error(f"Error reading embedding cache: {str(e)}")
+            return [None] * len(texts)
+
+    def _cache_put(self, config: EmbeddingConfig, texts: list, vectors: list, kind: str) -> None:
+        if self.cache is None:
+            return
+        try:
+            self.cache.put_many(config.provider, EmbeddingFactory.model_key(config.provider, config.model_name), texts, vectors, kind)
+        except Exception as e:
+            logger.error(f"Error writing embedding cache: {str(e)}")
+
+    @staticmethod
+    def _embed_length_sorted(embedding_function, texts: list, batch_size: int = None) -> list:
+        """
+        按文本长度排序后分批调用 embed_documents，同一批内长度相近，减少padding带来的无效计算；
+        结果按原顺序返回
         
-        # 返回结果和空的metadata（因为metadata已经包含在每个embedding中）
-        return results, {}
+        参数:
+            embedding_function: 嵌入函数对象
+            texts: 文本列表
+            batch_size: 每批文本数，默认读取配置
+            
+        返回:
+            与 texts 顺序一致的向量列表
+        """
+        batch_size = batch_size or EMBEDDING_BATCH_CONFIG["huggingface_batch_size"]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch_vectors = embedding_function.embed_documents([texts[i] for i in indices])
+            for i, vector in zip(indices, batch_vectors):
+                vectors[i] = vector
+        return vectors
 
-    def save_embeddings(self, doc_name: str, embeddings: list) -> str:
+    @staticmethod
+    def _embed_concurrent(embedding_function, texts: list, concurrency: int = None, rate_limiter: RateLimiter = None) -> list:
         """
-        保存嵌入向量到JSON文件
+        未启用异步执行器时，用线程并发地逐条调用 embed_query（Bedrock 嵌入接口每次只接受一条文本），
+        每个请求先从共享限流器获取令牌；结果按原顺序返回，任一请求失败时抛出异常
+        
+        参数:
+            embedding_function: 嵌入函数对象
+            texts: 文本列表
+            concurrency: 并发请求数，默认读取配置
+            rate_limiter: 限流器，默认使用进程内共享的Bedrock请求数预算
+            
+        返回:
+            与 texts 顺序一致的向量列表
+        """
+        concurrency = concurrency or EMBEDDING_BATCH_CONFIG["bedrock_concurrency"]
+        rate_limiter = rate_limiter or provider_limiters(EmbeddingProvider.BEDROCK.value)[0]
+        
+        def embed(text):
+            rate_limiter.acquire()
+            return embedding_function.embed_query(text)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(texts)))) as executor:
+            return list(executor.map(embed, texts))
+
+    def save_embeddings(self, doc_name: str, embeddings: list, file_format: str = None) -> str:
+        """
+        保存嵌入向量到 02-embedded-docs
         
         参数:
             doc_name: 文档名称
             embeddings: 嵌入向量列表
+            file_format: json（文本格式）或 npy（float32向量矩阵 + JSONL元数据），默认读取配置
             
         返回:
-            保存的文件路径
+            保存的文件路径（二进制格式为 .npy 向量文件）
         """
-        os.makedirs("02-embedded-docs", exist_ok=True)
+        os.makedirs(EMBEDDED_DOCS_DIR, exist_ok=True)
         
         # 获取第一个embedding的元数据
         first_embedding = embeddings[0]
@@ -143,8 +291,7 @@ class EmbeddingService:
             base_name += '.pdf'
         
         # 构建新的文件名：基础名称_provider_时间戳
-        filename = f"{base_name.replace('.pdf', '')}_{provider}_{timestamp}.json"
-        filepath = os.path.join("02-embedded-docs", filename)
+        path_base = os.path.join(EMBEDDED_DOCS_DIR, f"{base_name.replace('.pdf', '')}_{provider}_{timestamp}")
         
         # 从第一个embedding中获取配置信息
         config_info = {
@@ -156,35 +303,8 @@ class EmbeddingService:
             "vector_dimension": first_embedding["metadata"]["vector_dimension"]
         }
         
-        class CompactJSONEncoder(json.JSONEncoder):
-            """自定义JSON编码器，用于优化嵌入向量的存储格式"""
-            def default(self, obj):
-                if isinstance(obj, datetime):
-                    return obj.isoformat()
-                return super().default(obj)
-            
-            def encode(self, obj):
-                # 将 embedding 数组转换为单行，其他保持格式化
-                def format_list(lst):
-                    if isinstance(lst, list):
-                        # 检查是否为 embedding 数组（通过检查第一个元素是否为数字）
-                        if lst and isinstance(lst[0], (int, float)):
-                            return '[' + ','.join(map(str, lst)) + ']'
-                        return [format_list(item) for item in lst]
-                    elif isinstance(lst, dict):
-                        return {k: format_list(v) for k, v in lst.items()}
-                    return lst
-                
-                return super().encode(format_list(obj))
-        
         # 保存数据，配置信息放在顶层
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump({
-                **config_info,  # 配置信息放在顶层
-                "embeddings": embeddings
-            }, f, ensure_ascii=False, indent=2, cls=CompactJSONEncoder)
-            
-        return filepath
+        return write_embedding_file(path_base, config_info, embeddings, file_format=file_format)
 
     def create_single_embedding(self, text: str, provider: str, model: str) -> list:
         """
@@ -199,8 +319,51 @@ class EmbeddingService:
             嵌入向量列表
         """
         config = EmbeddingConfig(provider=provider, model_name=model)
+        cached = self._cache_get(config, [text], "query")[0]
+        if cached is not None:
+            return cached
+        embedding_function = self.embedding_factory.create_embedding_function(config)
+        vector = embedding_function.embed_query(text)
+        self._cache_put(config, [text], [vector], "query")
+        return vector
+
+    def create_query_embeddings(self, texts: list, provider: str, model: str) -> list:
+        """
+        批量创建查询文本的嵌入向量：先查缓存，未命中的文本去重后一次批量嵌入
+        
+        参数:
+            texts: 查询文本列表
+            provider: 嵌入提供商
+            model: 嵌入模型名称
+            
+        返回:
+            与 texts 顺序一致的向量列表
+        """
+        config = EmbeddingConfig(provider=provider, model_name=model)
+        vectors = self._cache_get(config, texts, "query")
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if not missing:
+            return vectors
+        
         embedding_function = self.embedding_factory.create_embedding_function(config)
-        return embedding_function.embed_query(text)
+        # Bedrock 的查询与文档使用不同的 input_type，查询仍逐条调用 embed_query（并发）；
+        # 其他提供商的 embed_query 与单条 embed_documents 等价，直接批量嵌入
+        if config.provider == EmbeddingProvider.BEDROCK:
+            new_vectors = self._embed_concurrent(embedding_function, missing)
+        elif config.provider == EmbeddingProvider.OPENAI:
+            new_vectors = []
+            for batch in token_batches(missing, config.model_name):
+                new_vectors.extend(embedding_function.embed_documents(batch))
+        elif config.provider == EmbeddingProvider.HUGGINGFACE:
+            new_vectors = self._embed_length_sorted(embedding_function, missing)
+        elif config.provider == EmbeddingProvider.ONNX:
+            new_vectors = embedding_function.embed_documents(missing)
+        else:
+            new_vectors = [embedding_function.embed_query(text) for text in missing]
+        self._cache_put(config, missing, new_vectors, "query")
+        
+        embedded = dict(zip(missing, new_vectors))
+        return [vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)]
 
     def get_document_embedding_config(self, collection_name: str) -> EmbeddingConfig:
         """
@@ -220,17 +383,15 @@ class EmbeddingService:
             doc_name = collection_name.split('_')[0]
             
             # 查找对应的embedding文件
-            embedded_docs_dir = "02-embedded-docs"
-            for filename in os.listdir(embedded_docs_dir):
-                if filename.endswith('.json'):
-                    with open(os.path.join(embedded_docs_dir, filename), 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        # 使用 filename 而不是 document_name
-                        if data.get("filename") == doc_name:
-                            return EmbeddingConfig(
-                                provider=data.get("embedding_provider"),
-                                model_name=data.get("embedding_model")
-                            )
+            for filename in os.listdir(EMBEDDED_DOCS_DIR):
+                if is_embedding_file(filename):
+                    data = read_embedding_header(os.path.join(EMBEDDED_DOCS_DIR, filename))
+                    # 使用 filename 而不是 document_name
+                    if data.get("filename") == doc_name:
+                        return EmbeddingConfig(
+                            provider=data.get("embedding_provider"),
+                            model_name=data.get("embedding_model")
+                        )
                             
             raise ValueError(f"No matching embedding configuration found for collection: {collection_name}")
         except Exception as e:
@@ -238,12 +399,76 @@ class EmbeddingService:
 
 class EmbeddingFactory:
     """
-    嵌入工厂类，负责创建不同提供商的嵌入函数
+    嵌入工厂类，负责创建不同提供商的嵌入函数；
+    嵌入函数由进程内的模型注册表缓存，同一 (provider, model) 只加载一次
     """
+    @staticmethod
+    def uses_onnx(provider: str) -> bool:
+        """该提供商的模型是否由 ONNX Runtime 执行"""
+        return provider == EmbeddingProvider.ONNX or (
+            provider == EmbeddingProvider.HUGGINGFACE and ONNX_EMBEDDING_CONFIG["huggingface_backend"] == "onnx"
+        )
+
+    @staticmethod
+    def model_key(provider: str, model_name: str) -> str:
+        """
+        注册表和嵌入缓存中使用的模型名称：由 ONNX Runtime 执行时附加后端和量化方式，
+        避免 torch、ONNX fp32 和 int8 的向量互相命中
+
+        参数:
+            provider: 嵌入提供商
+            model_name: 嵌入模型名称
+
+        返回:
+            如 all-MiniLM-L6-v2、all-MiniLM-L6-v2@onnx-fp32、all-MiniLM-L6-v2@onnx-int8
+        """
+        if not EmbeddingFactory.uses_onnx(provider):
+            return model_name
+        return f"{model_name}@onnx-{'int8' if ONNX_EMBEDDING_CONFIG['quantize'] else 'fp32'}"
+
     @staticmethod
     def create_embedding_function(config: EmbeddingConfig):
         """
-        根据配置创建嵌入函数
+        根据配置获取嵌入函数，已加载时直接返回注册表中的实例
+        
+        参数:
+            config: 嵌入配置对象
+            
+        返回:
+            嵌入函数对象
+            
+        异常:
+            ValueError: 当提供商不支持时抛出
+        """
+        return embedding_model_registry.get(
+            config.provider,
+            EmbeddingFactory.model_key(config.provider, config.model_name),
+            lambda: EmbeddingFactory.load_embedding_function(config)
+        )
+
+    @staticmethod
+    def preload(models: list = None) -> dict:
+        """
+        预先加载嵌入模型，默认加载 EMBEDDING_PRELOAD_MODELS 中配置的模型
+        
+        参数:
+            models: (provider, model) 列表
+            
+        返回:
+            每个模型的加载结果
+        """
+        models = EMBEDDING_REGISTRY_CONFIG["preload"] if models is None else models
+        # 注册表按 model_key 登记，加载时仍使用原始模型名称
+        model_names = {(provider, EmbeddingFactory.model_key(provider, model_name)): model_name for provider, model_name in models}
+        return embedding_model_registry.preload(
+            list(model_names),
+            lambda provider, key: EmbeddingFactory.load_embedding_function(EmbeddingConfig(provider, model_names[(provider, key)]))
+        )
+
+    @staticmethod
+    def load_embedding_function(config: EmbeddingConfig):
+        """
+        按配置新建嵌入函数（加载模型权重或创建API客户端），不经过注册表
         
         参数:
             config: 嵌入配置对象
@@ -258,6 +483,7 @@ class EmbeddingFactory:
             bedrock_client = boto3.client(
                 service_name='bedrock-runtime',
                 region_name=config.aws_region,
+                endpoint_url=EMBEDDING_ASYNC_CONFIG["bedrock_endpoint_url"],
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
                 aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
             )
@@ -269,12 +495,19 @@ class EmbeddingFactory:
         elif config.provider == EmbeddingProvider.OPENAI:
             return OpenAIEmbeddings(
                 model=config.model_name,
-                openai_api_key=os.getenv('OPENAI_API_KEY')
+                openai_api_key=os.getenv('OPENAI_API_KEY'),
+                openai_api_base=EMBEDDING_ASYNC_CONFIG["openai_base_url"]
             )
             
+        elif EmbeddingFactory.uses_onnx(config.provider):
+            # 延迟导入，未安装 onnxruntime 时不影响其他提供商
+            from services.onnx_embedding import OnnxEmbeddings
+            return OnnxEmbeddings(config.model_name)
+            
         elif config.provider == EmbeddingProvider.HUGGINGFACE:
             return HuggingFaceEmbeddings(
-                model_name=config.model_name
+                model_name=config.model_name,
+                encode_kwargs={"batch_size": EMBEDDING_BATCH_CONFIG["huggingface_batch_size"]}
             )
             
         raise ValueError(f"Unsupported embedding provider: {config.provider}")
\ No newline at end of file
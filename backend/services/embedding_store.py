@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+import numpy as np
+from utils.config import EMBEDDING_STORE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+EMBEDDED_DOCS_DIR = "02-embedded-docs"
+
+# 每行元数据中只保存逐块变化的字段，提供商、模型、维度和文件名保存在头部
+ROW_FIELDS = ("chunk_id", "page_number", "page_range", "content", "word_count", "total_chunks", "embedding_timestamp")
+
+def sidecar_path(vectors_path: str) -> str:
+    """
+    获取二进制格式向量文件对应的元数据文件路径
+
+    参数:
+        vectors_path: .npy 向量文件路径
+
+    返回:
+        同名的 .meta.jsonl 元数据文件路径
+    """
+    return f"{vectors_path[:-len('.npy')]}.meta.jsonl"
+
+def is_embedding_file(filename: str) -> bool:
+    """判断 02-embedded-docs 中的文件是否为嵌入文档（JSON 或 .npy 向量文件）"""
+    return filename.endswith(".json") or filename.endswith(".npy")
+
+def document_files(path: str) -> List[str]:
+    """
+    获取嵌入文档涉及的全部文件，二进制格式包含向量文件和元数据文件
+
+    参数:
+        path: 嵌入文档路径
+
+    返回:
+        文件路径列表
+    """
+    if path.endswith(".npy"):
+        return [path, sidecar_path(path)]
+    return [path]
+
+def write_embedding_file(path_base: str, header: Dict[str, Any], embeddings: List[Dict[str, Any]], file_format: str = None) -> str:
+    """
+    按指定格式写出嵌入文档
+
+    - json: 原有格式，所有字段和向量以文本保存在一个JSON文件中
+    - npy: float32 向量矩阵 (N, dim) 保存为 .npy，可直接内存映射；
+      同名的 .meta.jsonl 第一行为头部信息，之后每行一个chunk的元数据
+
+    参数:
+        path_base: 不含扩展名的输出路径
+        header: 顶层配置信息（filename、embedding_provider、embedding_model、vector_dimension 等）
+        embeddings: 嵌入结果列表，每个元素包含 embedding 和 metadata
+        file_format: json 或 npy，默认读取配置
+
+    返回:
+        嵌入文档路径（json 文件或 .npy 向量文件）
+    """
+    file_format = file_format or EMBEDDING_STORE_CONFIG["format"]
+    if file_format == "json":
+        return _write_json(f"{path_base}.json", header, embeddings)
+    if file_format == "npy":
+        return _write_npy(f"{path_base}.npy", header, embeddings)
+    raise ValueError(f"Unsupported embedding file format: {file_format}")
+
+def _write_json(path: str, header: Dict[str, Any], embeddings: List[Dict[str, Any]]) -> str:
+    # 将 embedding 数组写为单行，其他字段保持缩进格式
+    def format_list(value):
+        if isinstance(value, list):
+            if value and isinstance(value[0], (int, float)):
+                return '[' + ','.join(map(str, value)) + ']'
+            return [format_list(item) for item in value]
+        elif isinstance(value, dict):
+            return {k: format_list(v) for k, v in value.items()}
+        return value
+
+    class CompactJSONEncoder(json.JSONEncoder):
+        """自定义JSON编码器，用于优化嵌入向量的存储格式"""
+        def default(self, obj):
+            if isinstance(obj, datetime):
+                return obj.isoformat()
+            return super().default(obj)
+
+        def encode(self, obj):
+            return super().encode(format_list(obj))
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            **header,  # 配置信息放在顶层
+            "embeddings": embeddings
+        }, f, ensure_ascii=False, indent=2, cls=CompactJSONEncoder)
+    return path
+
+def _write_npy(path: str, header: Dict[str, Any], embeddings: List[Dict[str, Any]]) -> str:
+    vectors = np.asarray([embedding["embedding"] for embedding in embeddings], dtype=np.float32)
+    if vectors.ndim != 2:
+        vectors = vectors.reshape(len(embeddings), -1)
+    meta_path = sidecar_path(path)
+    head = {
+        **header,
+        "format": "npy",
+        "vectors_file": os.path.basename(path),
+        "total_vectors": int(vectors.shape[0]),
+        "document_filename": embeddings[0]["metadata"].get("filename", header.get("filename", "")) if embeddings else header.get("filename", "")
+    }
+
+    # 先写元数据再写向量，.npy 出现即表示文档完整；两者都先写临时文件再原子替换
+    with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+        f.write(json.dumps(head, ensure_ascii=False) + "\n")
+        for embedding in embeddings:
+            metadata = embedding["metadata"]
+            row = {field: metadata.get(field) for field in ROW_FIELDS}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+    with open(f"{path}.tmp", "wb") as f:
+        np.save(f, vectors)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def read_embedding_header(path: str) -> Dict[str, Any]:
+    """
+    读取嵌入文档的顶层配置信息；二进制格式只读取元数据文件的第一行
+
+    参数:
+        path: 嵌入文档路径
+
+    返回:
+        顶层配置信息字典（不含 embeddings）
+    """
+    if path.endswith(".npy"):
+        with open(sidecar_path(path), "r", encoding="utf-8") as f:
+            return json.loads(f.readline())
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data.pop("embeddings", None)
+    return data
+
+def open_embedding_file(path: str) -> Dict[str, Any]:
+    """
+    打开嵌入文档用于顺序读取
+
+    二进制格式的向量以只读内存映射方式打开，元数据按行惰性读取，驻留内存的只有当前处理的部分；
+    JSON 格式向后兼容，需要整体解析，向量转换为 float32 矩阵。
+
+    参数:
+        path: 嵌入文档路径
+
+    返回:
+        顶层配置信息，外加 vectors（(N, dim) float32 数组）和 rows（按顺序产生每个chunk元数据的迭代器）
+    """
+    if path.endswith(".npy"):
+        vectors = np.load(path, mmap_mode="r")
+        data = read_embedding_header(path)
+        rows = _iter_sidecar_rows(sidecar_path(path))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or "embeddings" not in data:
+            raise ValueError("Invalid embedding file format: missing 'embeddings' key")
+        embeddings = data.pop("embeddings")
+        rows = iter([embedding["metadata"] for embedding in embeddings])
+        vectors = np.asarray([embedding.get("embedding", []) for embedding in embeddings], dtype=np.float32)
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(len(embeddings), -1)
+    data["vectors"] = vectors
+    data["rows"] = rows
+    return data
+
+def load_embedding_file(path: str) -> Dict[str, Any]:
+    """
+    加载嵌入文档，元数据全部读入列表，向量与 open_embedding_file 相同（二进制格式为内存映射）
+
+    参数:
+        path: 嵌入文档路径
+
+    返回:
+        顶层配置信息，外加 vectors（(N, dim) float32 数组）和 rows（每个chunk的元数据列表）
+    """
+    data = open_embedding_file(path)
+    data["rows"] = list(data["rows"])
+    if len(data["rows"]) != data["vectors"].shape[0]:
+        raise ValueError(f"Embedding metadata has {len(data['rows'])} rows but {path} has {data['vectors'].shape[0]} vectors")
+    return data
+
+def _iter_sidecar_rows(meta_path: str) -> Iterator[Dict[str, Any]]:
+    with open(meta_path, "r", encoding="utf-8") as f:
+        f.readline()  # 跳过头部
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_embeddings(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    将 load_embedding_file 的结果还原为原有的 {"embedding", "metadata"} 结构，
+    embedding 为向量矩阵的行视图
+
+    参数:
+        data: load_embedding_file 的返回值
+
+    生成:
+        与JSON格式 embeddings 数组元素结构相同的字典
+    """
+    for row, vector in zip(data["rows"], data["vectors"]):
+        metadata = {
+            **row,
+            "embedding_provider": row.get("embedding_provider", data.get("embedding_provider")),
+            "embedding_model": row.get("embedding_model", data.get("embedding_model")),
+            "vector_dimension": row.get("vector_dimension", data.get("vector_dimension")),
+            "filename": row.get("filename", data.get("document_filename", data.get("filename")))
+        }
+        yield {"embedding": vector, "metadata": metadata}
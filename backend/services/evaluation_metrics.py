@@ -0,0 +1,124 @@
+"""
+检索评估指标：由页码构造相关性矩阵，一次计算所有截断位置 k = 1..top_k 的
+recall@k、precision@k、MRR@k、nDCG@k 和 hit-rate@k（二值相关性，按页码判断）。
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+
+METRIC_NAMES = ("recall", "precision", "mrr", "ndcg", "hit_rate")
+
+def pad_pages(pages: List[List[int]], width: int = None, fill: int = -1) -> np.ndarray:
+    """
+    将每个查询的页码列表补齐为矩阵
+
+    参数:
+        pages: 每个查询的页码列表
+        width: 矩阵列数，默认为最长列表的长度（至少为1），更长的列表被截断
+        fill: 填充值
+
+    返回:
+        (查询数, width) 的 int64 矩阵
+    """
+    width = width or max((len(row) for row in pages), default=0) or 1
+    matrix = np.full((len(pages), width), fill, dtype=np.int64)
+    for i, row in enumerate(pages):
+        row = row[:width]
+        matrix[i, :len(row)] = row
+    return matrix
+
+def page_relevance(found_pages: np.ndarray, expected_pages: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按位置判断找到的页码是否相关
+
+    参数:
+        found_pages: (查询数, K) 的页码矩阵，不足的位置为 -1
+        expected_pages: (查询数, M) 的期望页码矩阵，不足的位置为与 -1 不同的填充值
+
+    返回:
+        (relevant, first)：relevant 表示该位置的页码在期望页码中；
+        first 表示相关且该页码在此前的位置中未出现过（同一页的多个chunk只计一次）
+    """
+    width = found_pages.shape[1]
+    relevant = (found_pages[:, :, None] == expected_pages[:, None, :]).any(axis=2)
+    earlier = np.tril(np.ones((width, width), dtype=bool), k=-1)
+    repeated = ((found_pages[:, :, None] == found_pages[:, None, :]) & earlier).any(axis=2)
+    return relevant, relevant & ~repeated
+
+def relevance_matrix(found_pages: List[List[int]], expected_pages: List[List[int]], top_k: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由 found_pages / expected_pages 构造二值相关性矩阵
+
+    参数:
+        found_pages: 每个查询按排名排列的找到页码
+        expected_pages: 每个查询的期望页码
+        top_k: 矩阵列数，默认为最长结果列表的长度
+
+    返回:
+        (relevance, num_relevant)：relevance 为 (查询数, top_k) 的布尔矩阵，重复页码只在第一次出现时计为相关；
+        num_relevant 为每个查询去重后的期望页码数
+    """
+    found = pad_pages(found_pages, top_k, fill=-1)
+    expected = pad_pages(expected_pages, fill=-2)
+    _, relevance = page_relevance(found, expected)
+    num_relevant = np.array([len(set(pages)) for pages in expected_pages], dtype=np.float64)
+    return relevance, num_relevant
+
+def metric_curves(relevance: np.ndarray, num_relevant: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    一次计算每个查询在所有截断位置的指标
+
+    参数:
+        relevance: (查询数, K) 的布尔相关性矩阵
+        num_relevant: 每个查询的相关页码总数
+
+    返回:
+        指标名 → (查询数, K) 矩阵，第 j 列为 @k=j+1 的值
+    """
+    width = relevance.shape[1]
+    ranks = np.arange(1, width + 1, dtype=np.float64)
+    relevant_so_far = np.cumsum(relevance, axis=1, dtype=np.float64)
+
+    # 第一个相关结果的名次，没有相关结果时为 inf
+    first_rank = np.where(relevance.any(axis=1), relevance.argmax(axis=1) + 1, np.inf)
+    reciprocal_rank = np.where(ranks[None, :] >= first_rank[:, None], 1.0 / first_rank[:, None], 0.0)
+
+    discounts = 1.0 / np.log2(ranks + 1)
+    dcg = np.cumsum(relevance * discounts, axis=1)
+    ideal_hits = np.minimum(ranks[None, :], num_relevant[:, None])
+    ideal_cumulative = np.concatenate([[0.0], np.cumsum(discounts)])
+    idcg = ideal_cumulative[ideal_hits.astype(np.int64)]
+
+    return {
+        "recall": np.divide(relevant_so_far, num_relevant[:, None], out=np.zeros_like(relevant_so_far), where=num_relevant[:, None] > 0),
+        "precision": relevant_so_far / ranks[None, :],
+        "mrr": reciprocal_rank,
+        "ndcg": np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0),
+        "hit_rate": (relevant_so_far > 0).astype(np.float64)
+    }
+
+def mean_metrics(relevance: np.ndarray, num_relevant: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    所有查询的平均指标
+
+    返回:
+        指标名 → 长度为 K 的数组，第 j 个元素为 @k=j+1 的平均值
+    """
+    return {name: values.mean(axis=0) for name, values in metric_curves(relevance, num_relevant).items()}
+
+def evaluate_rankings(found_pages: List[List[int]], expected_pages: List[List[int]], top_k: int) -> Dict[str, Dict[int, float]]:
+    """
+    计算 k = 1..top_k 的平均 recall、precision、MRR、nDCG 和 hit-rate
+
+    参数:
+        found_pages: 每个查询按排名排列的找到页码
+        expected_pages: 每个查询的期望页码
+        top_k: 最大截断位置
+
+    返回:
+        指标名 → {k: 平均值}
+    """
+    if not found_pages:
+        return {name: {} for name in METRIC_NAMES}
+    relevance, num_relevant = relevance_matrix(found_pages, expected_pages, top_k)
+    means = mean_metrics(relevance, num_relevant)
+    return {name: {k: float(means[name][k - 1]) for k in range(1, top_k + 1)} for name in METRIC_NAMES}
@@ -1,15 +1,457 @@
 import pandas as pd
+import numpy as np
+import asyncio
+import hashlib
 import json
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator, Optional
 import logging
+from utils.config import EVALUATION_CONFIG
+from services.evaluation_metrics import METRIC_NAMES, evaluate_rankings, mean_metrics, pad_pages, page_relevance
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_RESULTS_DIR = Path("06-evaluation-result")
+# 参数扫描的原始检索结果缓存，每个collection一个子目录
+RAW_HITS_DIR = EVALUATION_RESULTS_DIR / "raw-hits"
+
+def _to_builtin(value: Any) -> Any:
+    """将 pandas/numpy 标量转换为可 JSON 序列化的 Python 类型"""
+    return value.item() if hasattr(value, "item") else value
+
+def sweep_scores(found_pages: np.ndarray, scores: np.ndarray, expected_pages: List[List[int]],
+                 top_ks: List[int], thresholds: List[float]) -> Dict[str, np.ndarray]:
+    """
+    由一次按最大 top_k、不设阈值检索得到的原始结果，向量化计算每个 (threshold, top_k) 组合下的平均 score_hit / score_find。
+    每个查询的结果按得分降序排列，因此阈值过滤和 top_k 截断后剩下的都是前缀，
+    前 L 个结果的命中数可以从累加和中直接取出，不需要重新检索或逐个组合循环。
+
+    参数:
+        found_pages: (查询数, 最大top_k) 的页码矩阵，不足的位置为 -1
+        scores: 与 found_pages 对应的相似度，按行降序，不足的位置为 -inf
+        expected_pages: 每个查询的期望页码
+        top_ks: 要比较的 top_k 列表
+        thresholds: 要比较的相似度阈值列表
+
+    返回:
+        score_hit、score_find 以及 recall、precision、mrr、ndcg、hit_rate（见 evaluation_metrics）:
+        (len(thresholds), len(top_ks)) 的平均分数矩阵
+    """
+    num_queries, max_k = found_pages.shape
+    if min(top_ks) < 1 or max(top_ks) > max_k:
+        raise ValueError(f"top_ks must be between 1 and {max_k}")
+    expected = pad_pages(expected_pages, fill=-2)
+    expected_counts = np.array([len(pages) for pages in expected_pages], dtype=np.float64)
+    num_relevant = np.array([len(set(pages)) for pages in expected_pages], dtype=np.float64)
+
+    # relevant: 该位置的页码在期望页码中；first: 且该页码在此前的结果中未出现过（score_find 按去重后的页码计算）
+    relevant, first = page_relevance(found_pages, expected)
+    cum_hits = np.concatenate([np.zeros((num_queries, 1)), np.cumsum(relevant, axis=1)], axis=1)
+    cum_found = np.concatenate([np.zeros((num_queries, 1)), np.cumsum(first, axis=1)], axis=1)
+
+    # length[t, k, q]: 阈值 t、top_k k 时查询 q 保留的结果数
+    above = (scores[None, :, :] >= np.asarray(thresholds, dtype=np.float64)[:, None, None]).sum(axis=2)
+    length = np.minimum(np.asarray(top_ks)[None, :, None], above[:, None, :])
+    rows = np.arange(num_queries)[None, None, :]
+    hits = cum_hits[rows, length]
+    score_hit = np.divide(hits, length, out=np.zeros(length.shape), where=length > 0)
+    score_find = cum_found[rows, length] / expected_counts
+    averages = {"score_hit": score_hit.mean(axis=2), "score_find": score_find.mean(axis=2)}
+
+    # 排名指标：每个阈值下把低于阈值的位置置为不相关，一次得到所有截断位置的平均值，再取出各 top_k
+    columns = np.asarray(top_ks) - 1
+    per_threshold = [
+        mean_metrics(first & (np.arange(max_k)[None, :] < above[t][:, None]), num_relevant)
+        for t in range(len(thresholds))
+    ]
+    for name in METRIC_NAMES:
+        averages[name] = np.array([metrics[name][columns] for metrics in per_threshold])
+    return averages
+
+def invalidate_raw_hits(collection_name: str) -> None:
+    """
+    删除collection的参数扫描原始结果缓存，在collection被删除、重建或增量写入后调用；
+    缓存键中已包含collection版本，这里只是及时清理不再可能命中的文件
+
+    参数:
+        collection_name: collection名称
+    """
+    shutil.rmtree(RAW_HITS_DIR / Path(collection_name).name, ignore_errors=True)
+
+class EvaluationRunMismatchError(ValueError):
+    """
+    指定的 run_id 已有结果，但其CSV、检索参数或collection版本与本次请求不同，继续会混入不同设置下的结果；
+    由接口层转换为400响应，调用方可以使用 resume=false 重新评估
+    """
+    pass
 
 class EvaluationService:
+    """
+    检索评估服务：按CSV中每个披露要求检索collection，比较找到的页码与期望页码
+
+    评估以 run 为单位写入 06-evaluation-result/<run_id>/：
+    meta.json 记录参数和状态，results.jsonl 每完成一行追加一条结果，summary.json 在全部完成后写入。
+    run_id 由CSV内容、检索参数和collection版本计算，同样的输入再次提交时跳过 results.jsonl 中已完成的行，从中断处继续；
+    collection被重建或增量写入后版本变化，得到新的 run。
+    """
     def __init__(self):
-        self.output_dir = Path("06-evaluation-result")
+        self.output_dir = EVALUATION_RESULTS_DIR
         self.output_dir.mkdir(exist_ok=True)
 
+    @staticmethod
+    def _parse_rows(file_content: bytes) -> List[Dict[str, Any]]:
+        """
+        读取CSV并解析每行的查询文本和期望页码，没有有效页码的行跳过
+
+        参数:
+            file_content: CSV文件内容
+
+        返回:
+            包含 index（CSV中的行号）、row 和 expected_pages 的列表
+        """
+        df = pd.read_csv(pd.io.common.BytesIO(file_content))
+
+        # 合并文本内容
+        df['combined_text'] = df.apply(
+            lambda row: f"{row['ID']} {row['Disclosure Requirement']} {row['Corresponding Text']}",
+            axis=1
+        )
+
+        rows = []
+        for index, row in df.iterrows():
+            # 解析页码
+            page_numbers = str(row['Page Number'])
+            expected_pages = [
+                int(x.strip())
+                for x in page_numbers.split(',')
+                if x.strip().isdigit()
+            ]
+            if expected_pages:
+                rows.append({"index": int(index), "row": row, "expected_pages": expected_pages})
+        return rows
+
+    @staticmethod
+    def _score_row(row: Any, expected_pages: List[int], search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        计算单行的评估分数
+
+        参数:
+            row: CSV行
+            expected_pages: 期望页码
+            search_results: 检索结果
+
+        返回:
+            评估结果条目
+        """
+        found_pages = [int(result['metadata']['page']) for result in search_results]
+
+        # 计算分数
+        hits = sum(1 for page in found_pages if page in expected_pages)
+        score_hit = hits / len(found_pages) if found_pages else 0
+        score_find = len(set(found_pages) & set(expected_pages)) / len(expected_pages)
+
+        return {
+            "id": _to_builtin(row['ID']),
+            "requirement": _to_builtin(row['Disclosure Requirement']),
+            "expected_pages": expected_pages,
+            "found_pages": found_pages,
+            "score_hit": score_hit,
+            "score_find": score_find,
+            "compliance_status": _to_builtin(row['Compliance Status'])
+        }
+
+    @staticmethod
+    def _summarize(entries: List[Dict[str, Any]], top_k: int = None) -> Dict[str, Any]:
+        """
+        按CSV行号排序结果并计算平均分数，以及 k = 1..top_k 的 recall/precision/MRR/nDCG/hit-rate
+
+        参数:
+            entries: 评估结果条目
+            top_k: 最大截断位置，默认为最长结果列表的长度
+
+        返回:
+            包含 results、average_scores、metrics 和 total_queries 的字典
+        """
+        if not entries:
+            raise ValueError("No valid queries found in the CSV file")
+        results = [
+            {key: value for key, value in entry.items() if key != "index"}
+            for entry in sorted(entries, key=lambda entry: entry["index"])
+        ]
+        return {
+            "results": results,
+            "average_scores": {
+                "score_hit": sum(entry["score_hit"] for entry in results) / len(results),
+                "score_find": sum(entry["score_find"] for entry in results) / len(results)
+            },
+            "metrics": evaluate_rankings(
+                [entry["found_pages"] for entry in results],
+                [entry["expected_pages"] for entry in results],
+                top_k or max(1, max(len(entry["found_pages"]) for entry in results))
+            ),
+            "total_queries": len(results)
+        }
+
+    @staticmethod
+    def make_run_id(file_content: bytes, collection_id: str, top_k: int, threshold: float, collection_version: Dict[str, Any] = None) -> str:
+        """由CSV内容、检索参数和collection版本计算 run_id，同样的输入得到同样的 run_id"""
+        digest = hashlib.sha256(file_content)
+        digest.update(json.dumps([collection_id, top_k, threshold, collection_version], sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def collection_version(collection_id: str) -> Dict[str, Any]:
+        """获取collection当前内容的版本标记（见 SearchService.collection_version）"""
+        from services.search_service import SearchService
+        return SearchService().collection_version(collection_id)
+
+    async def resolve_run(
+        self,
+        file_content: bytes,
+        collection_id: str,
+        top_k: int,
+        threshold: float,
+        run_id: str = None,
+        resume: bool = True
+    ) -> Dict[str, Any]:
+        """
+        确定本次评估的 run，并检查继续该 run 是否安全
+
+        参数:
+            file_content: CSV文件内容
+            collection_id: 要搜索的集合ID
+            top_k: 返回的最大结果数
+            threshold: 相似度阈值
+            run_id: 评估 run ID，默认由CSV内容、参数和collection版本计算
+            resume: 是否继续该 run 中已完成的行
+
+        返回:
+            包含 run_id、params（写入 meta.json 的参数）和 previous（已有 run 的状态，没有时为 None）的字典
+
+        异常:
+            ValueError: run_id 不合法或collection不存在
+            EvaluationRunMismatchError: resume 时已有 run 的参数与本次请求不一致
+        """
+        version = await asyncio.to_thread(self.collection_version, collection_id)
+        params = {
+            "collection_id": collection_id,
+            "top_k": top_k,
+            "threshold": threshold,
+            "csv_sha256": hashlib.sha256(file_content).hexdigest(),
+            "collection_version": version
+        }
+        run_id = run_id or self.make_run_id(file_content, collection_id, top_k, threshold, version)
+        previous = self.get_run(run_id)
+        if resume and previous and previous.get("status") != "completed" and previous.get("completed"):
+            changed = [key for key, value in params.items() if previous.get(key) != value]
+            if changed:
+                raise EvaluationRunMismatchError(
+                    f"Evaluation run {run_id} was made with different {', '.join(changed)}; "
+                    f"submit with resume=false to start it over"
+                )
+        return {"run_id": run_id, "params": params, "previous": previous}
+
+    @staticmethod
+    def _load_completed(results_path: Path) -> Dict[int, Dict[str, Any]]:
+        """
+        读取已完成的结果；进程中断时最后一行可能只写了一半，截断到最后一个完整行
+
+        参数:
+            results_path: results.jsonl 路径
+
+        返回:
+            CSV行号 → 结果条目
+        """
+        if not results_path.exists():
+            return {}
+        data = results_path.read_bytes()
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            with open(results_path, "r+b") as f:
+                f.truncate(len(complete))
+        completed = {}
+        for line in complete.decode("utf-8").splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                completed[entry["index"]] = entry
+        return completed
+
+    def _write_meta(self, run_dir: Path, **fields) -> None:
+        meta_path = run_dir / "meta.json"
+        meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        meta.update(fields, updated_at=datetime.now().isoformat())
+        temp_path = run_dir / "meta.json.tmp"
+        temp_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        temp_path.replace(meta_path)
+
+    def _run_dir(self, run_id: str) -> Path:
+        if not re.fullmatch(r"[A-Za-z0-9_-]+", run_id or ""):
+            raise ValueError(f"Invalid evaluation run id: {run_id}")
+        return self.output_dir / run_id
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取评估 run 的状态
+
+        参数:
+            run_id: 评估 run ID
+
+        返回:
+            meta.json 内容加上已完成行数，run 不存在时为 None
+        """
+        run_dir = self._run_dir(run_id)
+        meta_path = run_dir / "meta.json"
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        results_path = run_dir / "results.jsonl"
+        if results_path.exists():
+            with open(results_path, "rb") as f:
+                meta["completed"] = sum(1 for line in f if line.endswith(b"\n"))
+        else:
+            meta["completed"] = 0
+        return meta
+
+    @staticmethod
+    def _search_rows(rows: List[Dict[str, Any]], collection_id: str, top_k: int, threshold: float) -> List[Dict[str, Any]]:
+        """在工作线程中批量检索一组行并计算分数"""
+        from services.search_service import SearchService
+        search_service = SearchService()
+        search_responses = search_service.search_batch(
+            queries=[item["row"]['combined_text'] for item in rows],
+            collection_id=collection_id,
+            top_k=top_k,
+            threshold=threshold
+        )
+        return [
+            {"index": item["index"], **EvaluationService._score_row(item["row"], item["expected_pages"], response["results"])}
+            for item, response in zip(rows, search_responses)
+        ]
+
+    async def stream_evaluation(
+        self,
+        file_content: bytes,
+        collection_id: str,
+        top_k: int,
+        threshold: float,
+        concurrency: int = None,
+        batch_size: int = None,
+        run_id: str = None,
+        resume: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发执行评估并逐行产出结果：待评估的行按 batch_size 分组，最多 concurrency 组同时在工作线程中检索，
+        每组完成后立即追加写入 results.jsonl 并产出其中每一行的结果
+
+        参数:
+            file_content: CSV文件内容
+            collection_id: 要搜索的集合ID
+            top_k: 返回的最大结果数
+            threshold: 相似度阈值
+            concurrency: 同时检索的组数，默认读取配置
+            batch_size: 每组的行数（一次批量检索），默认读取配置
+            run_id: 评估 run ID，默认由CSV内容、参数和collection版本计算
+            resume: 是否跳过该 run 中已完成的行；已完成的 run 总是重新评估
+
+        生成:
+            事件字典，type 为 start（run 信息）、row（单行结果，resumed 表示来自之前的运行）、
+            error（检索失败的行，重新提交时会重试）或 summary（平均分数、各 k 的排名指标和结果文件路径）
+
+        异常:
+            EvaluationRunMismatchError: resume 时已有 run 的参数与本次请求不一致（见 resolve_run）
+        """
+        concurrency = concurrency or EVALUATION_CONFIG["concurrency"]
+        batch_size = batch_size or EVALUATION_CONFIG["batch_size"]
+        rows = self._parse_rows(file_content)
+        run = await self.resolve_run(file_content, collection_id, top_k, threshold, run_id, resume)
+        run_id, previous = run["run_id"], run["previous"]
+        run_dir = self._run_dir(run_id)
+        run_dir.mkdir(exist_ok=True)
+        results_path = run_dir / "results.jsonl"
+
+        if not resume or (previous and previous.get("status") == "completed"):
+            results_path.unlink(missing_ok=True)
+            (run_dir / "summary.json").unlink(missing_ok=True)
+        completed = self._load_completed(results_path)
+        self._write_meta(
+            run_dir,
+            run_id=run_id,
+            **run["params"],
+            total=len(rows),
+            status="running",
+            started_at=datetime.now().isoformat()
+        )
+
+        start_time = time.time()
+        yield {"type": "start", "run_id": run_id, "total": len(rows), "resumed": len(completed)}
+        for index in sorted(completed):
+            yield {"type": "row", "resumed": True, **completed[index]}
+
+        pending = [item for item in rows if item["index"] not in completed]
+        groups = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        entries = list(completed.values())
+        errors = 0
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(groups))))
+
+        async def run(group: List[Dict[str, Any]]) -> tuple:
+            try:
+                return group, await loop.run_in_executor(executor, self._search_rows, group, collection_id, top_k, threshold), None
+            except Exception as e:
+                return group, None, e
+
+        tasks = [asyncio.ensure_future(run(group)) for group in groups]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                group, group_entries, error = await next_done
+                if error is not None:
+                    # 失败组内的行不写入结果，重新提交时重试
+                    logger.error(f"Error evaluating rows {group[0]['index']}-{group[-1]['index']}: {str(error)}")
+                    errors += len(group)
+                    for item in group:
+                        yield {"type": "error", "index": item["index"], "id": _to_builtin(item["row"]['ID']), "error": str(error)}
+                    continue
+                with open(results_path, "a", encoding="utf-8") as f:
+                    for entry in group_entries:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                entries.extend(group_entries)
+                for entry in group_entries:
+                    yield {"type": "row", **entry}
+        except BaseException:
+            # 客户端断开或任务被取消：已写入的结果保留，未开始的组不再执行
+            self._write_meta(run_dir, status="interrupted", completed=len(entries))
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.time() - start_time
+        if errors:
+            self._write_meta(run_dir, status="incomplete", completed=len(entries), errors=errors)
+            summary = self._summarize(entries, top_k) if entries else {"results": [], "average_scores": {}, "metrics": {}, "total_queries": 0}
+        else:
+            summary = self._summarize(entries, top_k)
+            summary_path = run_dir / "summary.json"
+            summary_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+            self._write_meta(run_dir, status="completed", completed=len(entries), errors=0)
+        logger.info(f"Evaluation {run_id}: {len(entries)} rows ({len(pending)} new) in {elapsed:.2f}s, {errors} errors")
+        yield {
+            "type": "summary",
+            "run_id": run_id,
+            "average_scores": summary["average_scores"],
+            "metrics": summary["metrics"],
+            "total_queries": summary["total_queries"],
+            "errors": errors,
+            "elapsed": elapsed,
+            "output_dir": str(run_dir)
+        }
+
     async def process_evaluation(
         self,
         file_content: bytes,
@@ -17,93 +459,161 @@ class EvaluationService:
         top_k: int,
         threshold: float
     ) -> Dict[str, Any]:
+        """
+        执行评估并一次性返回全部结果（结果同样逐行写入 06-evaluation-result，可以中断后继续）
+
+        参数:
+            file_content: CSV文件内容
+            collection_id: 要搜索的集合ID
+            top_k: 返回的最大结果数
+            threshold: 相似度阈值
+
+        返回:
+            包含 results、average_scores、metrics（指标名 → {k: 平均值}）和 total_queries 的字典
+        """
         try:
-            # 读取CSV文件
-            df = pd.read_csv(pd.io.common.BytesIO(file_content))
-            
-            # 合并文本内容
-            df['combined_text'] = df.apply(
-                lambda row: f"{row['ID']} {row['Disclosure Requirement']} {row['Corresponding Text']}", 
-                axis=1
-            )
-            
-            from services.search_service import SearchService
-            search_service = SearchService()
-            
-            results = []
-            total_score_hit = 0
-            total_score_find = 0
-            valid_queries = 0
-            
-            # 处理每个查询
-            for _, row in df.iterrows():
-                try:
-                    # 解析页码
-                    page_numbers = str(row['Page Number'])
-                    expected_pages = [
-                        int(x.strip()) 
-                        for x in page_numbers.split(',') 
-                        if x.strip().isdigit()
-                    ]
-                    
-                    if not expected_pages:
-                        continue
-                    
-                    # 执行搜索
-                    search_response = await search_service.search(
-                        query=row['combined_text'],
-                        collection_id=collection_id,
-                        top_k=top_k,
-                        threshold=threshold
-                    )
-                    
-                    search_results = search_response["results"]
-                    found_pages = [int(result['metadata']['page']) for result in search_results]
-                    
-                    # 计算分数
-                    hits = sum(1 for page in found_pages if page in expected_pages)
-                    score_hit = hits / len(found_pages) if found_pages else 0
-                    score_find = len(set(found_pages) & set(expected_pages)) / len(expected_pages)
-                    
-                    # 构建结果
-                    result_entry = {
-                        "id": row['ID'],
-                        "requirement": row['Disclosure Requirement'],
-                        "expected_pages": expected_pages,
-                        "found_pages": found_pages,
-                        "score_hit": score_hit,
-                        "score_find": score_find,
-                        "compliance_status": row['Compliance Status']
-                    }
-                    
-                    results.append(result_entry)
-                    total_score_hit += score_hit
-                    total_score_find += score_find
-                    valid_queries += 1
-                    
-                except Exception as e:
-                    print(f"Error processing row: {str(e)}")
-                    continue
-            
-            if valid_queries == 0:
-                raise ValueError("No valid queries found in the CSV file")
-            
-            # 计算平均分数
-            average_scores = {
-                "score_hit": total_score_hit / valid_queries,
-                "score_find": total_score_find / valid_queries
-            }
-            
-            # 保存结果
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            evaluation_results = {
-                "results": results,
-                "average_scores": average_scores,
-                "total_queries": valid_queries
-            }
-            
-            return evaluation_results
-            
+            entries = []
+            async for event in self.stream_evaluation(file_content, collection_id, top_k, threshold):
+                if event["type"] == "row":
+                    entries.append({key: value for key, value in event.items() if key not in ("type", "resumed")})
+            return self._summarize(entries, top_k)
+
         except Exception as e:
-            print(f"Error during evaluation: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error(f"Error during evaluation: {str(e)}")
+            raise
+
+    @staticmethod
+    def _search_raw(queries: List[str], collection_id: str, max_k: int, word_count_threshold: int) -> tuple:
+        """在工作线程中按最大 top_k、不设阈值批量检索，返回 (页码矩阵, 得分矩阵)"""
+        from services.search_service import SearchService
+        search_service = SearchService()
+        search_responses = search_service.search_batch(
+            queries=queries,
+            collection_id=collection_id,
+            top_k=max_k,
+            threshold=-1.0,
+            word_count_threshold=word_count_threshold
+        )
+        found_pages = np.full((len(queries), max_k), -1, dtype=np.int64)
+        scores = np.full((len(queries), max_k), -np.inf, dtype=np.float64)
+        for i, response in enumerate(search_responses):
+            for j, result in enumerate(response["results"][:max_k]):
+                found_pages[i, j] = int(result['metadata']['page'])
+                scores[i, j] = result['score']
+        return found_pages, scores
+
+    async def _cached_raw_hits(self, file_content: bytes, queries: List[str], collection_id: str,
+                               max_k: int, word_count_threshold: int, refresh: bool = False) -> tuple:
+        """
+        获取原始检索结果，按 (CSV内容, collection版本, 最大top_k, 字数阈值) 缓存在 06-evaluation-result/raw-hits/<collection>；
+        collection被重建或增量写入后版本变化，不会再命中旧结果
+
+        参数:
+            refresh: 为真时忽略已有缓存重新检索
+
+        返回:
+            (页码矩阵, 得分矩阵, 是否命中缓存)
+        """
+        version = await asyncio.to_thread(self.collection_version, collection_id)
+        digest = hashlib.sha256(file_content)
+        digest.update(json.dumps([collection_id, version, max_k, word_count_threshold], sort_keys=True).encode("utf-8"))
+        cache_path = RAW_HITS_DIR / Path(collection_id).name / f"{digest.hexdigest()[:16]}.npz"
+        if cache_path.exists() and not refresh:
+            with np.load(cache_path) as data:
+                return data["found_pages"], data["scores"], True
+        found_pages, scores = await asyncio.to_thread(self._search_raw, queries, collection_id, max_k, word_count_threshold)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(".tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, found_pages=found_pages, scores=scores)
+        temp_path.replace(cache_path)
+        return found_pages, scores, False
+
+    async def sweep_evaluation(
+        self,
+        file_content: bytes,
+        collection_ids: List[str],
+        top_ks: List[int],
+        thresholds: List[float],
+        word_count_threshold: int = 20,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        参数扫描：每个collection中每个查询只按最大 top_k、不设阈值检索一次（原始结果缓存到磁盘），
+        再对每个 (top_k, threshold) 组合向量化地计算 score_hit / score_find 及 recall、precision、MRR、nDCG、hit-rate，
+        结果与分别以这些参数调用 /evaluate 一致（近似索引下更大的 limit 可能让靠前的结果略有不同）
+
+        参数:
+            file_content: CSV文件内容
+            collection_ids: 要比较的集合ID列表
+            top_ks: 要比较的 top_k 列表
+            thresholds: 要比较的相似度阈值列表
+            word_count_threshold: 文本字数阈值
+            refresh: 为真时忽略原始结果缓存重新检索
+
+        返回:
+            每个collection一张比较表（每行一个 top_k、threshold 组合），以及保存的文件路径
+
+        异常:
+            ValueError: 参数列表为空，或 top_k 不在 1 到 EVALUATION_MAX_TOP_K 之间
+        """
+        if not collection_ids or not top_ks or not thresholds:
+            raise ValueError("collection_ids, top_ks and thresholds must not be empty")
+        top_ks = sorted(set(int(k) for k in top_ks))
+        max_top_k = EVALUATION_CONFIG["max_top_k"]
+        if top_ks[0] < 1 or top_ks[-1] > max_top_k:
+            raise ValueError(f"top_ks must be between 1 and {max_top_k}")
+        thresholds = sorted(set(float(t) for t in thresholds))
+        rows = self._parse_rows(file_content)
+        if not rows:
+            raise ValueError("No valid queries found in the CSV file")
+        queries = [item["row"]['combined_text'] for item in rows]
+        expected_pages = [item["expected_pages"] for item in rows]
+        max_k = top_ks[-1]
+
+        start_time = time.time()
+        raw_hits = await asyncio.gather(*[
+            self._cached_raw_hits(file_content, queries, collection_id, max_k, word_count_threshold, refresh)
+            for collection_id in collection_ids
+        ])
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        sweep_dir = self.output_dir / f"sweep_{timestamp}"
+        sweep_dir.mkdir(exist_ok=True)
+        tables = []
+        for collection_id, (found_pages, scores, cached) in zip(collection_ids, raw_hits):
+            averages = sweep_scores(found_pages, scores, expected_pages, top_ks, thresholds)
+            table = [
+                {
+                    "top_k": top_k,
+                    "threshold": threshold,
+                    "score_hit": float(averages["score_hit"][t, k]),
+                    "score_find": float(averages["score_find"][t, k]),
+                    **{name: float(averages[name][t, k]) for name in METRIC_NAMES}
+                }
+                for t, threshold in enumerate(thresholds)
+                for k, top_k in enumerate(top_ks)
+            ]
+            best = max(table, key=lambda entry: (entry["score_find"], entry["score_hit"]))
+            pd.DataFrame(table).to_csv(sweep_dir / f"{Path(collection_id).name}.csv", index=False)
+            tables.append({
+                "collection_id": collection_id,
+                "total_queries": len(rows),
+                "cached": cached,
+                "best": best,
+                "table": table
+            })
+
+        sweep_results = {
+            "top_ks": top_ks,
+            "thresholds": thresholds,
+            "collections": tables,
+            "elapsed": time.time() - start_time,
+            "output_dir": str(sweep_dir)
+        }
+        (sweep_dir / "sweep.json").write_text(json.dumps(sweep_results, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info(
+            f"Sweep of {len(rows)} queries over {len(collection_ids)} collections, {len(top_ks)} top_k and "
+            f"{len(thresholds)} thresholds in {sweep_results['elapsed']:.2f}s"
+        )
+        return sweep_results
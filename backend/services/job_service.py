@@ -0,0 +1,358 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from utils.config import JOB_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class JobCancelledError(Exception):
+    """任务被取消时由 JobContext 抛出，用于中断正在执行的服务调用"""
+    pass
+
+class JobContext:
+    """
+    传给任务函数的上下文，用于上报进度和响应取消
+
+    进度按阶段（stage）记录：每个阶段有自己的计量单位（pages/chunks/vectors）、
+    已处理数量和总量，吞吐量和ETA以阶段开始时间为基准计算。
+    """
+    def __init__(self, service: "JobService", job_id: str):
+        self.service = service
+        self.job_id = job_id
+        self.stage = "queued"
+        self.stage_started_at = time.time()
+        self.progress = {"unit": None, "processed": 0, "total": None, "pages": 0, "chunks": 0, "vectors": 0}
+        self._last_flush = 0.0
+
+    def set_stage(self, stage: str, unit: str = None, total: int = None) -> None:
+        """
+        进入新的处理阶段
+
+        参数:
+            stage: 阶段名称，如 loading、embedding、indexing
+            unit: 本阶段的计量单位（pages/chunks/vectors）
+            total: 本阶段的总量，未知时为 None
+        """
+        self.check_cancelled()
+        self.stage = stage
+        self.stage_started_at = time.time()
+        self.progress.update({"unit": unit, "processed": 0, "total": total})
+        self._flush(force=True)
+
+    def update(self, processed: int, total: int = None, **counters) -> None:
+        """
+        上报当前阶段的进度，同时作为取消检查点
+
+        参数:
+            processed: 已处理数量
+            total: 总量（可在处理过程中才确定）
+            counters: 其他计数（如流水线中同时推进的 pages/chunks），直接写入进度
+        """
+        self.check_cancelled()
+        self.progress["processed"] = processed
+        if total is not None:
+            self.progress["total"] = total
+        if self.progress["unit"]:
+            self.progress[self.progress["unit"]] = processed
+        self.progress.update(counters)
+        self._flush()
+
+    def progress_callback(self, processed: int, total: int = None, **counters) -> None:
+        """可直接传给各服务 progress_callback 参数的回调"""
+        self.update(processed, total, **counters)
+
+    def check_cancelled(self) -> None:
+        """
+        检查任务是否已被请求取消
+
+        异常:
+            JobCancelledError: 任务已被取消
+        """
+        if self.service.is_cancel_requested(self.job_id):
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+
+    def _flush(self, force: bool = False) -> None:
+        now = time.time()
+        if not force and now - self._last_flush < JOB_CONFIG["progress_interval"]:
+            return
+        self._last_flush = now
+        self.service.store.update(
+            self.job_id,
+            stage=self.stage,
+            stage_started_at=self.stage_started_at,
+            progress=self.progress
+        )
+
+class JobStore:
+    """
+    任务记录的SQLite存储，每次操作使用独立连接，可在多个线程中安全调用
+    """
+    COLUMNS = (
+        "id", "type", "status", "stage", "params", "progress", "result", "error",
+        "cancel_requested", "created_at", "started_at", "stage_started_at", "updated_at", "finished_at"
+    )
+    JSON_COLUMNS = ("params", "progress", "result")
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or JOB_CONFIG["db_path"]
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    params TEXT,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER DEFAULT 0,
+                    created_at REAL,
+                    started_at REAL,
+                    stage_started_at REAL,
+                    updated_at REAL,
+                    finished_at REAL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def insert(self, job_id: str, job_type: str, params: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, type, status, stage, params, progress, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, "queued", "queued", json.dumps(params, ensure_ascii=False), json.dumps({}), now, now)
+            )
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        for column in self.JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column], ensure_ascii=False)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, job_type: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM jobs"
+        args = []
+        if job_type:
+            query += " WHERE type = ?"
+            args.append(job_type)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def mark_interrupted(self) -> int:
+        """将上次进程退出时仍未结束的任务标记为 interrupted"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'interrupted', error = 'Server restarted before the job finished', "
+                "finished_at = ?, updated_at = ? WHERE status IN ('queued', 'running')",
+                (now, now)
+            )
+            return cursor.rowcount
+
+    def _to_dict(self, row) -> Dict[str, Any]:
+        job = dict(zip(self.COLUMNS, row))
+        for column in self.JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+class JobService:
+    """
+    本地后台任务服务
+
+    /load、/embed、/index 等耗时操作提交为后台任务后立即返回任务ID，
+    任务在有界线程池中执行，状态和进度持久化到SQLite，前端通过 GET /jobs/{id} 轮询。
+    任务状态: queued -> running -> succeeded / failed / cancelled；
+    服务重启时未结束的任务被标记为 interrupted。
+    """
+    def __init__(self, db_path: str = None, max_workers: int = None):
+        """
+        初始化任务服务
+
+        参数:
+            db_path: SQLite数据库路径，默认读取配置
+            max_workers: 同时执行的任务数，默认读取配置
+        """
+        self.store = JobStore(db_path)
+        interrupted = self.store.mark_interrupted()
+        if interrupted:
+            logger.warning(f"Marked {interrupted} unfinished jobs as interrupted")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or JOB_CONFIG["max_workers"], thread_name_prefix="job")
+        self._futures = {}
+        self._cleanup_paths: Dict[str, List[str]] = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+    def submit(self, job_type: str, func: Callable[..., Any], params: Dict[str, Any], *args, cleanup_paths: List[str] = None, **kwargs) -> str:
+        """
+        提交后台任务
+
+        参数:
+            job_type: 任务类型，如 load、embed、index
+            func: 任务函数，第一个参数为 JobContext，返回值需可JSON序列化
+            params: 记录到任务中的请求参数
+            *args, **kwargs: 传给任务函数的其他参数
+            cleanup_paths: 任务在排队中被取消（或服务关闭）而未执行时需要删除的临时文件，
+                任务执行后由任务函数自己清理
+
+        返回:
+            任务ID
+        """
+        job_id = uuid.uuid4().hex
+        self.store.insert(job_id, job_type, params)
+        with self._lock:
+            if cleanup_paths:
+                self._cleanup_paths[job_id] = list(cleanup_paths)
+        future = self._executor.submit(self._run, job_id, func, *args, **kwargs)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        logger.info(f"Submitted {job_type} job {job_id}")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务状态，附带当前阶段的吞吐量和预计剩余时间
+
+        参数:
+            job_id: 任务ID
+
+        返回:
+            任务信息字典，不存在时返回 None
+        """
+        job = self.store.get(job_id)
+        if job:
+            job.update(self._rates(job))
+        return job
+
+    def list(self, job_type: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        按创建时间倒序列出任务
+
+        参数:
+            job_type: 只列出指定类型的任务
+            limit: 最大数量
+
+        返回:
+            任务信息列表
+        """
+        jobs = self.store.list(job_type, limit)
+        for job in jobs:
+            job.update(self._rates(job))
+        return jobs
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        请求取消任务：排队中的任务直接取消，运行中的任务在下一次进度上报时中断
+
+        参数:
+            job_id: 任务ID
+
+        返回:
+            更新后的任务信息，不存在时返回 None
+        """
+        job = self.store.get(job_id)
+        if not job:
+            return None
+        if job["status"] not in ("queued", "running"):
+            return self.get(job_id)
+        with self._lock:
+            self._cancelled.add(job_id)
+            future = self._futures.get(job_id)
+        self.store.update(job_id, cancel_requested=1)
+        if future and future.cancel():
+            now = time.time()
+            self.store.update(job_id, status="cancelled", stage="cancelled", finished_at=now)
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._cancelled
+
+    def shutdown(self) -> None:
+        """停止接收任务，取消排队中的任务并清理它们的临时文件"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str, func: Callable[..., Any], *args, **kwargs) -> None:
+        # 任务开始执行后临时文件由任务函数的 finally 负责清理
+        with self._lock:
+            self._cleanup_paths.pop(job_id, None)
+        context = JobContext(self, job_id)
+        now = time.time()
+        self.store.update(job_id, status="running", stage="starting", started_at=now, stage_started_at=now)
+        try:
+            result = func(context, *args, **kwargs)
+            context._flush(force=True)
+            self.store.update(job_id, status="succeeded", stage="done", result=result, finished_at=time.time())
+            logger.info(f"Job {job_id} succeeded")
+        except JobCancelledError:
+            self.store.update(job_id, status="cancelled", stage="cancelled", finished_at=time.time())
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status="failed", error=str(e), finished_at=time.time())
+
+    def _on_done(self, job_id: str, future) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancelled.discard(job_id)
+            cleanup_paths = self._cleanup_paths.pop(job_id, [])
+        # future 被取消时 _run 从未执行，任务函数中的清理逻辑不会运行
+        if future.cancelled():
+            for path in cleanup_paths:
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                except OSError as e:
+                    logger.error(f"Error removing temp file {path} of cancelled job {job_id}: {str(e)}")
+
+    @staticmethod
+    def _rates(job: Dict[str, Any]) -> Dict[str, Any]:
+        """根据当前阶段的进度计算吞吐量（单位/秒）和预计剩余时间（秒）"""
+        progress = job.get("progress") or {}
+        processed = progress.get("processed") or 0
+        total = progress.get("total")
+        throughput, eta = None, None
+        if job["status"] == "running" and job.get("stage_started_at"):
+            elapsed = time.time() - job["stage_started_at"]
+            if elapsed > 0 and processed:
+                throughput = processed / elapsed
+                if total:
+                    eta = max(total - processed, 0) / throughput
+        return {
+            "throughput": round(throughput, 3) if throughput is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "created_at": _isoformat(job["created_at"]),
+            "started_at": _isoformat(job["started_at"]),
+            "stage_started_at": _isoformat(job["stage_started_at"]),
+            "updated_at": _isoformat(job["updated_at"]),
+            "finished_at": _isoformat(job["finished_at"])
+        }
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+# 进程内共享的任务服务
+job_service = JobService()
@@ -0,0 +1,303 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from pymilvus import Collection
+from utils.config import INDEX_CONFIG, LEXICAL_INDEX_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 英文/数字词（保留 "2023-0417"、"v1.2" 这类带连接符的编号）和连续的中日韩字符
+TOKEN_PATTERN = re.compile(
+    r"[0-9a-z]+(?:[-_./:][0-9a-z]+)*"
+    r"|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+"
+)
+SEPARATOR_PATTERN = re.compile(r"[-_./:]")
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：NFKC 规范化（全角字母数字转半角）并转小写后，
+    英文/数字按词切分，带连接符的编号同时保留整体和各部分，便于精确匹配编号；
+    中日韩字符不依赖词典，按相邻两字（bigram）切分，单字保留为一个词
+
+    参数:
+        text: 原始文本
+
+    返回:
+        词列表
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(unicodedata.normalize("NFKC", text or "").lower()):
+        token = match.group()
+        if token[0].isascii():
+            tokens.append(token)
+            parts = SEPARATOR_PATTERN.split(token)
+            if len(parts) > 1:
+                tokens.extend(parts)
+        elif len(token) == 1:
+            tokens.append(token)
+        else:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return tokens
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], k: int = None) -> List[Tuple[Any, float]]:
+    """
+    倒数排名融合（RRF）：每个结果的得分为其在各个排名列表中 1 / (k + 名次) 之和
+
+    参数:
+        rankings: 多个按相关性从高到低排列的ID列表
+        k: 平滑常数，默认读取配置
+
+    返回:
+        按融合得分从高到低排列的 (ID, 得分) 列表
+    """
+    k = k or LEXICAL_INDEX_CONFIG["rrf_k"]
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class LexicalIndex:
+    """
+    基于 BM25 的倒排索引，倒排表以 CSR 形式保存在连续的 numpy 数组中：
+    词 t 的倒排表为 postings[offsets[t]:offsets[t+1]]（文档序号），weights 为对应位置预先计算好的
+    BM25 词频部分 tf*(k1+1)/(tf+k1*(1-b+b*dl/avgdl))，查询时只需按词取切片、乘以 idf 后累加。
+    """
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, postings: np.ndarray, weights: np.ndarray,
+                 idf: np.ndarray, ids: np.ndarray, word_counts: np.ndarray, meta: Dict[str, Any]):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings = postings
+        self.weights = weights
+        self.idf = idf
+        self.ids = ids
+        self.word_counts = word_counts
+        self.meta = meta
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[int, str, int]], k1: float = None, b: float = None) -> "LexicalIndex":
+        """
+        构建索引
+
+        参数:
+            documents: (主键, 内容, 字数) 的迭代器
+            k1: BM25 词频饱和参数，默认读取配置
+            b: BM25 文档长度归一化参数，默认读取配置
+
+        返回:
+            LexicalIndex 对象
+        """
+        k1 = LEXICAL_INDEX_CONFIG["k1"] if k1 is None else k1
+        b = LEXICAL_INDEX_CONFIG["b"] if b is None else b
+        vocab: Dict[str, int] = {}
+        # 构建过程中用紧凑的 array 累积 (词, 文档, 词频) 三元组
+        term_ids, doc_indices, tfs = array("i"), array("i"), array("f")
+        ids, word_counts, lengths = array("q"), array("i"), array("f")
+        for doc_index, (pk, content, word_count) in enumerate(documents):
+            tokens = tokenize(content)
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_indices.append(doc_index)
+                tfs.append(tf)
+            ids.append(int(pk))
+            word_counts.append(int(word_count or 0))
+            lengths.append(len(tokens))
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int32)
+        # 稳定排序，同一个词的倒排表内文档序号保持递增
+        order = np.argsort(term_ids, kind="stable")
+        postings = np.frombuffer(doc_indices, dtype=np.int32)[order]
+        tfs = np.frombuffer(tfs, dtype=np.float32)[order]
+        df = np.bincount(term_ids, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        lengths = np.frombuffer(lengths, dtype=np.float32)
+        num_docs = len(lengths)
+        avgdl = float(lengths.mean()) if num_docs else 0.0
+        norm = k1 * (1 - b + b * lengths / max(avgdl, 1e-9))
+        weights = (tfs * (k1 + 1) / (tfs + norm[postings])).astype(np.float32)
+        idf = np.log(1 + (num_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        meta = {"k1": k1, "b": b, "num_docs": num_docs, "num_terms": len(vocab), "avgdl": avgdl, "built_at": time.time()}
+        return cls(vocab, offsets, postings, weights, idf, np.frombuffer(ids, dtype=np.int64).copy(),
+                   np.frombuffer(word_counts, dtype=np.int32).copy(), meta)
+
+    def search(self, query: str, top_k: int, min_word_count: int = 0) -> List[Tuple[int, float]]:
+        """
+        BM25 检索
+
+        参数:
+            query: 查询文本
+            top_k: 返回的最大结果数
+            min_word_count: 字数低于此值的chunk不参与排序（与向量检索的 word_count 过滤一致）
+
+        返回:
+            按得分从高到低排列的 (主键, BM25得分) 列表，只包含至少匹配一个词的chunk
+        """
+        term_ids = {self.vocab[term] for term in tokenize(query) if term in self.vocab}
+        if not term_ids or top_k <= 0:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # 同一倒排表内文档序号不重复，可以直接按序号累加
+            scores[self.postings[start:end]] += self.idf[term_id] * self.weights[start:end]
+        if min_word_count:
+            scores[self.word_counts < min_word_count] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self.ids[i]), float(scores[i])) for i in candidates]
+
+    def save(self, path: str) -> None:
+        """原子地保存为未压缩的 .npz 文件（先写临时文件再替换）"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(terms, dtype=str),
+                offsets=self.offsets,
+                postings=self.postings,
+                weights=self.weights,
+                idf=self.idf,
+                ids=self.ids,
+                word_counts=self.word_counts,
+                meta=np.array(json.dumps(self.meta))
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """从 .npz 文件加载索引"""
+        with np.load(path, allow_pickle=False) as data:
+            vocab = {str(term): term_id for term_id, term in enumerate(data["terms"].tolist())}
+            return cls(
+                vocab, data["offsets"], data["postings"], data["weights"], data["idf"],
+                data["ids"], data["word_counts"], json.loads(data["meta"].item())
+            )
+
+    @property
+    def size_bytes(self) -> int:
+        """倒排表及文档数组占用的字节数（不含词表）"""
+        return int(sum(a.nbytes for a in (self.offsets, self.postings, self.weights, self.idf, self.ids, self.word_counts)))
+
+class LexicalIndexStore:
+    """
+    按collection管理词法索引：索引文件保存在向量库目录旁（每个collection一个 .npz 文件），
+    加载后常驻内存；文件被其他进程重建（修改时间变化）时重新加载
+    """
+    def __init__(self, index_dir: str = None):
+        self.index_dir = index_dir or LEXICAL_INDEX_CONFIG["dir"]
+        self._indexes: Dict[str, Tuple[LexicalIndex, float]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.index_dir, f"{collection_name}.npz")
+
+    def build(self, collection: Collection) -> LexicalIndex:
+        """
+        读取collection中全部chunk的内容，构建并保存词法索引
+
+        参数:
+            collection: 已加载的Collection对象
+
+        返回:
+            构建好的索引
+        """
+        start_time = time.time()
+        # 索引在写入/删除之后立即重建并保存，Strong 一致性保证扫描能看到刚插入的行、看不到刚删除的行
+        iterator = collection.query_iterator(
+            batch_size=INDEX_CONFIG["query_batch_size"],
+            expr="id >= 0",
+            output_fields=["id", "content", "word_count"],
+            consistency_level="Strong"
+        )
+
+        def documents():
+            try:
+                while True:
+                    entities = iterator.next()
+                    if not entities:
+                        break
+                    for entity in entities:
+                        yield entity["id"], entity["content"], entity["word_count"]
+            finally:
+                iterator.close()
+
+        index = LexicalIndex.build(documents())
+        path = self._path(collection.name)
+        index.save(path)
+        with self._lock:
+            self._indexes[collection.name] = (index, os.path.getmtime(path))
+        logger.info(
+            f"Built lexical index for {collection.name} in {time.time() - start_time:.2f}s: "
+            f"{index.meta['num_docs']} chunks, {index.meta['num_terms']} terms, {index.size_bytes} bytes"
+        )
+        return index
+
+    def get(self, collection_name: str, collection: Collection = None) -> Optional[LexicalIndex]:
+        """
+        获取collection的词法索引，内存中没有时从文件加载；文件不存在且提供了collection时现场构建
+        （用于建立此功能之前创建的collection）
+
+        参数:
+            collection_name: collection名称
+            collection: 可选的Collection对象，用于现场构建
+
+        返回:
+            索引，不存在且无法构建时为 None
+        """
+        path = self._path(collection_name)
+        with self._lock:
+            cached = self._indexes.get(collection_name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if cached and cached[1] == mtime:
+            return cached[0]
+        if mtime is None:
+            return self.build(collection) if collection is not None else None
+        index = LexicalIndex.load(path)
+        with self._lock:
+            self._indexes[collection_name] = (index, mtime)
+        return index
+
+    def modified_at(self, collection_name: str) -> Optional[float]:
+        """索引文件的修改时间，每次写入collection后都会重建索引，可作为collection内容的版本标记；不存在时为 None"""
+        try:
+            return os.path.getmtime(self._path(collection_name))
+        except OSError:
+            return None
+
+    def drop(self, collection_name: str) -> None:
+        """删除collection的词法索引文件及内存中的索引"""
+        with self._lock:
+            self._indexes.pop(collection_name, None)
+        try:
+            os.remove(self._path(collection_name))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """获取内存中各collection词法索引的统计信息"""
+        with self._lock:
+            return {
+                name: {**index.meta, "size_bytes": index.size_bytes}
+                for name, (index, _) in self._indexes.items()
+            }
+
+# 进程内共享的词法索引
+lexical_indexes = LexicalIndexStore()
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+from utils.config import LOADING_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class LoadingCache:
+    """
+    已加载文档的内容寻址缓存
+
+    以上传文件的 SHA-256 加上加载参数（method、strategy、chunking_strategy、chunking_options）
+    作为键，缓存 LoadingService 输出的页面映射，重复上传同一文件时无需重新解析。
+    缓存存放在 01-loaded-docs 旁边的目录中：
+    - <key>.jsonl: 每行一个页面/元素 {"text", "page", "metadata"}
+    - index.json: 条目大小、总页数、最近访问时间以及命中/未命中/淘汰计数
+    总大小超过上限时按最近最少使用（LRU）淘汰条目。
+    """
+    # 同一进程内的所有实例共享一把锁，保护 index.json 的读改写
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        """
+        初始化缓存
+
+        参数:
+            cache_dir: 缓存目录，默认读取配置
+            max_bytes: 缓存总大小上限（字节），默认读取配置
+        """
+        self.cache_dir = cache_dir or LOADING_CACHE_CONFIG["dir"]
+        self.max_bytes = max_bytes or LOADING_CACHE_CONFIG["max_bytes"]
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        """
+        分块计算文件的 SHA-256
+
+        参数:
+            file_path: 文件路径
+
+        返回:
+            十六进制哈希字符串
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(file_hash: str, method: str, strategy: str = None, chunking_strategy: str = None, chunking_options: dict = None) -> str:
+        """
+        根据文件哈希和加载参数生成缓存键
+
+        参数:
+            file_hash: 文件内容的 SHA-256
+            method: 加载方法
+            strategy: unstructured 加载策略
+            chunking_strategy: unstructured 分块策略
+            chunking_options: unstructured 分块选项
+
+        返回:
+            缓存键
+        """
+        options = json.dumps({
+            "file": file_hash,
+            "method": method,
+            "strategy": strategy,
+            "chunking_strategy": chunking_strategy,
+            "chunking_options": chunking_options or {}
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(options.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存条目并记录命中/未命中
+
+        参数:
+            key: 缓存键
+
+        返回:
+            命中时返回 {"total_pages": int}，未命中返回 None；页面内容通过 iter_pages 读取
+        """
+        with self._lock:
+            index = self._read_index()
+            entry = index["entries"].get(key)
+            if entry and not os.path.exists(self._entry_path(key)):
+                index["entries"].pop(key)
+                entry = None
+            if entry:
+                entry["last_access"] = datetime.now().isoformat()
+                index["stats"]["hits"] += 1
+            else:
+                index["stats"]["misses"] += 1
+            self._write_index(index)
+            return {"total_pages": entry["total_pages"]} if entry else None
+
+    def iter_pages(self, key: str):
+        """
+        逐行读取缓存条目中的页面
+
+        参数:
+            key: 缓存键
+
+        生成:
+            dict: {"text", "page", "metadata"}
+        """
+        with open(self._entry_path(key), "r", encoding="utf-8") as f:
+            for line in f:
+                page = json.loads(line)
+                page.setdefault("metadata", {})
+                yield page
+
+    def put(self, key: str, pages: Iterable[dict], total_pages: int) -> None:
+        """
+        写入一个完整的缓存条目
+
+        参数:
+            key: 缓存键
+            pages: 页面列表或迭代器
+            total_pages: 文档总页数
+        """
+        writer = self.open_writer(key)
+        try:
+            for page in pages:
+                writer.write(page)
+            writer.commit(total_pages)
+        except Exception:
+            writer.abort()
+            raise
+
+    def open_writer(self, key: str) -> "LoadingCacheWriter":
+        """
+        打开一个增量写入器，用于边加载边写入缓存
+
+        参数:
+            key: 缓存键
+
+        返回:
+            缓存写入器，写完后调用 commit，失败时调用 abort
+        """
+        return LoadingCacheWriter(self, key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        返回:
+            包含条目数、总大小、上限以及命中/未命中/淘汰计数和命中率的字典
+        """
+        with self._lock:
+            index = self._read_index()
+        stats = index["stats"]
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "entries": len(index["entries"]),
+            "total_bytes": sum(entry["size"] for entry in index["entries"].values()),
+            "max_bytes": self.max_bytes,
+            **stats,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0
+        }
+
+    def clear(self) -> int:
+        """
+        清空缓存条目（保留统计计数）
+
+        返回:
+            删除的条目数
+        """
+        with self._lock:
+            index = self._read_index()
+            removed = len(index["entries"])
+            for key in index["entries"]:
+                self._remove_entry_file(key)
+            index["entries"] = {}
+            self._write_index(index)
+        return removed
+
+    def _commit_entry(self, key: str, temp_path: str, total_pages: int) -> None:
+        """
+        将写完的临时文件登记为缓存条目，并按 LRU 淘汰超出上限的条目
+        """
+        entry_path = self._entry_path(key)
+        with self._lock:
+            os.replace(temp_path, entry_path)
+            index = self._read_index()
+            now = datetime.now().isoformat()
+            index["entries"][key] = {
+                "size": os.path.getsize(entry_path),
+                "total_pages": total_pages,
+                "created_at": now,
+                "last_access": now
+            }
+            total_bytes = sum(entry["size"] for entry in index["entries"].values())
+            # 按最近访问时间从旧到新淘汰，至少保留刚写入的条目
+            for old_key in sorted(index["entries"], key=lambda k: index["entries"][k]["last_access"]):
+                if total_bytes <= self.max_bytes or old_key == key:
+                    continue
+                total_bytes -= index["entries"].pop(old_key)["size"]
+                self._remove_entry_file(old_key)
+                index["stats"]["evictions"] += 1
+                logger.info(f"Evicted loading cache entry {old_key}")
+            self._write_index(index)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.jsonl")
+
+    def _remove_entry_file(self, key: str) -> None:
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _read_index(self) -> Dict[str, Any]:
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading loading cache index, starting empty: {str(e)}")
+        return {"entries": {}, "stats": {"hits": 0, "misses": 0, "evictions": 0}}
+
+    def _write_index(self, index: Dict[str, Any]) -> None:
+        temp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.index_path)
+
+class LoadingCacheWriter:
+    """
+    缓存条目的增量写入器：页面逐行写入临时文件，commit 时原子替换并登记到索引
+    """
+    def __init__(self, cache: LoadingCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.temp_path = os.path.join(cache.cache_dir, f"{key}.{uuid.uuid4().hex}.tmp")
+        self._file = open(self.temp_path, "w", encoding="utf-8")
+
+    def write(self, page: dict) -> None:
+        """
+        写入一个页面；空的 metadata 不写入，保证命中时 load_pdf 返回的页面映射与未缓存时一致
+        """
+        record = {"text": page["text"], "page": page["page"]}
+        if page.get("metadata"):
+            record["metadata"] = page["metadata"]
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def commit(self, total_pages: int) -> None:
+        """完成写入并登记缓存条目"""
+        self._file.close()
+        self.cache._commit_entry(self.key, self.temp_path, total_pages)
+
+    def abort(self) -> None:
+        """放弃写入并删除临时文件"""
+        self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+from utils.config import LOADING_CONCURRENCY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class ExecutorSaturatedError(Exception):
+    """
+    某个加载方法的并发槽位和等待队列都已占满时抛出，由接口层转换为429响应
+    """
+    def __init__(self, key: str, limit: int, queue_position: int, retry_after: int):
+        self.key = key
+        self.limit = limit
+        self.queue_position = queue_position
+        self.retry_after = retry_after
+        super().__init__(f"Too many concurrent {key} jobs (limit {limit}), queue position would be {queue_position}")
+
+class _MethodState:
+    """
+    单个加载方法的并发状态
+
+    semaphore 在事件循环中管理接口请求的排队；thread_semaphore 在工作线程中真正占用槽位，
+    接口请求和后台任务共用它，因此两者合计不会超过并发上限。
+    running 为占用槽位的任务数，waiting 为已接纳、尚未占用槽位的接口请求数，
+    background_waiting 为等待槽位的后台任务数，接纳判断按三者之和计算。
+    """
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(limit)
+        self.thread_semaphore = threading.Semaphore(limit)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.waiting = 0
+        self.background_waiting = 0
+
+class LoadingExecutor:
+    """
+    CPU密集型加载/解析任务的有界执行器
+
+    FastAPI 的处理函数是 async def，直接调用 LoadingService、partition_pdf 和分块器会阻塞事件循环，
+    一次 hi_res 上传就会卡住同一 worker 上的所有请求（包括 /search）。
+    该执行器把同步任务放到线程池中运行，并按加载方法分别限制并发：
+    - 槽位未满时立即执行
+    - 槽位已满时进入等待队列
+    - 等待队列也满时抛出 ExecutorSaturatedError，携带排队位置和建议的重试间隔
+    后台任务已经运行在自己的线程中，通过 slot() 在线程内阻塞等待同一组槽位。
+    """
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        初始化执行器
+
+        参数:
+            config: 并发配置，默认读取 LOADING_CONCURRENCY_CONFIG
+        """
+        self.config = config or LOADING_CONCURRENCY_CONFIG
+        self._states: Dict[str, _MethodState] = {}
+        self._states_lock = threading.Lock()
+        max_workers = sum(self.config["limits"].values()) or 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="loading")
+
+    @staticmethod
+    def limit_key(method: str, strategy: str = None) -> str:
+        """
+        获取任务对应的限流键，unstructured 的 hi_res 策略单独限流
+
+        参数:
+            method: 加载方法
+            strategy: unstructured 加载策略
+
+        返回:
+            限流键
+        """
+        if method == "unstructured" and strategy == "hi_res":
+            return "unstructured:hi_res"
+        return method
+
+    async def run(self, key: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        在线程池中执行同步任务，受 key 对应的并发上限约束
+
+        参数:
+            key: 限流键，见 limit_key
+            func: 同步函数
+            *args, **kwargs: 传给 func 的参数
+
+        返回:
+            func 的返回值
+
+        异常:
+            ExecutorSaturatedError: 并发槽位和等待队列均已占满
+        """
+        state = self._state(key)
+        # 按后台任务和接口请求的总占用判断，后台任务占满槽位时接口请求同样排队或得到429
+        with state.lock:
+            occupied = state.running + state.waiting + state.background_waiting
+            if occupied >= state.limit + state.max_queue:
+                raise ExecutorSaturatedError(key, state.limit, occupied - state.limit + 1, self.config["retry_after"])
+            state.waiting += 1
+        if occupied >= state.limit:
+            logger.info(f"Queued {key} job at position {occupied - state.limit + 1} (limit {state.limit})")
+        
+        try:
+            await state.semaphore.acquire()
+        except BaseException:
+            with state.lock:
+                state.waiting -= 1
+            raise
+        
+        loop = asyncio.get_running_loop()
+        
+        def release(future):
+            # 在线程真正结束后才释放槽位，请求被取消时正在运行的任务依然占用并发
+            if future is None or future.cancelled():
+                # 任务没有开始执行，仍计在 waiting 中
+                with state.lock:
+                    state.waiting -= 1
+            state.semaphore.release()
+        
+        def call():
+            # 后台任务可能正占用槽位，在线程中等待共享的线程信号量
+            state.thread_semaphore.acquire()
+            with self._occupy(state, "waiting"):
+                return func(*args, **kwargs)
+        
+        try:
+            future = self._executor.submit(call)
+        except Exception:
+            release(None)
+            raise
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(release, f))
+        return await asyncio.wrap_future(future)
+
+    @contextmanager
+    def slot(self, key: str) -> Iterator[None]:
+        """
+        在当前线程中阻塞等待 key 对应的并发槽位，供后台任务等已在独立线程中运行的调用方使用
+
+        用法:
+            with loading_executor.slot(LoadingExecutor.limit_key(method, strategy)):
+                ...
+
+        参数:
+            key: 限流键，见 limit_key
+        """
+        state = self._state(key)
+        with state.lock:
+            state.background_waiting += 1
+        try:
+            state.thread_semaphore.acquire()
+        except BaseException:
+            with state.lock:
+                state.background_waiting -= 1
+            raise
+        with self._occupy(state, "background_waiting"):
+            yield
+
+    @contextmanager
+    def _occupy(self, state: _MethodState, queue: str) -> Iterator[None]:
+        """在已获得线程信号量的前提下把任务从等待计数 queue 移到运行数，结束时释放槽位"""
+        with state.lock:
+            setattr(state, queue, getattr(state, queue) - 1)
+            state.running += 1
+        try:
+            yield
+        finally:
+            with state.lock:
+                state.running -= 1
+            state.thread_semaphore.release()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取各加载方法的并发状态
+
+        返回:
+            以限流键为键，包含上限、运行数和等待数的字典
+        """
+        return {
+            key: {
+                "limit": state.limit,
+                "max_queue": state.max_queue,
+                "running": state.running,
+                "waiting": state.waiting,
+                "background_waiting": state.background_waiting
+            }
+            for key, state in self._states.items()
+        }
+
+    def shutdown(self) -> None:
+        """关闭线程池，等待正在运行的任务结束"""
+        self._executor.shutdown(wait=True)
+
+    def _state(self, key: str) -> _MethodState:
+        with self._states_lock:
+            if key not in self._states:
+                self._states[key] = _MethodState(
+                    self.config["limits"].get(key, self.config["default_limit"]),
+                    self.config["max_queue"].get(key, self.config["default_max_queue"])
+                )
+            return self._states[key]
+
+# 进程内共享的执行器
+loading_executor = LoadingExecutor()
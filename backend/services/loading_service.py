@@ -4,10 +4,104 @@ import pdfplumber
 import fitz  # PyMuPDF
 import logging
 import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import json
+from utils.config import LOADING_PARALLEL_CONFIG, LOADING_CACHE_CONFIG
+from services.loading_cache import LoadingCache
+from utils.json_stream import write_json_fields, write_json_array
 
 logger = logging.getLogger(__name__)
+
+# 支持按页码区间分片并行提取的加载方法（unstructured 依赖整篇文档的版面分析，不支持分片）
+PARALLEL_METHODS = ("pymupdf", "pypdf", "pdfplumber")
+
+def page_to_chunk(page: dict, chunk_id: int) -> dict:
+    """
+    将 iter_pages 输出的页面转换为 01-loaded-docs 中标准化的chunk格式（每页一个chunk）。
+
+    参数:
+        page (dict): 包含 text、page 和可选 metadata 的页面
+        chunk_id (int): chunk编号，从1开始
+
+    返回:
+        dict: 包含 content 和 metadata 的chunk
+    """
+    chunk_metadata = {
+        "chunk_id": chunk_id,
+        "page_number": page["page"],
+        "page_range": str(page["page"]),
+        "word_count": len(page["text"].split())
+    }
+    if page.get("metadata"):
+        chunk_metadata.update(page["metadata"])
+    return {
+        "content": page["text"],
+        "metadata": chunk_metadata
+    }
+
+def _count_pages(file_path: str, method: str) -> int:
+    """
+    使用指定的解析库统计PDF页数。
+
+    参数:
+        file_path (str): PDF文件路径
+        method (str): 加载方法
+
+    返回:
+        int: 文档总页数
+    """
+    if method == "pymupdf":
+        with fitz.open(file_path) as doc:
+            return len(doc)
+    elif method == "pypdf":
+        with open(file_path, "rb") as file:
+            return len(PdfReader(file).pages)
+    elif method == "pdfplumber":
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    raise ValueError(f"Unsupported parallel loading method: {method}")
+
+def _extract_page_range(file_path: str, method: str, start: int, end: int) -> list:
+    """
+    子进程工作函数：按路径重新打开文档，提取 [start, end) 区间（从0开始）的页面文本。
+    文档句柄不能跨进程传递，因此每个分片各自打开一次文件。
+
+    参数:
+        file_path (str): PDF文件路径
+        method (str): 加载方法，支持 'pymupdf', 'pypdf', 'pdfplumber'
+        start (int): 起始页索引（包含）
+        end (int): 结束页索引（不包含）
+
+    返回:
+        list: (页码, 原始文本, 提取耗时秒数) 元组列表，页码从1开始
+    """
+    results = []
+    if method == "pymupdf":
+        with fitz.open(file_path) as doc:
+            for idx in range(start, end):
+                page_start = time.perf_counter()
+                text = doc[idx].get_text("text")
+                results.append((idx + 1, text, time.perf_counter() - page_start))
+    elif method == "pypdf":
+        with open(file_path, "rb") as file:
+            pdf = PdfReader(file)
+            for idx in range(start, end):
+                page_start = time.perf_counter()
+                text = pdf.pages[idx].extract_text()
+                results.append((idx + 1, text, time.perf_counter() - page_start))
+    elif method == "pdfplumber":
+        with pdfplumber.open(file_path) as pdf:
+            for idx in range(start, end):
+                page_start = time.perf_counter()
+                text = pdf.pages[idx].extract_text()
+                results.append((idx + 1, text, time.perf_counter() - page_start))
+    else:
+        raise ValueError(f"Unsupported parallel loading method: {method}")
+    return results
 """
 PDF文档加载服务类
     这个服务类提供了多种PDF文档加载方法，支持不同的加载策略和分块选项。
@@ -23,6 +117,8 @@ PDF文档加载服务类
         - 支持文本分块
         - 提供元数据存储
         - 支持不同的加载策略（使用unstructured时）
+        - 支持按页码区间分片的多进程并行提取，并记录每页耗时
+        - 按文件内容哈希和加载参数缓存加载结果，重复上传直接返回
  """
 class LoadingService:
     """
@@ -31,13 +127,19 @@ class LoadingService:
     属性:
         total_pages (int): 当前加载PDF文档的总页数
         current_page_map (list): 存储当前文档的页面映射信息，每个元素包含页面文本和页码
+        page_timings (list): 并行模式下每页的提取耗时明细
+        cache (LoadingCache): 加载结果缓存，配置中禁用时为 None
+        cache_hit (bool): 最近一次加载是否命中缓存
     """
     
-    def __init__(self):
+    def __init__(self, cache: LoadingCache = None):
         self.total_pages = 0
         self.current_page_map = []
+        self.page_timings = []
+        self.cache = cache if cache is not None else (LoadingCache() if LOADING_CACHE_CONFIG["enabled"] else None)
+        self.cache_hit = False
     
-    def load_pdf(self, file_path: str, method: str, strategy: str = None, chunking_strategy: str = None, chunking_options: dict = None) -> str:
+    def load_pdf(self, file_path: str, method: str, strategy: str = None, chunking_strategy: str = None, chunking_options: dict = None, parallel: bool = False, max_workers: int = None, file_hash: str = None) -> str:
         """
         加载PDF文档的主方法，支持多种加载策略。
 
@@ -47,20 +149,128 @@ class LoadingService:
             strategy (str, optional): 使用unstructured方法时的策略，可选 'fast', 'hi_res', 'ocr_only'
             chunking_strategy (str, optional): 文本分块策略，可选 'basic', 'by_title'
             chunking_options (dict, optional): 分块选项配置
+            parallel (bool, optional): 是否按页码区间分片并行提取，仅支持 'pymupdf', 'pypdf', 'pdfplumber'
+            max_workers (int, optional): 并行模式下的最大进程数，默认读取配置
+            file_hash (str, optional): 文件内容的 SHA-256，未提供时按需计算，用于缓存寻址
 
         返回:
             str: 提取的文本内容
         """
         try:
+            self.cache_hit = False
+            cache_key = self._cache_key(file_path, method, strategy, chunking_strategy, chunking_options, file_hash)
+            if cache_key:
+                entry = self.cache.get(cache_key)
+                if entry:
+                    self.cache_hit = True
+                    self.total_pages = entry["total_pages"]
+                    self.current_page_map = [
+                        {key: value for key, value in page.items() if key != "metadata" or value}
+                        for page in self.cache.iter_pages(cache_key)
+                    ]
+                    logger.info(f"Loading cache hit for {file_path} ({method})")
+                    return "\n".join(block["text"] for block in self.current_page_map)
+            
+            text = self._load_uncached(file_path, method, strategy, chunking_strategy, chunking_options, parallel, max_workers)
+            if cache_key:
+                try:
+                    self.cache.put(cache_key, self.current_page_map, self.total_pages)
+                except Exception as e:
+                    logger.error(f"Error writing loading cache: {str(e)}")
+            return text
+        except Exception as e:
+            logger.error(f"Error loading PDF with {method}: {str(e)}")
+            raise
+    
+    def _load_uncached(self, file_path: str, method: str, strategy: str, chunking_strategy: str, chunking_options: dict, parallel: bool, max_workers: int) -> str:
+        """
+        不经过缓存，按指定方法加载PDF文档，参数含义与 load_pdf 相同。
+
+        返回:
+            str: 提取的文本内容
+        """
+        if parallel:
+            if method in PARALLEL_METHODS:
+                return self._load_parallel(file_path, method, max_workers=max_workers)
+            logger.warning(f"Parallel loading is not supported for {method}, falling back to serial loading")
+        if method == "pymupdf":
+            return self._load_with_pymupdf(file_path)
+        elif method == "pypdf":
+            return self._load_with_pypdf(file_path)
+        elif method == "pdfplumber":
+            return self._load_with_pdfplumber(file_path)
+        elif method == "unstructured":
+            return self._load_with_unstructured(
+                file_path, 
+                strategy=strategy,
+                chunking_strategy=chunking_strategy,
+                chunking_options=chunking_options
+            )
+        else:
+            raise ValueError(f"Unsupported loading method: {method}")
+    
+    def iter_pages(self, file_path: str, method: str, strategy: str = None, chunking_strategy: str = None, chunking_options: dict = None, parallel: bool = False, max_workers: int = None, file_hash: str = None):
+        """
+        以生成器方式逐页（unstructured 为逐元素）输出文档内容，不累积 current_page_map，
+        也不拼接整篇文本，峰值内存与单页大小相关而与文档大小无关。
+        命中缓存时从缓存逐行读取；未命中时边输出边写入缓存，完整遍历后才登记缓存条目。
+        参数含义与 load_pdf 相同。
+
+        生成:
+            dict: {"text": 页面文本, "page": 页码, "metadata": 元数据（非unstructured方法为空字典）}
+        """
+        self.cache_hit = False
+        cache_key = self._cache_key(file_path, method, strategy, chunking_strategy, chunking_options, file_hash)
+        if cache_key:
+            entry = self.cache.get(cache_key)
+            if entry:
+                self.cache_hit = True
+                self.total_pages = entry["total_pages"]
+                logger.info(f"Loading cache hit for {file_path} ({method})")
+                yield from self.cache.iter_pages(cache_key)
+                return
+        
+        pages = self._iter_uncached(file_path, method, strategy, chunking_strategy, chunking_options, parallel, max_workers)
+        if not cache_key:
+            yield from pages
+            return
+        
+        writer = self.cache.open_writer(cache_key)
+        try:
+            for page in pages:
+                writer.write(page)
+                yield page
+        except BaseException:
+            # 包括消费方提前关闭生成器（GeneratorExit），不完整的结果不能进入缓存
+            writer.abort()
+            raise
+        try:
+            writer.commit(self.total_pages)
+        except Exception as e:
+            logger.error(f"Error writing loading cache: {str(e)}")
+    
+    def _iter_uncached(self, file_path: str, method: str, strategy: str, chunking_strategy: str, chunking_options: dict, parallel: bool, max_workers: int):
+        """
+        不经过缓存的逐页生成器，参数含义与 load_pdf 相同。
+
+        生成:
+            dict: {"text": 页面文本, "page": 页码, "metadata": 元数据}
+        """
+        try:
+            if parallel:
+                if method in PARALLEL_METHODS:
+                    yield from self._iter_parallel(file_path, method, max_workers=max_workers)
+                    return
+                logger.warning(f"Parallel loading is not supported for {method}, falling back to serial loading")
             if method == "pymupdf":
-                return self._load_with_pymupdf(file_path)
+                yield from self._iter_pymupdf(file_path)
             elif method == "pypdf":
-                return self._load_with_pypdf(file_path)
+                yield from self._iter_pypdf(file_path)
             elif method == "pdfplumber":
-                return self._load_with_pdfplumber(file_path)
+                yield from self._iter_pdfplumber(file_path)
             elif method == "unstructured":
-                return self._load_with_unstructured(
-                    file_path, 
+                yield from self._iter_unstructured(
+                    file_path,
                     strategy=strategy,
                     chunking_strategy=chunking_strategy,
                     chunking_options=chunking_options
@@ -68,9 +278,38 @@ class LoadingService:
             else:
                 raise ValueError(f"Unsupported loading method: {method}")
         except Exception as e:
-            logger.error(f"Error loading PDF with {method}: {str(e)}")
+            logger.error(f"Error iterating PDF pages with {method}: {str(e)}")
             raise
     
+    def _cache_key(self, file_path: str, method: str, strategy: str, chunking_strategy: str, chunking_options: dict, file_hash: str = None):
+        """
+        生成加载缓存键；缓存禁用时返回 None。
+        strategy 和分块参数只对 unstructured 生效，其他方法不计入键；
+        并行与串行提取结果一致，parallel 同样不计入键。
+
+        参数:
+            file_path (str): PDF文件路径
+            method (str): 加载方法
+            strategy (str): unstructured 加载策略
+            chunking_strategy (str): unstructured 分块策略
+            chunking_options (dict): unstructured 分块选项
+            file_hash (str, optional): 预先计算的文件 SHA-256
+
+        返回:
+            str: 缓存键或 None
+        """
+        if not self.cache:
+            return None
+        if method != "unstructured":
+            strategy, chunking_strategy, chunking_options = None, None, None
+        return LoadingCache.make_key(
+            file_hash or LoadingCache.file_hash(file_path),
+            method,
+            strategy=strategy,
+            chunking_strategy=chunking_strategy,
+            chunking_options=chunking_options
+        )
+    
     def get_total_pages(self) -> int:
         """
         获取当前加载文档的总页数。
@@ -89,6 +328,103 @@ class LoadingService:
         """
         return self.current_page_map
     
+    def get_page_timings(self) -> list:
+        """
+        获取并行模式下每页的提取耗时明细。
+
+        返回:
+            list: 每个元素包含页码、所属分片和提取耗时（秒）
+        """
+        return self.page_timings
+    
+    def _load_parallel(self, file_path: str, method: str, max_workers: int = None) -> str:
+        """
+        按页码区间分片，使用进程池并行提取页面文本。
+        各分片结果按页码顺序合并，过滤和清理规则与串行加载一致，
+        因此生成的 current_page_map 与串行模式完全相同。
+
+        参数:
+            file_path (str): PDF文件路径
+            method (str): 加载方法，支持 'pymupdf', 'pypdf', 'pdfplumber'
+            max_workers (int, optional): 最大进程数，默认读取配置
+
+        返回:
+            str: 提取的文本内容
+        """
+        text_blocks = [
+            {"text": block["text"], "page": block["page"]}
+            for block in self._iter_parallel(file_path, method, max_workers=max_workers)
+        ]
+        self.current_page_map = text_blocks
+        return "\n".join(block["text"] for block in text_blocks)
+    
+    def _iter_parallel(self, file_path: str, method: str, max_workers: int = None):
+        """
+        并行提取的生成器实现。最多同时保留 2 倍进程数的分片在途，
+        按分片顺序依次输出页面，避免消费较慢时整篇文档的结果堆积在内存中。
+
+        参数:
+            file_path (str): PDF文件路径
+            method (str): 加载方法，支持 'pymupdf', 'pypdf', 'pdfplumber'
+            max_workers (int, optional): 最大进程数，默认读取配置
+
+        生成:
+            dict: {"text": 页面文本, "page": 页码, "metadata": {}}
+        """
+        try:
+            self.total_pages = _count_pages(file_path, method)
+            self.page_timings = []
+            shard_size = max(1, LOADING_PARALLEL_CONFIG["pages_per_shard"])
+            ranges = [
+                (start, min(start + shard_size, self.total_pages))
+                for start in range(0, self.total_pages, shard_size)
+            ]
+            workers = min(max_workers or LOADING_PARALLEL_CONFIG["max_workers"], len(ranges))
+            
+            if workers > 1 and self.total_pages >= LOADING_PARALLEL_CONFIG["min_pages"]:
+                logger.info(f"Extracting {self.total_pages} pages with {method} in {len(ranges)} shards on {workers} processes")
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    pending = deque()
+                    next_shard = 0
+                    while next_shard < len(ranges) or pending:
+                        while next_shard < len(ranges) and len(pending) < workers * 2:
+                            start, end = ranges[next_shard]
+                            pending.append(executor.submit(_extract_page_range, file_path, method, start, end))
+                            next_shard += 1
+                        shard_index = next_shard - len(pending)
+                        yield from self._shard_blocks(shard_index, pending.popleft().result())
+            else:
+                # 页数较少时进程启动开销大于收益，在当前进程内按同样方式提取
+                for shard_index, (start, end) in enumerate(ranges):
+                    yield from self._shard_blocks(shard_index, _extract_page_range(file_path, method, start, end))
+        except Exception as e:
+            logger.error(f"Parallel {method} error: {str(e)}")
+            raise
+    
+    def _shard_blocks(self, shard_index: int, shard_pages: list):
+        """
+        记录分片内每页的耗时，并按串行加载相同的规则过滤、清理页面文本。
+
+        参数:
+            shard_index (int): 分片序号
+            shard_pages (list): _extract_page_range 返回的 (页码, 原始文本, 耗时) 列表
+
+        生成:
+            dict: {"text": 页面文本, "page": 页码, "metadata": {}}
+        """
+        for page_num, page_text, seconds in shard_pages:
+            self.page_timings.append({
+                "page": page_num,
+                "shard": shard_index,
+                "seconds": round(seconds, 6)
+            })
+            if page_text and page_text.strip():
+                yield {
+                    "text": page_text.strip(),
+                    "page": page_num,
+                    "metadata": {}
+                }
+    
     def _load_with_pymupdf(self, file_path: str) -> str:
         """
         使用PyMuPDF库加载PDF文档。
@@ -100,19 +436,34 @@ class LoadingService:
         返回:
             str: 提取的文本内容
         """
-        text_blocks = []
+        text_blocks = [
+            {"text": block["text"], "page": block["page"]}
+            for block in self._iter_pymupdf(file_path)
+        ]
+        self.current_page_map = text_blocks
+        return "\n".join(block["text"] for block in text_blocks)
+    
+    def _iter_pymupdf(self, file_path: str):
+        """
+        使用PyMuPDF库逐页提取文本的生成器。
+
+        参数:
+            file_path (str): PDF文件路径
+
+        生成:
+            dict: {"text": 页面文本, "page": 页码, "metadata": {}}
+        """
         try:
             with fitz.open(file_path) as doc:
                 self.total_pages = len(doc)
                 for page_num, page in enumerate(doc, 1):
                     text = page.get_text("text")
                     if text.strip():
-                        text_blocks.append({
+                        yield {
                             "text": text.strip(),
-                            "page": page_num
-                        })
-            self.current_page_map = text_blocks
-            return "\n".join(block["text"] for block in text_blocks)
+                            "page": page_num,
+                            "metadata": {}
+                        }
         except Exception as e:
             logger.error(f"PyMuPDF error: {str(e)}")
             raise
@@ -128,20 +479,35 @@ class LoadingService:
         返回:
             str: 提取的文本内容
         """
+        text_blocks = [
+            {"text": block["text"], "page": block["page"]}
+            for block in self._iter_pypdf(file_path)
+        ]
+        self.current_page_map = text_blocks
+        return "\n".join(block["text"] for block in text_blocks)
+    
+    def _iter_pypdf(self, file_path: str):
+        """
+        使用PyPDF库逐页提取文本的生成器。
+
+        参数:
+            file_path (str): PDF文件路径
+
+        生成:
+            dict: {"text": 页面文本, "page": 页码, "metadata": {}}
+        """
         try:
-            text_blocks = []
             with open(file_path, "rb") as file:
                 pdf = PdfReader(file)
                 self.total_pages = len(pdf.pages)
                 for page_num, page in enumerate(pdf.pages, 1):
                     page_text = page.extract_text()
                     if page_text and page_text.strip():
-                        text_blocks.append({
+                        yield {
                             "text": page_text.strip(),
-                            "page": page_num
-                        })
-            self.current_page_map = text_blocks
-            return "\n".join(block["text"] for block in text_blocks)
+                            "page": page_num,
+                            "metadata": {}
+                        }
         except Exception as e:
             logger.error(f"PyPDF error: {str(e)}")
             raise
@@ -160,6 +526,29 @@ class LoadingService:
         返回:
             str: 提取的文本内容
         """
+        text_blocks = list(self._iter_unstructured(
+            file_path,
+            strategy=strategy,
+            chunking_strategy=chunking_strategy,
+            chunking_options=chunking_options
+        ))
+        self.current_page_map = text_blocks
+        return "\n".join(block["text"] for block in text_blocks)
+    
+    def _iter_unstructured(self, file_path: str, strategy: str = "fast", chunking_strategy: str = "basic", chunking_options: dict = None):
+        """
+        使用unstructured库逐元素输出文本的生成器。
+        partition_pdf 本身一次性返回全部元素，这里逐个转换为可序列化的结构后输出。
+
+        参数:
+            file_path (str): PDF文件路径
+            strategy (str): 加载策略，默认'fast'
+            chunking_strategy (str): 分块策略，默认'basic'
+            chunking_options (dict): 分块选项配置
+
+        生成:
+            dict: {"text": 元素文本, "page": 页码, "metadata": 清理后的元素元数据}
+        """
         try:
             strategy_params = {
                 "fast": {"strategy": "fast"},
@@ -195,8 +584,8 @@ class LoadingService:
                 logger.debug(f"Element content: {str(elem)}")
                 logger.debug(f"Element dir: {dir(elem)}")
             
-            text_blocks = []
             pages = set()
+            self.total_pages = 0
             
             for elem in elements:
                 metadata = elem.metadata.__dict__
@@ -224,15 +613,12 @@ class LoadingService:
                     cleaned_metadata['id'] = str(getattr(elem, 'id', None))
                     cleaned_metadata['category'] = str(getattr(elem, 'category', None))
                     
-                    text_blocks.append({
+                    self.total_pages = max(pages)
+                    yield {
                         "text": str(elem),
                         "page": page_number,
                         "metadata": cleaned_metadata
-                    })
-            
-            self.total_pages = max(pages) if pages else 0
-            self.current_page_map = text_blocks
-            return "\n".join(block["text"] for block in text_blocks)
+                    }
             
         except Exception as e:
             logger.error(f"Unstructured error: {str(e)}")
@@ -249,30 +635,48 @@ class LoadingService:
         返回:
             str: 提取的文本内容
         """
-        text_blocks = []
+        text_blocks = [
+            {"text": block["text"], "page": block["page"]}
+            for block in self._iter_pdfplumber(file_path)
+        ]
+        self.current_page_map = text_blocks
+        return "\n".join(block["text"] for block in text_blocks)
+    
+    def _iter_pdfplumber(self, file_path: str):
+        """
+        使用pdfplumber库逐页提取文本的生成器。
+
+        参数:
+            file_path (str): PDF文件路径
+
+        生成:
+            dict: {"text": 页面文本, "page": 页码, "metadata": {}}
+        """
         try:
             with pdfplumber.open(file_path) as pdf:
                 self.total_pages = len(pdf.pages)
                 for page_num, page in enumerate(pdf.pages, 1):
                     page_text = page.extract_text()
                     if page_text and page_text.strip():
-                        text_blocks.append({
+                        yield {
                             "text": page_text.strip(),
-                            "page": page_num
-                        })
-            self.current_page_map = text_blocks
-            return "\n".join(block["text"] for block in text_blocks)
+                            "page": page_num,
+                            "metadata": {}
+                        }
         except Exception as e:
             logger.error(f"pdfplumber error: {str(e)}")
             raise
     
-    def save_document(self, filename: str, chunks: list, metadata: dict, loading_method: str, strategy: str = None, chunking_strategy: str = None) -> str:
+    def save_document(self, filename: str, chunks, metadata: dict, loading_method: str, strategy: str = None, chunking_strategy: str = None) -> str:
         """
         保存处理后的文档数据。
+        chunks 可以是列表，也可以是由 iter_pages 派生的生成器：分块逐个写入文件，不会整体驻留内存。
+        传入生成器时，total_chunks 和 total_pages 在分块写完之后才确定，因此写在 chunks 字段之后，
+        此时 metadata["total_pages"] 也在生成器耗尽后读取。
 
         参数:
             filename (str): 原PDF文件名
-            chunks (list): 文档分块列表
+            chunks (list | Iterable[dict]): 文档分块列表或分块生成器
             metadata (dict): 文档元数据
             loading_method (str): 使用的加载方法
             strategy (str, optional): 使用的加载策略
@@ -292,24 +696,39 @@ class LoadingService:
                 doc_name = f"{base_name}_{loading_method}_{timestamp}"
             
             # 构建文档数据结构，确保所有值都是可序列化的
-            document_data = {
-                "filename": str(filename),
-                "total_chunks": int(len(chunks)),
-                "total_pages": int(metadata.get("total_pages", 1)),
+            head = {"filename": str(filename)}
+            if isinstance(chunks, list):
+                head["total_chunks"] = int(len(chunks))
+                head["total_pages"] = int(metadata.get("total_pages", 1))
+            head.update({
                 "loading_method": str(loading_method),
                 "loading_strategy": str(strategy) if loading_method == "unstructured" and strategy else None,
                 "chunking_strategy": str(chunking_strategy) if loading_method == "unstructured" and chunking_strategy else None,
                 "chunking_method": "loaded",
-                "timestamp": datetime.now().isoformat(),
-                "chunks": chunks
-            }
+                "timestamp": datetime.now().isoformat()
+            })
             
-            # 保存到文件
+            # 保存到文件，先写临时文件，完整写入后再替换，避免中途失败留下残缺的JSON
             filepath = os.path.join("01-loaded-docs", f"{doc_name}.json")
             os.makedirs("01-loaded-docs", exist_ok=True)
+            # 临时文件名唯一，同一文档的并发保存互不干扰；生成器或写入中途失败时删除临时文件
+            temp_filepath = f"{filepath}.{uuid.uuid4().hex}.tmp"
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(document_data, f, ensure_ascii=False, indent=2)
+            try:
+                with open(temp_filepath, 'w', encoding='utf-8') as f:
+                    write_json_fields(f, head, first=True)
+                    total_chunks = write_json_array(f, "chunks", chunks)
+                    if not isinstance(chunks, list):
+                        write_json_fields(f, {
+                            "total_chunks": total_chunks,
+                            "total_pages": int(metadata.get("total_pages", 1))
+                        }, first=False)
+                    f.write("\n}")
+                os.replace(temp_filepath, filepath)
+            except BaseException:
+                if os.path.exists(temp_filepath):
+                    os.remove(temp_filepath)
+                raise
                 
             return filepath
             
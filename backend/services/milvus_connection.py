@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+from pymilvus import connections, utility
+from utils.config import MILVUS_POOL_CONFIG, get_milvus_config
+
+logger = logging.getLogger(__name__)
+
+class MilvusConnectionManager:
+    """
+    进程内共享的Milvus连接管理器
+
+    每个连接目标（uri + 认证信息）对应一组固定命名的别名，按轮询方式分配给调用方，
+    连接在首次使用时建立并一直保持，不再在每个请求中 connect/disconnect：
+    - 懒连接：别名未连接或已断开时在 acquire 中自动重连；
+    - 健康检查：距上次检查超过 health_check_interval 秒时先 ping 服务端，失败则重连；
+    - 调用方遇到连接错误时调用 mark_unhealthy，下一次 acquire 会立即检查该别名。
+    本地文件数据库（milvus-lite）每个文件只使用一个别名。
+    """
+    def __init__(self, pool_size: int = None, health_check_interval: float = None):
+        self.pool_size = pool_size or MILVUS_POOL_CONFIG["pool_size"]
+        self.health_check_interval = health_check_interval if health_check_interval is not None else MILVUS_POOL_CONFIG["health_check_interval"]
+        self._lock = threading.Lock()
+        self._pools: Dict[str, List[str]] = {}
+        self._next: Dict[str, int] = {}
+        self._params: Dict[str, Dict[str, Any]] = {}
+        self._last_check: Dict[str, float] = {}
+        self._alias_locks: Dict[str, threading.Lock] = {}
+        self._stats = {"connects": 0, "reconnects": 0, "health_checks": 0, "health_check_failures": 0}
+
+    @staticmethod
+    def _connection_params(milvus_config: Dict[str, Any]) -> Dict[str, Any]:
+        params = {"uri": milvus_config["uri"]}
+        # 如果是远程连接，添加认证参数
+        for key in ("user", "password", "token"):
+            if milvus_config.get(key):
+                params[key] = milvus_config[key]
+        return params
+
+    def _pool_key(self, params: Dict[str, Any]) -> str:
+        identity = "|".join(str(params.get(key, "")) for key in ("uri", "user", "token"))
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12]
+
+    def acquire(self, milvus_config: Dict[str, Any] = None) -> str:
+        """
+        获取一个可用的连接别名，传给 Collection(..., using=alias) 和 utility.*(using=alias)
+
+        参数:
+            milvus_config: Milvus配置，默认读取 get_milvus_config()
+
+        返回:
+            已连接的别名
+        """
+        params = self._connection_params(milvus_config or get_milvus_config())
+        key = self._pool_key(params)
+        with self._lock:
+            if key not in self._pools:
+                is_local = not params["uri"].startswith(("http://", "https://", "tcp://", "grpc://"))
+                size = 1 if is_local else max(1, self.pool_size)
+                self._pools[key] = [f"milvus_{key}_{i}" for i in range(size)]
+                self._next[key] = 0
+                for alias in self._pools[key]:
+                    self._params[alias] = params
+                    self._alias_locks[alias] = threading.Lock()
+            pool = self._pools[key]
+            alias = pool[self._next[key] % len(pool)]
+            self._next[key] += 1
+        self._ensure_connected(alias)
+        return alias
+
+    def _ensure_connected(self, alias: str) -> None:
+        # 同一别名的健康检查和重连必须串行，否则并发请求会同时断开/重建同一个连接
+        with self._alias_locks[alias]:
+            now = time.time()
+            if not connections.has_connection(alias):
+                self._connect(alias, reconnect=alias in self._last_check)
+                return
+            if now - self._last_check.get(alias, 0) < self.health_check_interval:
+                return
+            self._stats["health_checks"] += 1
+            try:
+                utility.get_server_version(using=alias)
+                self._last_check[alias] = now
+            except Exception as e:
+                self._stats["health_check_failures"] += 1
+                logger.warning(f"Milvus connection {alias} failed health check ({str(e)}), reconnecting")
+                self._connect(alias, reconnect=True)
+
+    def _connect(self, alias: str, reconnect: bool = False) -> None:
+        """调用方需持有该别名的锁"""
+        if reconnect:
+            try:
+                connections.disconnect(alias)
+            except Exception:
+                pass
+        params = self._params[alias]
+        logger.info(f"Connecting Milvus alias {alias} to {params['uri']}")
+        connections.connect(alias=alias, **params)
+        self._last_check[alias] = time.time()
+        self._stats["reconnects" if reconnect else "connects"] += 1
+
+    def mark_unhealthy(self, alias: str) -> None:
+        """调用方遇到连接相关错误时调用，下一次 acquire 到该别名时会先做健康检查"""
+        lock = self._alias_locks.get(alias)
+        if lock is None:
+            return
+        with lock:
+            self._last_check[alias] = 0
+
+    def close_all(self) -> None:
+        """断开所有连接，在应用关闭时调用"""
+        with self._lock:
+            aliases = [alias for pool in self._pools.values() for alias in pool]
+        for alias in aliases:
+            with self._alias_locks[alias]:
+                try:
+                    if connections.has_connection(alias):
+                        connections.disconnect(alias)
+                except Exception as e:
+                    logger.error(f"Error disconnecting Milvus alias {alias}: {str(e)}")
+                self._last_check.pop(alias, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        连接池状态
+
+        返回:
+            各别名的连接状态、上次健康检查时间以及连接/重连/检查计数
+        """
+        with self._lock:
+            aliases = [alias for pool in self._pools.values() for alias in pool]
+        return {
+            "pools": {
+                alias: {
+                    "uri": self._params[alias]["uri"],
+                    "connected": connections.has_connection(alias),
+                    "last_check": self._last_check.get(alias)
+                }
+                for alias in aliases
+            },
+            **self._stats
+        }
+
+# 进程内共享的连接管理器
+milvus_connections = MilvusConnectionManager()
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+from utils.config import EMBEDDING_REGISTRY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+def estimate_model_bytes(model: Any) -> int:
+    """
+    估算嵌入函数常驻内存的大小：本地模型（如 HuggingFaceEmbeddings 的 SentenceTransformer）按参数和缓冲区字节数计算，
+    自行报告 size_bytes 的模型（如 OnnxEmbeddings）直接使用该值，远程API客户端（OpenAI、Bedrock）只占少量内存，记为0
+
+    参数:
+        model: 嵌入函数对象
+
+    返回:
+        估算的字节数
+    """
+    if isinstance(getattr(model, "size_bytes", None), int):
+        return model.size_bytes
+    client = getattr(model, "client", None)
+    if client is None or not hasattr(client, "parameters"):
+        return 0
+    try:
+        size = sum(p.numel() * p.element_size() for p in client.parameters())
+        if hasattr(client, "buffers"):
+            size += sum(b.numel() * b.element_size() for b in client.buffers())
+        return int(size)
+    except Exception:
+        return 0
+
+class _RegistryEntry:
+    """已加载模型及其统计信息"""
+    def __init__(self, model: Any, size_bytes: int, load_seconds: float):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+
+class EmbeddingModelRegistry:
+    """
+    进程内常驻的嵌入模型注册表，按 (provider, model) 缓存嵌入函数
+
+    原来每次创建嵌入函数都会重新从磁盘加载 sentence-transformer 权重或新建API客户端，
+    现在同一模型在进程内只加载一次：
+    - 本地模型按参数大小计入内存预算，超出预算时按最近最少使用（LRU）顺序淘汰；
+    - 同一模型的并发加载只执行一次，其余调用等待加载结果；
+    - 记录每个模型的加载耗时、命中次数和淘汰次数；
+    - preload 在启动时预先加载配置中的模型。
+    """
+    def __init__(self, memory_budget_bytes: int = None):
+        self.memory_budget_bytes = memory_budget_bytes if memory_budget_bytes is not None else EMBEDDING_REGISTRY_CONFIG["memory_budget_bytes"]
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], _RegistryEntry]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        self._loads = 0
+        self._evictions = 0
+
+    def get(self, provider: str, model_name: str, loader: Callable[[], Any]) -> Any:
+        """
+        获取已加载的嵌入函数，未加载时调用 loader 加载并登记
+
+        参数:
+            provider: 嵌入提供商
+            model_name: 嵌入模型名称
+            loader: 无参数的加载函数，返回嵌入函数对象
+
+        返回:
+            嵌入函数对象
+        """
+        key = (str(provider), model_name)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry.model
+
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            # 等待期间其他线程可能已完成加载
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry.model
+
+            start_time = time.time()
+            model = loader()
+            load_seconds = time.time() - start_time
+            size_bytes = estimate_model_bytes(model)
+            logger.info(f"Loaded embedding model {key[0]}/{key[1]} in {load_seconds:.2f}s ({size_bytes / 1024 ** 2:.1f} MB)")
+
+            with self._lock:
+                self._entries[key] = _RegistryEntry(model, size_bytes, load_seconds)
+                self._loads += 1
+                self._loading.pop(key, None)
+                self._evict(keep=key)
+            return model
+
+    def _lookup(self, key: Tuple[str, str]):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+                entry.last_used = time.time()
+            return entry
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        # 调用方需持有 self._lock；刚加载的模型即使单独超出预算也保留
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep or self._entries[key].size_bytes == 0:
+                continue
+            entry = self._entries.pop(key)
+            total -= entry.size_bytes
+            self._evictions += 1
+            logger.info(f"Evicted embedding model {key[0]}/{key[1]} ({entry.size_bytes / 1024 ** 2:.1f} MB) to stay within memory budget")
+
+    def evict(self, provider: str = None, model_name: str = None) -> int:
+        """
+        手动卸载模型
+
+        参数:
+            provider: 嵌入提供商，为空时卸载全部模型
+            model_name: 嵌入模型名称
+
+        返回:
+            卸载的模型数
+        """
+        with self._lock:
+            if provider is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            return 1 if self._entries.pop((str(provider), model_name), None) is not None else 0
+
+    def preload(self, models: List[Tuple[str, str]], loader: Callable[[str, str], Any]) -> Dict[str, Any]:
+        """
+        预先加载模型，单个模型加载失败只记录错误
+
+        参数:
+            models: (provider, model) 列表
+            loader: 按 (provider, model) 加载嵌入函数的函数
+
+        返回:
+            每个模型的加载结果
+        """
+        results = {}
+        for provider, model_name in models:
+            name = f"{provider}/{model_name}"
+            try:
+                self.get(provider, model_name, lambda: loader(provider, model_name))
+                results[name] = "loaded"
+            except Exception as e:
+                logger.error(f"Error preloading embedding model {name}: {str(e)}")
+                results[name] = f"error: {str(e)}"
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        注册表统计信息
+
+        返回:
+            内存预算和占用、加载/淘汰次数，以及每个模型的大小、加载耗时和命中次数
+        """
+        with self._lock:
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "resident_bytes": sum(entry.size_bytes for entry in self._entries.values()),
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "models": [
+                    {
+                        "provider": provider,
+                        "model": model_name,
+                        "size_bytes": entry.size_bytes,
+                        "load_seconds": entry.load_seconds,
+                        "hits": entry.hits,
+                        "loaded_at": entry.loaded_at,
+                        "last_used": entry.last_used
+                    }
+                    for (provider, model_name), entry in self._entries.items()
+                ]
+            }
+
+# 进程内共享的嵌入模型注册表
+embedding_model_registry = EmbeddingModelRegistry()
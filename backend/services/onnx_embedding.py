@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+from utils.config import ONNX_EMBEDDING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 导出后用于校验与 PyTorch 输出一致性的样例文本，包含中英文和较长文本
+PARITY_TEXTS = [
+    "What was the total revenue reported in the annual report?",
+    "公司本年度实现营业收入同比增长，净利润保持稳定。",
+    "Disclosure ID 2023-0417: related party transactions with subsidiaries.",
+    "DeepSeek 发布的技术报告介绍了混合专家模型的训练方法和推理效率。" * 8,
+    "short"
+]
+
+def model_dir_for(model_name: str) -> str:
+    """获取模型导出目录，模型名中的路径分隔符替换为 "__" """
+    return os.path.join(ONNX_EMBEDDING_CONFIG["dir"], re.sub(r"[^A-Za-z0-9._-]", "__", model_name))
+
+def export_onnx_model(model_name: str, output_dir: str = None, quantize: bool = None) -> Dict[str, Any]:
+    """
+    将 sentence-transformer 模型导出为 ONNX，可选再做 int8 动态量化
+
+    导出的图只包含 Transformer 部分（输出 last_hidden_state），池化和归一化按原模型配置在 numpy 中完成；
+    只支持 Transformer + Pooling (+ Normalize) 结构、池化方式为 cls、mean 或 max 之一的模型。
+    导出依赖 torch 和 sentence-transformers，只在首次使用某个模型时需要。
+
+    参数:
+        model_name: sentence-transformer 模型名称
+        output_dir: 导出目录，默认 ONNX_EMBEDDING_CONFIG["dir"] 下以模型名命名的目录
+        quantize: 是否同时生成 int8 量化模型，默认读取配置
+
+    返回:
+        写入 meta.json 的模型信息
+
+    异常:
+        ValueError: 模型结构或池化方式不受支持，导出后的向量无法与原模型保持一致
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = output_dir or model_dir_for(model_name)
+    quantize = ONNX_EMBEDDING_CONFIG["quantize"] if quantize is None else quantize
+    os.makedirs(output_dir, exist_ok=True)
+    start_time = time.time()
+
+    model = SentenceTransformer(model_name, device="cpu")
+    module_types = [module.__class__.__name__ for module in model]
+    unsupported = [name for name in module_types if name not in ("Transformer", "Pooling", "Normalize")]
+    if unsupported:
+        raise ValueError(f"Cannot export {model_name} to ONNX: unsupported modules {unsupported}")
+
+    # numpy 中只实现了 cls、mean、max 三种池化，其他方式（或多种方式拼接）导出后的向量与原模型不一致
+    pooling = next((module for module in model if module.__class__.__name__ == "Pooling"), None)
+    if pooling is None:
+        raise ValueError(f"Cannot export {model_name} to ONNX: no Pooling module")
+    enabled = [key for key, value in pooling.get_config_dict().items() if key.startswith("pooling_mode_") and value]
+    supported = {"pooling_mode_cls_token": "cls", "pooling_mode_mean_tokens": "mean", "pooling_mode_max_tokens": "max"}
+    if len(enabled) != 1 or enabled[0] not in supported:
+        raise ValueError(f"Cannot export {model_name} to ONNX: unsupported pooling modes {enabled}")
+    pooling_mode = supported[enabled[0]]
+
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    sample = tokenizer(["export sample", "导出样例"], padding=True, return_tensors="pt")
+    input_names = list(sample.keys())
+
+    class _HiddenStates(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs)))[0]
+
+    model_path = os.path.join(output_dir, "model.onnx")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            _HiddenStates(transformer),
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    files = {"fp32": "model.onnx"}
+    if quantize:
+        files["int8"] = quantize_onnx_model(model_path)
+
+    meta = {
+        "model_name": model_name,
+        "pooling_mode": pooling_mode,
+        "normalize": "Normalize" in module_types,
+        "max_seq_length": model.max_seq_length,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "files": files,
+        "export_seconds": time.time() - start_time
+    }
+    with open(os.path.join(output_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    logger.info(f"Exported {model_name} to ONNX in {meta['export_seconds']:.2f}s: {output_dir}")
+    return meta
+
+def quantize_onnx_model(model_path: str) -> str:
+    """
+    对导出的 ONNX 模型做 int8 动态量化（权重量化为 int8，激活在运行时量化）
+
+    参数:
+        model_path: fp32 模型路径
+
+    返回:
+        量化模型的文件名
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = os.path.join(os.path.dirname(model_path), "model.int8.onnx")
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return os.path.basename(quantized_path)
+
+class OnnxEmbeddings:
+    """
+    基于 ONNX Runtime 的 CPU 嵌入模型，接口与 langchain 的 Embeddings 一致（embed_documents / embed_query）
+
+    首次使用某个模型时自动导出；池化方式、归一化和最大序列长度与原 sentence-transformer 模型一致，
+    因此 fp32 模型的向量与 HuggingFaceEmbeddings 的结果可以混用（int8 模型有少量精度损失，见 parity_check）。
+    """
+    def __init__(self, model_name: str, quantize: bool = None, intra_op_threads: int = None, batch_size: int = None, model_dir: str = None):
+        """
+        初始化 ONNX 嵌入模型
+
+        参数:
+            model_name: sentence-transformer 模型名称
+            quantize: 是否使用 int8 量化模型，默认读取配置
+            intra_op_threads: 单个算子使用的线程数，默认读取配置（0 表示由 ONNX Runtime 决定）
+            batch_size: 每次推理的文本数，默认读取配置
+            model_dir: 模型目录，默认按模型名在配置目录下查找，不存在时导出
+        """
+        self.model_name = model_name
+        self.quantize = ONNX_EMBEDDING_CONFIG["quantize"] if quantize is None else quantize
+        self.batch_size = batch_size or ONNX_EMBEDDING_CONFIG["batch_size"]
+        self.model_dir = model_dir or model_dir_for(model_name)
+
+        meta_path = os.path.join(self.model_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            export_onnx_model(model_name, self.model_dir, quantize=self.quantize)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.quantize and "int8" not in self.meta["files"]:
+            self.meta["files"]["int8"] = quantize_onnx_model(os.path.join(self.model_dir, self.meta["files"]["fp32"]))
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f, ensure_ascii=False, indent=2)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = ONNX_EMBEDDING_CONFIG["intra_op_threads"] if intra_op_threads is None else intra_op_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_path = os.path.join(self.model_dir, self.meta["files"]["int8" if self.quantize else "fp32"])
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        # 供模型注册表计算内存占用
+        self.size_bytes = os.path.getsize(model_path)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.meta["max_seq_length"],
+            return_tensors="np"
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+        hidden = self.session.run(None, feeds)[0]
+        mask = encoded["attention_mask"].astype(np.float32)[:, :, None]
+
+        if self.meta["pooling_mode"] == "cls":
+            pooled = hidden[:, 0]
+        elif self.meta["pooling_mode"] == "max":
+            pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+        else:
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.meta["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        嵌入文本列表：按长度排序后分批推理以减少padding，结果按原顺序返回
+
+        参数:
+            texts: 文本列表
+
+        返回:
+            向量列表
+        """
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.zeros((len(texts), self.meta["dimension"]), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            vectors[indices] = self._encode([texts[i] for i in indices])
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """嵌入单条查询文本"""
+        return self._encode([text])[0].tolist()
+
+def parity_check(model_name: str, texts: List[str] = None, quantize: bool = None) -> Dict[str, Any]:
+    """
+    比较 ONNX 模型与原 PyTorch sentence-transformer 模型对同一批文本的输出
+
+    参数:
+        model_name: sentence-transformer 模型名称
+        texts: 用于比较的文本，默认使用内置样例
+        quantize: 是否比较 int8 量化模型，默认读取配置
+
+    返回:
+        逐条余弦相似度的最小值/平均值、最大绝对误差、是否达到阈值，以及两者的吞吐量（chunks/s）
+    """
+    from sentence_transformers import SentenceTransformer
+
+    texts = texts or PARITY_TEXTS
+    quantize = ONNX_EMBEDDING_CONFIG["quantize"] if quantize is None else quantize
+
+    reference_model = SentenceTransformer(model_name, device="cpu")
+    start_time = time.time()
+    reference = reference_model.encode(texts, convert_to_numpy=True)
+    torch_seconds = time.time() - start_time
+
+    onnx_model = OnnxEmbeddings(model_name, quantize=quantize)
+    start_time = time.time()
+    vectors = np.asarray(onnx_model.embed_documents(texts), dtype=np.float32)
+    onnx_seconds = time.time() - start_time
+
+    cosine = (reference * vectors).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1)
+    )
+    threshold = ONNX_EMBEDDING_CONFIG["parity_min_cosine"]["int8" if quantize else "fp32"]
+    result = {
+        "model_name": model_name,
+        "quantized": quantize,
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(reference - vectors).max()),
+        "threshold": threshold,
+        "passed": bool(cosine.min() >= threshold),
+        "torch_chunks_per_second": len(texts) / torch_seconds if torch_seconds else 0.0,
+        "onnx_chunks_per_second": len(texts) / onnx_seconds if onnx_seconds else 0.0
+    }
+    if not result["passed"]:
+        logger.warning(f"ONNX parity check failed for {model_name}: {result}")
+    return result
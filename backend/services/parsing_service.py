@@ -37,19 +37,8 @@ class ParsingService:
             if not page_map:
                 raise ValueError("Page map is required for parsing.")
             
-            parsed_content = []
+            parsed_content = list(self.iter_parse(page_map, method))
             total_pages = len(page_map)
-            
-            if method == "all_text":
-                parsed_content = self._parse_all_text(page_map)
-            elif method == "by_pages":
-                parsed_content = self._parse_by_pages(page_map)
-            elif method == "by_titles":
-                parsed_content = self._parse_by_titles(page_map)
-            elif method == "text_and_tables":
-                parsed_content = self._parse_text_and_tables(page_map)
-            else:
-                raise ValueError(f"Unsupported parsing method: {method}")
                 
             # Create document-level metadata
             document_data = {
@@ -68,42 +57,67 @@ class ParsingService:
             logger.error(f"Error in parse_pdf: {str(e)}")
             raise
 
-    def _parse_all_text(self, page_map: list) -> list:
+    def iter_parse(self, pages, method: str):
+        """
+        以生成器方式解析文档，可以直接消费 LoadingService.iter_pages 的输出，
+        解析结果逐条产出，不需要完整的 page_map
+
+        参数:
+            pages: 页面迭代器，每个元素包含 'page' 和 'text'
+            method (str): 解析方法 ('all_text', 'by_pages', 'by_titles', 或 'text_and_tables')
+
+        生成:
+            dict: 解析出的内容单元
+
+        异常:
+            ValueError: 指定了不支持的解析方法时抛出
+        """
+        if method == "all_text":
+            yield from self._parse_all_text(pages)
+        elif method == "by_pages":
+            yield from self._parse_by_pages(pages)
+        elif method == "by_titles":
+            yield from self._parse_by_titles(pages)
+        elif method == "text_and_tables":
+            yield from self._parse_text_and_tables(pages)
+        else:
+            raise ValueError(f"Unsupported parsing method: {method}")
+
+    def _parse_all_text(self, page_map):
         """
         将文档中的所有文本内容提取为连续流
 
         参数:
-            page_map (list): 包含每页内容的字典列表
+            page_map (Iterable[dict]): 包含每页内容的字典列表或页面迭代器
 
-        返回:
-            list: 包含带页码的文本内容的字典列表
+        生成:
+            dict: 包含带页码的文本内容的字典
         """
-        return [{
-            "type": "Text",
-            "content": page["text"],
-            "page": page["page"]
-        } for page in page_map]
+        for page in page_map:
+            yield {
+                "type": "Text",
+                "content": page["text"],
+                "page": page["page"]
+            }
 
-    def _parse_by_pages(self, page_map: list) -> list:
+    def _parse_by_pages(self, page_map):
         """
         逐页解析文档，保持页面边界
 
         参数:
-            page_map (list): 包含每页内容的字典列表
+            page_map (Iterable[dict]): 包含每页内容的字典列表或页面迭代器
 
-        返回:
-            list: 包含带页码的分页内容的字典列表
+        生成:
+            dict: 包含带页码的分页内容的字典
         """
-        parsed_content = []
         for page in page_map:
-            parsed_content.append({
+            yield {
                 "type": "Page",
                 "page": page["page"],
                 "content": page["text"]
-            })
-        return parsed_content
+            }
 
-    def _parse_by_titles(self, page_map: list) -> list:
+    def _parse_by_titles(self, page_map):
         """
         通过识别标题来解析文档并将内容组织成章节
 
@@ -111,12 +125,11 @@ class ParsingService:
         长度小于60个字符且全部大写的行被视为章节标题
 
         参数:
-            page_map (list): 包含每页内容的字典列表
+            page_map (Iterable[dict]): 包含每页内容的字典列表或页面迭代器
 
-        返回:
-            list: 包含带标题和页码的分章节内容的字典列表
+        生成:
+            dict: 包含带标题和页码的分章节内容的字典
         """
-        parsed_content = []
         current_title = None
         current_content = []
 
@@ -126,12 +139,12 @@ class ParsingService:
                 # Simple heuristic: consider lines with less than 60 chars and all caps as titles
                 if len(line.strip()) < 60 and line.isupper():
                     if current_title:
-                        parsed_content.append({
+                        yield {
                             "type": "section",
                             "title": current_title,
                             "content": '\n'.join(current_content),
                             "page": page["page"]
-                        })
+                        }
                     current_title = line.strip()
                     current_content = []
                 else:
@@ -139,16 +152,14 @@ class ParsingService:
 
         # Add the last section
         if current_title:
-            parsed_content.append({
+            yield {
                 "type": "section",
                 "title": current_title,
                 "content": '\n'.join(current_content),
                 "page": page["page"]
-            })
-
-        return parsed_content
+            }
 
-    def _parse_text_and_tables(self, page_map: list) -> list:
+    def _parse_text_and_tables(self, page_map):
         """
         通过分离文本和表格内容来解析文档
 
@@ -156,26 +167,24 @@ class ParsingService:
         来识别潜在的表格内容
 
         参数:
-            page_map (list): 包含每页内容的字典列表
+            page_map (Iterable[dict]): 包含每页内容的字典列表或页面迭代器
 
-        返回:
-            list: 包含分离的文本和表格内容（带页码）的字典列表
+        生成:
+            dict: 包含分离的文本和表格内容（带页码）的字典
         """
-        parsed_content = []
         for page in page_map:
             # Extract tables using tabula-py or similar library
             # For this example, we'll just simulate table detection
             content = page["text"]
             if '|' in content or '\t' in content:
-                parsed_content.append({
+                yield {
                     "type": "table",
                     "content": content,
                     "page": page["page"]
-                })
+                }
             else:
-                parsed_content.append({
+                yield {
                     "type": "text",
                     "content": content,
                     "page": page["page"]
-                })
-        return parsed_content 
\ No newline at end of file
+                } 
\ No newline at end of file
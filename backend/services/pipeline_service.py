@@ -0,0 +1,354 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+from pymilvus import utility
+from services.loading_service import LoadingService, page_to_chunk
+from services.chunking_service import ChunkingService
+from services.embedding_service import EmbeddingService, EmbeddingConfig
+from services.collection_cache import collection_cache
+from services.lexical_index import lexical_indexes
+from services.vector_store_service import VectorStoreService, VectorDBConfig
+from utils.config import PIPELINE_CONFIG, VectorDBProvider
+from utils.json_stream import write_json_fields, write_json_array
+
+logger = logging.getLogger(__name__)
+
+class PipelineAbortedError(Exception):
+    """流水线的其他阶段已失败时，由队列操作抛出，用于让当前阶段尽快退出"""
+    pass
+
+class _BoundedChannel:
+    """
+    阶段之间的有界队列：队列满时上游阻塞，从而限制驻留内存的页面/分块/向量数量。
+    put/get 会定期检查停止事件，任一阶段失败后其他阶段不会永久阻塞。
+    """
+    _END = object()
+
+    def __init__(self, maxsize: int, stop_event: threading.Event):
+        self.queue = queue.Queue(maxsize=max(1, maxsize))
+        self.stop_event = stop_event
+
+    def put(self, item) -> None:
+        while True:
+            if self.stop_event.is_set():
+                raise PipelineAbortedError("Pipeline aborted")
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self) -> None:
+        self.put(self._END)
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            if self.stop_event.is_set():
+                raise PipelineAbortedError("Pipeline aborted")
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is self._END:
+                return
+            yield item
+
+class IngestionPipeline:
+    """
+    端到端入库流水线：加载 → 分块 → 嵌入 → 索引 在内存中串联完成。
+
+    各阶段运行在独立线程中，通过有界队列逐页/逐批传递数据，嵌入模型调用和Milvus写入可以
+    与PDF解析重叠进行；01-loaded-docs、01-chunked-docs、02-embedded-docs 等中间文件
+    只在显式要求时写出。
+    """
+    def __init__(self):
+        self.loading_service = LoadingService()
+        self.chunking_service = ChunkingService()
+        self.embedding_service = EmbeddingService()
+        self.vector_store_service = VectorStoreService()
+
+    def run(
+        self,
+        file_path: str,
+        filename: str,
+        loading_method: str,
+        embedding_config: EmbeddingConfig,
+        vector_db_config: VectorDBConfig,
+        chunking_method: str = None,
+        chunk_size: int = 1000,
+        strategy: str = None,
+        chunking_strategy: str = None,
+        chunking_options: dict = None,
+        parallel: bool = False,
+        file_hash: str = None,
+        save_loaded: bool = False,
+        save_chunked: bool = False,
+        save_embedded: bool = False,
+        batch_size: int = None,
+        queue_size: int = None,
+        progress_callback=None
+    ) -> Dict[str, Any]:
+        """
+        对单个PDF执行完整的入库流程
+
+        参数:
+            file_path: PDF文件路径
+            filename: 原始文件名，用于collection命名和中间文件
+            loading_method: 加载方法
+            embedding_config: 嵌入配置对象
+            vector_db_config: 向量数据库配置对象
+            chunking_method: 分块方法，为空时直接使用加载结果（每页一个chunk）
+            chunk_size: 固定大小分块时的块大小
+            strategy: unstructured 加载策略
+            chunking_strategy: unstructured 分块策略
+            chunking_options: unstructured 分块参数
+            parallel: 是否多进程并行提取页面
+            file_hash: 文件内容哈希，用于加载缓存
+            save_loaded: 是否写出 01-loaded-docs 文件
+            save_chunked: 是否写出 01-chunked-docs 文件（仅在指定 chunking_method 时有效）
+            save_embedded: 是否写出 02-embedded-docs 文件
+            batch_size: 每次嵌入调用的chunk数，默认取 PIPELINE_CONFIG
+            queue_size: 阶段间队列长度，默认取 PIPELINE_CONFIG
+            progress_callback: 可选的进度回调，参数为 (已索引向量数, None, pages=已加载页数, chunks=已分块数)，
+                可通过抛出异常中断处理
+
+        返回:
+            包含collection名称、各阶段数量、处理时间和中间文件路径的结果字典
+        """
+        if vector_db_config.provider != VectorDBProvider.MILVUS:
+            raise ValueError(f"Unsupported vector database: {vector_db_config.provider}")
+
+        start_time = time.time()
+        batch_size = batch_size or PIPELINE_CONFIG["batch_size"]
+        queue_size = queue_size or PIPELINE_CONFIG["queue_size"]
+        stop_event = threading.Event()
+        errors: List[BaseException] = []
+        counts = {"pages": 0, "chunks": 0, "vectors": 0}
+        artifacts: Dict[str, str] = {}
+        loaded_channel = _BoundedChannel(queue_size * batch_size, stop_event)
+        batch_channel = _BoundedChannel(queue_size, stop_event)
+        vector_channel = _BoundedChannel(queue_size, stop_event)
+        embedded_results = [] if save_embedded else None
+        metadata = {"filename": filename, "total_pages": 0}
+
+        def load_stage():
+            pages = self.loading_service.iter_pages(
+                file_path,
+                loading_method,
+                strategy=strategy,
+                chunking_strategy=chunking_strategy,
+                chunking_options=chunking_options,
+                parallel=parallel,
+                file_hash=file_hash
+            )
+
+            def loaded_chunks():
+                for idx, page in enumerate(pages, 1):
+                    chunk = page_to_chunk(page, idx)
+                    loaded_channel.put(chunk)
+                    counts["pages"] += 1
+                    metadata["total_pages"] = max(metadata["total_pages"], page["page"])
+                    yield chunk
+
+            if save_loaded:
+                artifacts["loaded"] = self.loading_service.save_document(
+                    filename=filename,
+                    chunks=loaded_chunks(),
+                    metadata=metadata,
+                    loading_method=loading_method,
+                    strategy=strategy,
+                    chunking_strategy=chunking_strategy
+                )
+            else:
+                for _ in loaded_chunks():
+                    pass
+            loaded_channel.close()
+
+        def chunk_stage():
+            if chunking_method:
+                chunks = self.chunking_service.iter_chunks(
+                    ({"page": chunk["metadata"]["page_number"], "text": chunk["content"]} for chunk in loaded_channel),
+                    chunking_method,
+                    chunk_size=chunk_size
+                )
+            else:
+                chunks = iter(loaded_channel)
+
+            if chunking_method and save_chunked:
+                artifacts["chunked"] = self._save_chunked(
+                    filename, loading_method, chunking_method, metadata, self._batched(chunks, batch_size, batch_channel, counts)
+                )
+            else:
+                for _ in self._batched(chunks, batch_size, batch_channel, counts):
+                    pass
+            batch_channel.close()
+
+        def embed_stage():
+            embedding_function = self.embedding_service.embedding_factory.create_embedding_function(embedding_config)
+            for batch in batch_channel:
+                results = self.embedding_service.embed_chunks(
+                    batch,
+                    embedding_config,
+                    filename=filename,
+                    embedding_function=embedding_function
+                )
+                if embedded_results is not None:
+                    embedded_results.extend(results)
+                vector_channel.put(results)
+            vector_channel.close()
+
+        def run_stage(stage):
+            try:
+                stage()
+            except PipelineAbortedError:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop_event.set()
+
+        threads = [
+            threading.Thread(target=run_stage, args=(stage,), name=f"pipeline-{stage.__name__}", daemon=True)
+            for stage in (load_stage, chunk_stage, embed_stage)
+        ]
+        for thread in threads:
+            thread.start()
+
+        state = {"collection_name": None}
+        try:
+            try:
+                self._index_stage(
+                    vector_channel, filename, embedding_config, vector_db_config, counts, state, progress_callback
+                )
+            except PipelineAbortedError:
+                pass
+            except BaseException as e:
+                errors.insert(0, e)
+                stop_event.set()
+            finally:
+                for thread in threads:
+                    thread.join()
+            if errors:
+                raise errors[0]
+        except BaseException:
+            if state["collection_name"]:
+                self._drop_partial_collection(state["collection_name"], vector_db_config)
+            raise
+
+        total_chunks = counts["chunks"]
+        if embedded_results:
+            for result in embedded_results:
+                result["metadata"]["total_chunks"] = total_chunks
+            artifacts["embedded"] = self.embedding_service.save_embeddings(
+                os.path.basename(artifacts.get("chunked") or artifacts.get("loaded") or filename),
+                embedded_results
+            )
+
+        return {
+            "filename": filename,
+            "collection_name": state["collection_name"],
+            "database": vector_db_config.provider,
+            "index_mode": vector_db_config.index_mode,
+            "embedding_provider": embedding_config.provider,
+            "embedding_model": embedding_config.model_name,
+            "chunking_method": chunking_method or "loaded",
+            "total_pages": metadata["total_pages"],
+            "total_chunks": total_chunks,
+            "total_vectors": counts["vectors"],
+            "processing_time": time.time() - start_time,
+            "artifacts": artifacts,
+            "cache_hit": self.loading_service.cache_hit
+        }
+
+    def _batched(self, chunks: Iterable[dict], batch_size: int, channel: _BoundedChannel, counts: Dict[str, int]) -> Iterator[dict]:
+        """
+        逐个透传chunk（供可选的中间文件写出），同时按 batch_size 攒批送入下一阶段
+        """
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            counts["chunks"] += 1
+            yield chunk
+            if len(batch) >= batch_size:
+                channel.put(batch)
+                batch = []
+        if batch:
+            channel.put(batch)
+
+    def _index_stage(self, vector_channel: _BoundedChannel, filename: str, embedding_config: EmbeddingConfig,
+                     vector_db_config: VectorDBConfig, counts: Dict[str, int], state: Dict[str, Any], progress_callback=None) -> None:
+        """
+        在调用线程中消费嵌入结果并写入Milvus：收到第一批向量时按其维度创建collection
+        （名称记录在 state 中，失败时据此清理），全部写入后创建索引并加载
+        """
+        collection = None
+        for results in vector_channel:
+            if collection is None:
+                alias = vector_db_config._connect_to_milvus()
+                collection_name = self.vector_store_service._make_collection_name(filename, embedding_config.provider)
+                state["collection_name"] = collection_name
+                collection = self.vector_store_service._create_milvus_collection(
+                    collection_name, len(results[0]["embedding"]), vector_db_config, alias
+                )
+
+            columns = self.vector_store_service._build_milvus_columns(
+                [result["metadata"] for result in results],
+                [result["embedding"] for result in results],
+                filename,
+                embedding_config.provider,
+                embedding_config.model_name
+            )
+            counts["vectors"] += self.vector_store_service._insert_with_retry(collection, columns)
+            if progress_callback:
+                progress_callback(counts["vectors"], None, pages=counts["pages"], chunks=counts["chunks"])
+
+        if collection is not None:
+            logger.info(f"Pipeline inserted {counts['vectors']} vectors into {state['collection_name']}")
+            self.vector_store_service._finalize_milvus_collection(collection, vector_db_config)
+
+    def _save_chunked(self, filename: str, loading_method: str, chunking_method: str, metadata: dict, chunks: Iterable[dict]) -> str:
+        """
+        流式写出 01-chunked-docs 文件，格式与 /chunk 接口输出一致；
+        total_chunks 和 total_pages 在分块写完后才确定，因此写在 chunks 字段之后
+        """
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        base_name = filename.replace('.pdf', '').split('_')[0]
+        output_path = os.path.join("01-chunked-docs", f"{base_name}_{chunking_method}_{timestamp}.json")
+        os.makedirs("01-chunked-docs", exist_ok=True)
+        temp_path = f"{output_path}.tmp"
+
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                write_json_fields(f, {
+                    "filename": filename,
+                    "loading_method": loading_method,
+                    "chunking_method": chunking_method,
+                    "timestamp": datetime.now().isoformat()
+                }, first=True)
+                total_chunks = write_json_array(f, "chunks", chunks)
+                write_json_fields(f, {
+                    "total_chunks": total_chunks,
+                    "total_pages": int(metadata.get("total_pages", 0))
+                }, first=False)
+                f.write("\n}")
+            os.replace(temp_path, output_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return output_path
+
+    def _drop_partial_collection(self, collection_name: str, vector_db_config: VectorDBConfig) -> None:
+        """流水线失败或被取消时删除已创建但未写完的collection"""
+        try:
+            alias = vector_db_config._connect_to_milvus()
+            if utility.has_collection(collection_name, using=alias):
+                utility.drop_collection(collection_name, using=alias)
+                collection_cache.invalidate(collection_name)
+                lexical_indexes.drop(collection_name)
+                logger.info(f"Dropped partial collection {collection_name}")
+        except Exception as e:
+            logger.error(f"Error dropping partial collection {collection_name}: {str(e)}")
@@ -1,14 +1,40 @@
 from typing import List, Dict, Any, Optional
 import logging
+import time
 from datetime import datetime
-from pymilvus import connections, Collection, utility
+from pymilvus import Collection, utility
 from services.embedding_service import EmbeddingService
-from utils.config import VectorDBProvider, get_milvus_config
+from services.milvus_connection import milvus_connections
+from services.collection_cache import collection_cache
+from services.lexical_index import lexical_indexes, reciprocal_rank_fusion
+from utils.config import VectorDBProvider, get_milvus_config, LEXICAL_INDEX_CONFIG, SEARCH_CONFIG
 import os
 import json
 
 logger = logging.getLogger(__name__)
 
+# 检索结果需要返回的字段
+OUTPUT_FIELDS = [
+    "content",
+    "document_name",
+    "chunk_id",
+    "total_chunks",
+    "word_count",
+    "page_number",
+    "page_range",
+    "embedding_provider",
+    "embedding_model",
+    "embedding_timestamp"
+]
+
+SEARCH_PARAMS = {
+    "metric_type": "COSINE",
+    "params": {"nprobe": 10}
+}
+
+# 检索方式：dense 只用向量检索；hybrid 将向量检索与 BM25 词法检索的结果按倒数排名融合
+SEARCH_MODES = ("dense", "hybrid")
+
 class SearchService:
     """
     搜索服务类，负责向量数据库的连接和向量搜索功能
@@ -25,24 +51,15 @@ class SearchService:
         self.search_results_dir = "04-search-results"
         os.makedirs(self.search_results_dir, exist_ok=True)
 
-    def _connect_to_milvus(self):
+    def _connect_to_milvus(self) -> str:
         """
-        连接到Milvus数据库，支持本地和远程连接
+        从进程内共享的连接池获取Milvus连接，支持本地和远程连接；
+        连接在进程内保持，搜索请求不再包含建立连接的耗时
+
+        Returns:
+            str: 连接别名
         """
-        connection_params = {
-            "alias": "default",
-            "uri": self.milvus_uri
-        }
-        
-        # 如果是远程连接，添加认证参数
-        if self.milvus_config.get("user"):
-            connection_params["user"] = self.milvus_config["user"]
-        if self.milvus_config.get("password"):
-            connection_params["password"] = self.milvus_config["password"]
-        if self.milvus_config.get("token"):
-            connection_params["token"] = self.milvus_config["token"]
-        
-        connections.connect(**connection_params)
+        return milvus_connections.acquire(self.milvus_config)
 
     def get_providers(self) -> List[Dict[str, str]]:
         """
@@ -68,15 +85,16 @@ class SearchService:
         Raises:
             Exception: 连接或查询集合时发生错误
         """
+        alias = None
         try:
-            self._connect_to_milvus()
+            alias = self._connect_to_milvus()
             
             collections = []
-            collection_names = utility.list_collections()
+            collection_names = utility.list_collections(using=alias)
             
             for name in collection_names:
                 try:
-                    collection = Collection(name)
+                    collection = Collection(name, using=alias)
                     collections.append({
                         "id": name,
                         "name": name,
@@ -89,9 +107,135 @@ class SearchService:
             
         except Exception as e:
             logger.error(f"Error listing collections: {str(e)}")
+            if alias:
+                milvus_connections.mark_unhealthy(alias)
             raise
-        finally:
-            connections.disconnect("default")
+
+    def collection_version(self, collection_id: str) -> Dict[str, Any]:
+        """
+        获取collection当前内容的版本标记，用于判断基于该collection的评估结果是否仍然有效：
+        删除后同名重建时 collection_id/created_timestamp 变化，增量写入后实体数或词法索引的重建时间变化
+
+        Args:
+            collection_id (str): 集合ID
+
+        Returns:
+            Dict[str, Any]: 包含 collection_id、created_timestamp、num_entities 和 lexical_built_at 的字典
+
+        Raises:
+            ValueError: 集合不存在
+        """
+        alias = None
+        try:
+            alias = self._connect_to_milvus()
+            if not utility.has_collection(collection_id, using=alias):
+                raise ValueError(f"Collection {collection_id} does not exist")
+            collection = Collection(collection_id, using=alias)
+            description = collection.describe()
+            return {
+                "collection_id": description.get("collection_id"),
+                "created_timestamp": description.get("created_timestamp"),
+                "num_entities": collection.num_entities,
+                "lexical_built_at": lexical_indexes.modified_at(collection_id)
+            }
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting version of collection {collection_id}: {str(e)}")
+            if alias:
+                milvus_connections.mark_unhealthy(alias)
+            raise
+
+    @staticmethod
+    def _format_result(get, score: float) -> Dict[str, Any]:
+        """
+        将检索到的实体转换为返回格式
+        
+        Args:
+            get: 按字段名取值的函数（hit.entity.get 或 query 结果字典的 get）
+            score (float): 结果得分
+            
+        Returns:
+            Dict[str, Any]: 包含文本、得分和元数据的字典
+        """
+        return {
+            "text": get("content"),
+            "score": score,
+            "metadata": {
+                "source": get("document_name"),
+                "page": get("page_number"),
+                "chunk": get("chunk_id"),
+                "total_chunks": get("total_chunks"),
+                "page_range": get("page_range"),
+                "embedding_provider": get("embedding_provider"),
+                "embedding_model": get("embedding_model"),
+                "embedding_timestamp": get("embedding_timestamp")
+            }
+        }
+
+    def _collect_hits(self, hits, threshold: float) -> Dict[int, Dict[str, Any]]:
+        """
+        过滤低于相似度阈值的命中结果并转换为返回格式
+        
+        Args:
+            hits: 单个查询向量的检索结果
+            threshold (float): 相似度阈值
+            
+        Returns:
+            Dict[int, Dict[str, Any]]: 主键 → 检索结果，按得分从高到低排列
+        """
+        dense_results = {}
+        for hit in hits:
+            logger.debug(f"Processing hit - Score: {hit.score}, Word Count: {hit.entity.get('word_count')}")
+            if hit.score >= threshold:
+                dense_results[hit.id] = self._format_result(hit.entity.get, float(hit.score))
+        return dense_results
+
+    def _fuse_lexical(self, query: str, collection_id: str, collection: Collection, dense_results: Dict[int, Dict[str, Any]],
+                      limit: int, top_k: int, word_count_threshold: int) -> List[Dict[str, Any]]:
+        """
+        BM25 词法检索并与向量检索结果按倒数排名融合（RRF）
+        
+        Args:
+            query (str): 搜索查询文本
+            collection_id (str): 集合ID
+            collection (Collection): 已加载的Collection对象，词法索引不存在时用于现场构建
+            dense_results (Dict[int, Dict[str, Any]]): 主键 → 向量检索结果，按得分从高到低排列
+            limit (int): 词法检索召回的候选数
+            top_k (int): 融合后返回的最大结果数量
+            word_count_threshold (int): 文本字数阈值
+            
+        Returns:
+            List[Dict[str, Any]]: 融合后的结果列表
+        """
+        lexical_index = lexical_indexes.get(collection_id, collection)
+        lexical_hits = lexical_index.search(query, limit, min_word_count=word_count_threshold)
+        logger.info(f"Lexical search hits: {len(lexical_hits)}")
+        bm25_scores = dict(lexical_hits)
+        fused = reciprocal_rank_fusion([list(dense_results), [pk for pk, _ in lexical_hits]])[:top_k]
+        
+        # 只由词法检索召回的chunk需要从collection中读取字段
+        missing = [pk for pk, _ in fused if pk not in dense_results]
+        entities = {}
+        if missing:
+            rows = collection.query(expr=f"id in [{', '.join(str(pk) for pk in missing)}]", output_fields=["id"] + OUTPUT_FIELDS)
+            entities = {row["id"]: row for row in rows}
+        
+        processed_results = []
+        for pk, score in fused:
+            if pk in dense_results:
+                result = dense_results[pk]
+                result["dense_score"] = result["score"]
+            elif pk in entities:
+                result = self._format_result(entities[pk].get, 0.0)
+                result["dense_score"] = None
+            else:
+                # 词法索引中的chunk已被删除
+                continue
+            result["score"] = score
+            result["bm25_score"] = bm25_scores.get(pk)
+            processed_results.append(result)
+        return processed_results
 
     def save_search_results(self, query: str, collection_id: str, results: List[Dict[str, Any]]) -> str:
         """
@@ -140,7 +284,8 @@ class SearchService:
                     top_k: int = 3, 
                     threshold: float = 0.7,
                     word_count_threshold: int = 20,
-                    save_results: bool = False) -> Dict[str, Any]:
+                    save_results: bool = False,
+                    mode: str = "dense") -> Dict[str, Any]:
         """
         执行向量搜索
         
@@ -151,6 +296,8 @@ class SearchService:
             threshold (float): 相似度阈值，低于此值的结果将被过滤，默认为0.7
             word_count_threshold (int): 文本字数阈值，低于此值的结果将被过滤，默认为20
             save_results (bool): 是否保存搜索结果，默认为False
+            mode (str): 检索方式，dense（默认）或 hybrid。hybrid 时向量和 BM25 各召回候选，
+                相似度阈值只作用于向量一路，结果的 score 为融合得分，dense_score / bm25_score 为各路原始得分
             
         Returns:
             Dict[str, Any]: 包含搜索结果的字典，如果保存结果则包含保存路径
@@ -158,6 +305,9 @@ class SearchService:
         Raises:
             Exception: 搜索过程中发生错误
         """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode}")
+        alias = None
         try:
             # 添加参数日志
             logger.info(f"Search parameters:")
@@ -167,93 +317,54 @@ class SearchService:
             logger.info(f"- Threshold: {threshold}")
             logger.info(f"- Word Count Threshold: {word_count_threshold}")
             logger.info(f"- Save Results: {save_results} (type: {type(save_results)})")
+            logger.info(f"- Mode: {mode}")
 
             logger.info(f"Starting search with parameters - Collection: {collection_id}, Query: {query}, Top K: {top_k}")
             
-            # 连接到 Milvus
-            logger.info(f"Connecting to Milvus at {self.milvus_uri}")
-            self._connect_to_milvus()
+            # 从连接池获取 Milvus 连接
+            alias = self._connect_to_milvus()
             
-            # 获取collection
-            logger.info(f"Loading collection: {collection_id}")
-            collection = Collection(collection_id)
-            collection.load()
+            # 获取已加载的collection及其embedding配置，命中缓存时不再 load() 和抽样查询
+            info = collection_cache.get(collection_id, alias)
+            collection = info.collection
             
             # 记录collection的基本信息
-            logger.info(f"Collection info - Entities: {collection.num_entities}")
-            
-            # 从collection中读取embedding配置
-            logger.info("Querying sample entity for embedding configuration")
-            sample_entity = collection.query(
-                expr="id >= 0", 
-                output_fields=["embedding_provider", "embedding_model"],
-                limit=1
-            )
-            if not sample_entity:
-                logger.error(f"Collection {collection_id} is empty")
-                raise ValueError(f"Collection {collection_id} is empty")
-            
-            logger.info(f"Sample entity configuration: {sample_entity[0]}")
+            logger.info(f"Collection info - Entities: {info.num_entities}, Provider: {info.embedding_provider}, Model: {info.embedding_model}")
             
             # 使用collection中存储的配置创建查询向量
             logger.info("Creating query embedding")
             query_embedding = self.embedding_service.create_single_embedding(
                 query,
-                provider=sample_entity[0]["embedding_provider"],
-                model=sample_entity[0]["embedding_model"]
+                provider=info.embedding_provider,
+                model=info.embedding_model
             )
             logger.info(f"Query embedding created with dimension: {len(query_embedding)}")
             
             # 执行搜索
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
-            }
-            logger.info(f"Executing search with params: {search_params}")
+            logger.info(f"Executing search with params: {SEARCH_PARAMS}")
             logger.info(f"Word count threshold filter: word_count >= {word_count_threshold}")
             
+            # 混合检索时向量一路多召回一些候选，融合后再截取 top_k
+            limit = max(top_k, LEXICAL_INDEX_CONFIG["hybrid_candidates"]) if mode == "hybrid" else top_k
             results = collection.search(
                 data=[query_embedding],
                 anns_field="vector",
-                param=search_params,
-                limit=top_k,
+                param=SEARCH_PARAMS,
+                limit=limit,
                 expr=f"word_count >= {word_count_threshold}",
-                output_fields=[
-                    "content",
-                    "document_name",
-                    "chunk_id",
-                    "total_chunks",
-                    "word_count",
-                    "page_number",
-                    "page_range",
-                    "embedding_provider",
-                    "embedding_model",
-                    "embedding_timestamp"
-                ]
+                output_fields=OUTPUT_FIELDS
             )
             
             # 处理结果
-            processed_results = []
             logger.info(f"Raw search results count: {len(results[0])}")
-            
-            for hits in results:
-                for hit in hits:
-                    logger.info(f"Processing hit - Score: {hit.score}, Word Count: {hit.entity.get('word_count')}")
-                    if hit.score >= threshold:
-                        processed_results.append({
-                            "text": hit.entity.content,
-                            "score": float(hit.score),
-                            "metadata": {
-                                "source": hit.entity.document_name,
-                                "page": hit.entity.page_number,
-                                "chunk": hit.entity.chunk_id,
-                                "total_chunks": hit.entity.total_chunks,
-                                "page_range": hit.entity.page_range,
-                                "embedding_provider": hit.entity.embedding_provider,
-                                "embedding_model": hit.entity.embedding_model,
-                                "embedding_timestamp": hit.entity.embedding_timestamp
-                            }
-                        })
+            dense_results = self._collect_hits(results[0], threshold)
+
+            if mode == "hybrid":
+                processed_results = self._fuse_lexical(
+                    query, collection_id, collection, dense_results, limit, top_k, word_count_threshold
+                )
+            else:
+                processed_results = list(dense_results.values())
 
             response_data = {"results": processed_results}
             
@@ -279,6 +390,89 @@ class SearchService:
             
         except Exception as e:
             logger.error(f"Error performing search: {str(e)}")
+            # collection 可能已被其他进程删除或重建，下次检索重新读取
+            collection_cache.invalidate(collection_id)
+            if alias:
+                milvus_connections.mark_unhealthy(alias)
+            raise
+
+    def search_batch(self,
+                     queries: List[str],
+                     collection_id: str,
+                     top_k: int = 3,
+                     threshold: float = 0.7,
+                     word_count_threshold: int = 20,
+                     mode: str = "dense") -> List[Dict[str, Any]]:
+        """
+        批量执行向量搜索：所有查询只获取一次collection、批量嵌入一次，
+        再按 SEARCH_CONFIG["batch_size"] 分组，以多向量请求提交给 collection.search；
+        相似度阈值、字数过滤和混合检索对每个查询分别生效，结果与逐条调用 search 一致。
+        嵌入和检索都是同步调用，在 async 接口中需通过 asyncio.to_thread 调用，避免阻塞事件循环
+        
+        Args:
+            queries (List[str]): 搜索查询文本列表
+            collection_id (str): 要搜索的集合ID
+            top_k (int): 每个查询返回的最大结果数量，默认为3
+            threshold (float): 相似度阈值，默认为0.7
+            word_count_threshold (int): 文本字数阈值，默认为20
+            mode (str): 检索方式，dense（默认）或 hybrid
+            
+        Returns:
+            List[Dict[str, Any]]: 与 queries 顺序一致的列表，每项包含 query 和 results
+            
+        Raises:
+            Exception: 搜索过程中发生错误
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode}")
+        if not queries:
+            return []
+        alias = None
+        try:
+            start_time = time.time()
+            alias = self._connect_to_milvus()
+            info = collection_cache.get(collection_id, alias)
+            collection = info.collection
+            
+            query_embeddings = self.embedding_service.create_query_embeddings(
+                queries,
+                provider=info.embedding_provider,
+                model=info.embedding_model
+            )
+            embed_time = time.time() - start_time
+            
+            limit = max(top_k, LEXICAL_INDEX_CONFIG["hybrid_candidates"]) if mode == "hybrid" else top_k
+            batch_size = SEARCH_CONFIG["batch_size"]
+            responses = []
+            for start in range(0, len(queries), batch_size):
+                results = collection.search(
+                    data=query_embeddings[start:start + batch_size],
+                    anns_field="vector",
+                    param=SEARCH_PARAMS,
+                    limit=limit,
+                    expr=f"word_count >= {word_count_threshold}",
+                    output_fields=OUTPUT_FIELDS
+                )
+                for query, hits in zip(queries[start:start + batch_size], results):
+                    dense_results = self._collect_hits(hits, threshold)
+                    if mode == "hybrid":
+                        processed_results = self._fuse_lexical(
+                            query, collection_id, collection, dense_results, limit, top_k, word_count_threshold
+                        )
+                    else:
+                        processed_results = list(dense_results.values())
+                    responses.append({"query": query, "results": processed_results})
+            
+            elapsed = time.time() - start_time
+            logger.info(
+                f"Batch search of {len(queries)} queries on {collection_id} ({mode}) in {elapsed:.2f}s "
+                f"(embedding {embed_time:.2f}s)"
+            )
+            return responses
+            
+        except Exception as e:
+            logger.error(f"Error performing batch search: {str(e)}")
+            collection_cache.invalidate(collection_id)
+            if alias:
+                milvus_connections.mark_unhealthy(alias)
             raise
-        finally:
-            connections.disconnect("default") 
\ No newline at end of file
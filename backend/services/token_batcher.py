@@ -0,0 +1,100 @@
+import logging
+from typing import Callable, Dict, List, Tuple
+from utils.config import EMBEDDING_BATCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 已创建的 tiktoken 编码器，按模型缓存；None 表示不可用，使用字符数估算
+_encoders: Dict[str, object] = {}
+
+def _get_encoder(model: str):
+    if model not in _encoders:
+        try:
+            import tiktoken
+            try:
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoders[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # tiktoken 未安装或无法下载编码文件时退回到估算
+            logger.warning(f"tiktoken unavailable for {model}, estimating tokens from characters: {str(e)}")
+            _encoders[model] = None
+    return _encoders[model]
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """
+    获取模型的token计数函数，优先使用 tiktoken，不可用时按约4个字符一个token估算
+
+    参数:
+        model: 嵌入模型名称
+
+    返回:
+        接受文本、返回token数的函数
+    """
+    encoder = _get_encoder(model)
+    if encoder is None:
+        return lambda text: len(text) // 4 + 1
+    return lambda text: len(encoder.encode(text, disallowed_special=()))
+
+def split_by_tokens(text: str, model: str, max_tokens: int = None) -> List[Tuple[str, int]]:
+    """
+    把超过单条输入token上限的文本按token切成若干段（与 langchain 的 check_embedding_ctx_length 处理一致），
+    未超过上限的文本原样返回一段
+
+    参数:
+        text: 文本
+        model: 嵌入模型名称，用于选择分词器
+        max_tokens: 单条输入的token上限，默认读取配置
+
+    返回:
+        (文本段, token数) 列表
+    """
+    max_tokens = max_tokens or EMBEDDING_BATCH_CONFIG["openai_max_tokens_per_input"]
+    encoder = _get_encoder(model)
+    if encoder is None:
+        # 与估算方式一致：约4个字符一个token
+        tokens = len(text) // 4 + 1
+        if tokens <= max_tokens:
+            return [(text, tokens)]
+        step = (max_tokens - 1) * 4
+        return [(text[i:i + step], len(text[i:i + step]) // 4 + 1) for i in range(0, len(text), step)]
+    token_ids = encoder.encode(text, disallowed_special=())
+    if len(token_ids) <= max_tokens:
+        return [(text, len(token_ids))]
+    return [
+        (encoder.decode(token_ids[i:i + max_tokens]), len(token_ids[i:i + max_tokens]))
+        for i in range(0, len(token_ids), max_tokens)
+    ]
+
+def token_batches(texts: List[str], model: str, max_tokens: int = None, max_items: int = None) -> List[List[str]]:
+    """
+    按token数把文本打包成请求批次：保持原有顺序，每批的token总数不超过 max_tokens、条数不超过 max_items；
+    短文本合并到同一请求中减少请求开销，长文本不会让单个请求超出提供商的token上限
+
+    参数:
+        texts: 文本列表
+        model: 嵌入模型名称，用于选择分词器
+        max_tokens: 每个请求的token上限，默认读取配置
+        max_items: 每个请求的最大条数，默认读取配置
+
+    返回:
+        文本批次列表，展开后与 texts 顺序一致
+    """
+    max_tokens = max_tokens or EMBEDDING_BATCH_CONFIG["openai_max_tokens_per_request"]
+    max_items = max_items or EMBEDDING_BATCH_CONFIG["openai_max_items_per_request"]
+    count = token_counter(model)
+
+    batches, batch, batch_tokens = [], [], 0
+    for text in texts:
+        tokens = count(text)
+        if tokens > EMBEDDING_BATCH_CONFIG["openai_max_tokens_per_input"]:
+            logger.warning(f"Text with {tokens} tokens exceeds the per-input limit and may be rejected by the provider")
+        # 单条超过上限的文本单独成批
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
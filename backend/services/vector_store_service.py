@@ -4,9 +4,18 @@ import json
 from typing import List, Dict, Any
 import logging
 from pathlib import Path
-from pymilvus import connections, utility
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from pymilvus import utility
 from pymilvus import Collection, DataType, FieldSchema, CollectionSchema
-from utils.config import VectorDBProvider, get_milvus_config  # Updated import
+from utils.config import VectorDBProvider, get_milvus_config, INDEX_CONFIG  # Updated import
+from services.embedding_store import open_embedding_file
+from services.milvus_connection import milvus_connections
+from services.collection_cache import collection_cache
+from services.lexical_index import lexical_indexes
+from services.evaluation_service import invalidate_raw_hits
 
 logger = logging.getLogger(__name__)
 
@@ -27,24 +36,14 @@ class VectorDBConfig:
         self.milvus_config = get_milvus_config()
         self.milvus_uri = self.milvus_config["uri"]
 
-    def _connect_to_milvus(self):
+    def _connect_to_milvus(self) -> str:
         """
-        连接到Milvus数据库，支持本地和远程连接
+        从进程内共享的连接池获取Milvus连接，支持本地和远程连接
+
+        返回:
+            连接别名，传给 Collection(..., using=alias) 和 utility.*(using=alias)
         """
-        connection_params = {
-            "alias": "default",
-            "uri": self.milvus_uri
-        }
-        
-        # 如果是远程连接，添加认证参数
-        if self.milvus_config.get("user"):
-            connection_params["user"] = self.milvus_config["user"]
-        if self.milvus_config.get("password"):
-            connection_params["password"] = self.milvus_config["password"]
-        if self.milvus_config.get("token"):
-            connection_params["token"] = self.milvus_config["token"]
-        
-        connections.connect(**connection_params)
+        return milvus_connections.acquire(self.milvus_config)
 
     def _get_milvus_index_type(self, index_mode: str) -> str:
         """
@@ -106,13 +105,15 @@ class VectorStoreService:
         """
         return config._get_milvus_index_params(config.index_mode)
     
-    def index_embeddings(self, embedding_file: str, config: VectorDBConfig) -> Dict[str, Any]:
+    def index_embeddings(self, embedding_file: str, config: VectorDBConfig, progress_callback=None, collection_name: str = None) -> Dict[str, Any]:
         """
         将嵌入向量索引到向量数据库
         
         参数:
             embedding_file: 嵌入向量文件路径
             config: 向量数据库配置对象
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 总向量数)，可通过抛出异常中断处理
+            collection_name: 指定已有的collection时以增量（upsert）方式写入，否则新建collection
             
         返回:
             索引结果信息字典
@@ -124,182 +125,517 @@ class VectorStoreService:
         
         # 根据不同的数据库进行索引
         if config.provider == VectorDBProvider.MILVUS:
-            result = self._index_to_milvus(embeddings_data, config)
+            if collection_name:
+                result = self._upsert_to_milvus(embeddings_data, config, collection_name, progress_callback=progress_callback)
+            else:
+                result = self._index_to_milvus(embeddings_data, config, progress_callback=progress_callback)
         
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         
-        return {
+        response = {
             "database": config.provider,
             "index_mode": config.index_mode,
-            "total_vectors": len(embeddings_data["embeddings"]),
+            "mode": "upsert" if collection_name else "create",
+            "total_vectors": int(embeddings_data["vectors"].shape[0]),
             "index_size": result.get("index_size", "N/A"),
             "processing_time": processing_time,
+            "insert_throughput": result.get("insert_throughput", 0.0),
             "collection_name": result.get("collection_name", "N/A")
         }
+        if collection_name:
+            response.update({key: result[key] for key in ("inserted", "deleted", "unchanged")})
+        return response
     
     def _load_embeddings(self, file_path: str) -> Dict[str, Any]:
         """
-        加载embedding文件，返回配置信息和embeddings
+        加载embedding文件，返回配置信息、向量矩阵和元数据迭代器
         
         参数:
-            file_path: 嵌入向量文件路径
+            file_path: 嵌入向量文件路径（.npy 二进制格式或 JSON）
             
         返回:
-            包含嵌入向量和元数据的字典
+            顶层配置信息，外加 vectors（(N, dim) float32 数组，二进制格式为内存映射）和 rows（元数据迭代器）
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.info(f"Loading embeddings from {file_path}")
-                
-                if not isinstance(data, dict) or "embeddings" not in data:
-                    raise ValueError("Invalid embedding file format: missing 'embeddings' key")
-                    
-                # 返回完整的数据，包括顶层配置
-                logger.info(f"Found {len(data['embeddings'])} embeddings")
-                return data
+            logger.info(f"Loading embeddings from {file_path}")
+            data = open_embedding_file(file_path)
+            logger.info(f"Found {data['vectors'].shape[0]} embeddings")
+            return data
                 
         except Exception as e:
             logger.error(f"Error loading embeddings from {file_path}: {str(e)}")
             raise
     
-    def _index_to_milvus(self, embeddings_data: Dict[str, Any], config: VectorDBConfig) -> Dict[str, Any]:
+    def _index_to_milvus(self, embeddings_data: Dict[str, Any], config: VectorDBConfig, progress_callback=None) -> Dict[str, Any]:
         """
         将嵌入向量索引到Milvus数据库
         
         参数:
             embeddings_data: 嵌入向量数据
             config: 向量数据库配置对象
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 总向量数)
             
         返回:
             索引结果信息字典
         """
+        alias = None
         try:
             # 使用 filename 作为 collection 名称前缀
             filename = embeddings_data.get("filename", "")
-            # 如果有 .pdf 后缀，移除它
-            base_name = filename.replace('.pdf', '') if filename else "doc"
-            
-            # Ensure the collection name starts with a letter or underscore
-            if not base_name[0].isalpha() and base_name[0] != '_':
-                base_name = f"_{base_name}"
-            
             # Get embedding provider
             embedding_provider = embeddings_data.get("embedding_provider", "unknown")
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            collection_name = f"{base_name}_{embedding_provider}_{timestamp}"
+            collection_name = self._make_collection_name(filename, embedding_provider)
             
-            # 连接到Milvus
-            config._connect_to_milvus()
+            # 从连接池获取Milvus连接
+            alias = config._connect_to_milvus()
             
             # 从顶层配置获取向量维度
             vector_dim = int(embeddings_data.get("vector_dimension"))
             if not vector_dim:
                 raise ValueError("Missing vector_dimension in embedding file")
             
-            logger.info(f"Creating collection with dimension: {vector_dim}")
+            vectors = embeddings_data["vectors"]
+            total = int(vectors.shape[0])
             
-            # 定义字段
-            fields = [
-                {"name": "id", "dtype": "INT64", "is_primary": True, "auto_id": True},
-                {"name": "content", "dtype": "VARCHAR", "max_length": 5000},
-                {"name": "document_name", "dtype": "VARCHAR", "max_length": 255},
-                {"name": "chunk_id", "dtype": "INT64"},
-                {"name": "total_chunks", "dtype": "INT64"},
-                {"name": "word_count", "dtype": "INT64"},
-                {"name": "page_number", "dtype": "VARCHAR", "max_length": 10},
-                {"name": "page_range", "dtype": "VARCHAR", "max_length": 10},
-                # {"name": "chunking_method", "dtype": "VARCHAR", "max_length": 50},
-                {"name": "embedding_provider", "dtype": "VARCHAR", "max_length": 50},
-                {"name": "embedding_model", "dtype": "VARCHAR", "max_length": 50},
-                {"name": "embedding_timestamp", "dtype": "VARCHAR", "max_length": 50},
-                {
-                    "name": "vector",
-                    "dtype": "FLOAT_VECTOR",
-                    "dim": vector_dim,
-                    "params": self._get_milvus_index_params(config)
-                }
-            ]
+            collection = self._create_milvus_collection(collection_name, vector_dim, config, alias)
             
-            # 准备数据为列表格式
-            entities = []
-            for emb in embeddings_data["embeddings"]:
-                entity = {
-                    "content": str(emb["metadata"].get("content", "")),
-                    "document_name": embeddings_data.get("filename", ""),  # 使用 filename 而不是 document_name
-                    "chunk_id": int(emb["metadata"].get("chunk_id", 0)),
-                    "total_chunks": int(emb["metadata"].get("total_chunks", 0)),
-                    "word_count": int(emb["metadata"].get("word_count", 0)),
-                    "page_number": str(emb["metadata"].get("page_number", 0)),
-                    "page_range": str(emb["metadata"].get("page_range", "")),
-                    # "chunking_method": str(emb["metadata"].get("chunking_method", "")),
-                    "embedding_provider": embeddings_data.get("embedding_provider", ""),  # 从顶层配置获取
-                    "embedding_model": embeddings_data.get("embedding_model", ""),  # 从顶层配置获取
-                    "embedding_timestamp": str(emb["metadata"].get("embedding_timestamp", "")),
-                    "vector": [float(x) for x in emb.get("embedding", [])]
-                }
-                entities.append(entity)
+            # 按行数和字节数分批，以列式数据写入：向量直接取内存映射矩阵的连续切片，不构造逐行字典
+            batches = self._iter_insert_batches(
+                vectors,
+                embeddings_data["rows"],
+                filename,
+                embeddings_data.get("embedding_provider", ""),
+                embeddings_data.get("embedding_model", "")
+            )
+            logger.info(f"Inserting {total} vectors into {collection_name}")
+            if progress_callback:
+                progress_callback(0, total)
+            inserted, insert_time = self._insert_batches(collection, batches, total, progress_callback)
             
-            logger.info(f"Creating Milvus collection: {collection_name}")
+            self._finalize_milvus_collection(collection, config)
             
-            # 创建collection
-            # field_schemas = [
-            #     FieldSchema(name=field["name"], 
-            #                dtype=getattr(DataType, field["dtype"]),
-            #                is_primary="is_primary" in field and field["is_primary"],
-            #                auto_id="auto_id" in field and field["auto_id"],
-            #                max_length=field.get("max_length"),
-            #                dim=field.get("dim"),
-            #                params=field.get("params"))
-            #     for field in fields
-            # ]
-
-            field_schemas = []
-            for field in fields:
-                extra_params = {}
-                if field.get('max_length') is not None:
-                    extra_params['max_length'] = field['max_length']
-                if field.get('dim') is not None:
-                    extra_params['dim'] = field['dim']
-                if field.get('params') is not None:
-                    extra_params['params'] = field['params']
-                field_schema = FieldSchema(
-                    name=field["name"], 
-                    dtype=getattr(DataType, field["dtype"]),
-                    is_primary=field.get("is_primary", False),
-                    auto_id=field.get("auto_id", False),
-                    **extra_params
-                )
-                field_schemas.append(field_schema)
+            return {
+                "index_size": inserted,
+                "insert_time": insert_time,
+                "insert_throughput": inserted / insert_time if insert_time else 0.0,
+                "collection_name": collection_name
+            }
+            
+        except Exception as e:
+            logger.error(f"Error indexing to Milvus: {str(e)}")
+            if alias:
+                milvus_connections.mark_unhealthy(alias)
+            raise
 
-            schema = CollectionSchema(fields=field_schemas, description=f"Collection for {collection_name}")
-            collection = Collection(name=collection_name, schema=schema)
+    def _upsert_to_milvus(self, embeddings_data: Dict[str, Any], config: VectorDBConfig, collection_name: str, progress_callback=None) -> Dict[str, Any]:
+        """
+        以增量方式将文档写入已有的collection：
+        按内容哈希比较该文档已有的chunk，未变化的保留，只写入新增/变化的chunk，再删除不再存在的旧chunk。
+        不重建collection和索引，新写入的数据由Milvus按已有索引参数建索引。
+        
+        参数:
+            embeddings_data: 嵌入向量数据
+            config: 向量数据库配置对象
+            collection_name: 已有的collection名称
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 待写入向量数)
             
-            # 插入数据
-            logger.info(f"Inserting {len(entities)} vectors")
-            insert_result = collection.insert(entities)
+        返回:
+            索引结果信息字典，包含 inserted、deleted、unchanged 数量
+        """
+        alias = None
+        try:
+            alias = config._connect_to_milvus()
+            if not utility.has_collection(collection_name, using=alias):
+                raise ValueError(f"Collection {collection_name} does not exist")
             
-            # 创建索引
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": self._get_milvus_index_type(config),
-                "params": self._get_milvus_index_params(config)
-            }
-            collection.create_index(field_name="vector", index_params=index_params)
+            collection = Collection(collection_name, using=alias)
+            field_names = [field.name for field in collection.schema.fields]
+            include_hash = "content_hash" in field_names
+            
+            # 维度和嵌入模型必须与collection一致
+            vector_field = next(field for field in collection.schema.fields if field.name == "vector")
+            vectors = embeddings_data["vectors"]
+            if int(vector_field.params.get("dim", vectors.shape[1])) != int(vectors.shape[1]):
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match collection {collection_name}")
             collection.load()
+            sample = collection.query(expr="id >= 0", output_fields=["embedding_provider", "embedding_model"], limit=1)
+            embedding_provider = embeddings_data.get("embedding_provider", "")
+            embedding_model = embeddings_data.get("embedding_model", "")
+            if sample and (sample[0]["embedding_provider"], sample[0]["embedding_model"]) != (embedding_provider, embedding_model):
+                raise ValueError(
+                    f"Collection {collection_name} uses {sample[0]['embedding_provider']}/{sample[0]['embedding_model']}, "
+                    f"not {embedding_provider}/{embedding_model}"
+                )
+            
+            # 该文档已有chunk的哈希 → 主键列表（相同内容可能出现多次）
+            filename = embeddings_data.get("filename", "")
+            existing = self._existing_chunk_hashes(collection, filename, include_hash)
+            
+            # 逐行比较，只记录需要写入的行号；元数据只保留待写入的行
+            new_indices, new_rows, unchanged = [], [], 0
+            for index, row in enumerate(embeddings_data["rows"]):
+                ids = existing.get(self._content_hash(row))
+                if ids:
+                    ids.pop()
+                    unchanged += 1
+                else:
+                    new_indices.append(index)
+                    new_rows.append(row)
+            stale_ids = [pk for ids in existing.values() for pk in ids]
+            
+            logger.info(f"Upserting {filename} into {collection_name}: {len(new_rows)} new, {unchanged} unchanged, {len(stale_ids)} stale")
+            if progress_callback:
+                progress_callback(0, len(new_rows))
+            
+            # 先写入新chunk再删除旧chunk，避免检索时出现文档缺失的窗口
+            inserted, insert_time = 0, 0.0
+            if new_rows:
+                batches = self._iter_insert_batches(
+                    vectors, new_rows, filename, embedding_provider, embedding_model,
+                    indices=np.asarray(new_indices), include_hash=include_hash
+                )
+                inserted, insert_time = self._insert_batches(collection, batches, len(new_rows), progress_callback)
+            
+            delete_batch = INDEX_CONFIG["delete_batch_size"]
+            for start in range(0, len(stale_ids), delete_batch):
+                ids = stale_ids[start:start + delete_batch]
+                collection.delete(expr=f"id in [{', '.join(str(pk) for pk in ids)}]")
+            collection_cache.invalidate(collection_name)
+            if inserted or stale_ids:
+                invalidate_raw_hits(collection_name)
+                self._build_lexical_index(collection)
             
             return {
-                "index_size": len(insert_result.primary_keys),
+                "index_size": collection.num_entities,
+                "inserted": inserted,
+                "deleted": len(stale_ids),
+                "unchanged": unchanged,
+                "insert_time": insert_time,
+                "insert_throughput": inserted / insert_time if insert_time else 0.0,
                 "collection_name": collection_name
             }
             
         except Exception as e:
-            logger.error(f"Error indexing to Milvus: {str(e)}")
+            logger.error(f"Error upserting to Milvus: {str(e)}")
+            if alias:
+                milvus_connections.mark_unhealthy(alias)
             raise
-        
+
+    def _existing_chunk_hashes(self, collection: Collection, document_name: str, include_hash: bool) -> Dict[str, List[int]]:
+        """
+        分批读取collection中某个文档的全部chunk，返回 内容哈希 → 主键列表；
+        没有 content_hash 字段的旧collection根据 content 和 page_range 现场计算哈希
+
+        参数:
+            collection: 已加载的Collection对象
+            document_name: 文档文件名
+            include_hash: collection是否有 content_hash 字段
+
+        返回:
+            哈希到主键列表的字典
+        """
+        escaped = document_name.replace("\\", "\\\\").replace('"', '\\"')
+        output_fields = ["id", "content_hash"] if include_hash else ["id", "content", "page_range"]
+        iterator = collection.query_iterator(
+            batch_size=INDEX_CONFIG["query_batch_size"],
+            expr=f'document_name == "{escaped}"',
+            output_fields=output_fields,
+            # 同一文档可能刚被写入或删除，需要读到最新数据才能正确判断哪些chunk已存在
+            consistency_level="Strong"
+        )
+        hashes: Dict[str, List[int]] = {}
+        try:
+            while True:
+                entities = iterator.next()
+                if not entities:
+                    break
+                for entity in entities:
+                    content_hash = entity["content_hash"] if include_hash else self._content_hash(entity)
+                    hashes.setdefault(content_hash, []).append(entity["id"])
         finally:
-            connections.disconnect("default")
+            iterator.close()
+        return hashes
+
+    def _make_collection_name(self, filename: str, embedding_provider: str) -> str:
+        """
+        根据文件名和嵌入提供商生成collection名称
+        
+        参数:
+            filename: 原始文件名
+            embedding_provider: 嵌入提供商
+            
+        返回:
+            以字母或下划线开头、带时间戳的collection名称
+        """
+        # 如果有 .pdf 后缀，移除它
+        base_name = filename.replace('.pdf', '') if filename else "doc"
+        
+        # Ensure the collection name starts with a letter or underscore
+        if not base_name[0].isalpha() and base_name[0] != '_':
+            base_name = f"_{base_name}"
+        
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        return f"{base_name}_{embedding_provider or 'unknown'}_{timestamp}"
+
+    def _create_milvus_collection(self, collection_name: str, vector_dim: int, config: VectorDBConfig, alias: str) -> Collection:
+        """
+        按统一的字段定义创建Milvus collection
+        
+        参数:
+            collection_name: collection名称
+            vector_dim: 向量维度
+            config: 向量数据库配置对象
+            alias: 连接池分配的连接别名
+            
+        返回:
+            新创建的Collection对象
+        """
+        logger.info(f"Creating collection with dimension: {vector_dim}")
+        
+        # 定义字段
+        fields = [
+            {"name": "id", "dtype": "INT64", "is_primary": True, "auto_id": True},
+            {"name": "content", "dtype": "VARCHAR", "max_length": 5000},
+            {"name": "document_name", "dtype": "VARCHAR", "max_length": 255},
+            {"name": "chunk_id", "dtype": "INT64"},
+            {"name": "total_chunks", "dtype": "INT64"},
+            {"name": "word_count", "dtype": "INT64"},
+            {"name": "page_number", "dtype": "VARCHAR", "max_length": 10},
+            {"name": "page_range", "dtype": "VARCHAR", "max_length": 10},
+            # {"name": "chunking_method", "dtype": "VARCHAR", "max_length": 50},
+            {"name": "embedding_provider", "dtype": "VARCHAR", "max_length": 50},
+            {"name": "embedding_model", "dtype": "VARCHAR", "max_length": 50},
+            {"name": "embedding_timestamp", "dtype": "VARCHAR", "max_length": 50},
+            # 内容哈希，用于增量写入时判断chunk是否变化
+            {"name": "content_hash", "dtype": "VARCHAR", "max_length": 64},
+            {
+                "name": "vector",
+                "dtype": "FLOAT_VECTOR",
+                "dim": vector_dim,
+                "params": self._get_milvus_index_params(config)
+            }
+        ]
+        
+        logger.info(f"Creating Milvus collection: {collection_name}")
+        
+        field_schemas = []
+        for field in fields:
+            extra_params = {}
+            if field.get('max_length') is not None:
+                extra_params['max_length'] = field['max_length']
+            if field.get('dim') is not None:
+                extra_params['dim'] = field['dim']
+            if field.get('params') is not None:
+                extra_params['params'] = field['params']
+            field_schema = FieldSchema(
+                name=field["name"], 
+                dtype=getattr(DataType, field["dtype"]),
+                is_primary=field.get("is_primary", False),
+                auto_id=field.get("auto_id", False),
+                **extra_params
+            )
+            field_schemas.append(field_schema)
+
+        schema = CollectionSchema(fields=field_schemas, description=f"Collection for {collection_name}")
+        return Collection(name=collection_name, schema=schema, using=alias)
+
+    def _batch_rows(self, vector_dim: int) -> int:
+        """
+        根据内存预算计算每批写入的行数：每行按向量字节数加上元数据的估计开销计算
+
+        参数:
+            vector_dim: 向量维度
+
+        返回:
+            每批行数
+        """
+        row_bytes = vector_dim * 4 + INDEX_CONFIG["row_overhead_bytes"]
+        return max(1, min(INDEX_CONFIG["max_batch_rows"], INDEX_CONFIG["memory_budget_bytes"] // row_bytes))
+
+    def _iter_insert_batches(self, vectors, rows, document_name: str, embedding_provider: str, embedding_model: str,
+                             indices: List[int] = None, include_hash: bool = True):
+        """
+        按行数和字节数两个上限切分写入批次：任一上限达到即结束当前批次
+
+        参数:
+            vectors: (N, dim) float32 数组（可以是内存映射）
+            rows: 按顺序产生每个chunk元数据的迭代器
+            document_name: 文档文件名
+            embedding_provider: 嵌入提供商
+            embedding_model: 嵌入模型
+            indices: 只写入部分行时，rows 对应的向量行号；为空时 rows 与 vectors 一一对应
+            include_hash: 是否包含 content_hash 列（早期创建的collection没有该字段）
+
+        生成:
+            (本批起始行号, 列式数据)
+
+        异常:
+            ValueError: 元数据行数与向量数不一致时
+        """
+        if indices is not None:
+            # 按行号取出本批向量（每批一次拷贝，内存仍受批次大小限制）
+            take = lambda start, end: vectors[indices[start:end]]
+            total = len(indices)
+        else:
+            take = lambda start, end: vectors[start:end]
+            total = int(vectors.shape[0])
+        vector_dim = int(vectors.shape[1])
+        max_rows = self._batch_rows(vector_dim)
+        max_bytes = INDEX_CONFIG["max_batch_bytes"]
+        start = 0
+        batch, batch_bytes = [], 0
+        for row in rows:
+            row_bytes = vector_dim * 4 + len(str(row.get("content", "")).encode("utf-8")) + INDEX_CONFIG["row_field_bytes"]
+            if batch and (len(batch) >= max_rows or batch_bytes + row_bytes > max_bytes):
+                yield start, self._build_milvus_columns(batch, take(start, start + len(batch)), document_name, embedding_provider, embedding_model, include_hash)
+                start += len(batch)
+                batch, batch_bytes = [], 0
+            batch.append(row)
+            batch_bytes += row_bytes
+        if batch:
+            yield start, self._build_milvus_columns(batch, take(start, start + len(batch)), document_name, embedding_provider, embedding_model, include_hash)
+            start += len(batch)
+        if start != total:
+            raise ValueError(f"Embedding metadata has {start} rows but {total} vectors")
+
+    def _insert_batches(self, collection: Collection, batches, total: int, progress_callback=None) -> tuple:
+        """
+        流水线写入：当前批次在后台线程中插入时，主线程准备下一批次，同一时间最多一个批次在途
+
+        参数:
+            collection: Collection对象
+            batches: _iter_insert_batches 生成的 (起始行号, 列式数据)
+            total: 总向量数，用于进度回调
+            progress_callback: 可选的进度回调，参数为 (已写入向量数, 总向量数)
+
+        返回:
+            (写入的向量数, 写入耗时秒数)
+        """
+        start_time = time.time()
+        inserted = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            in_flight = None
+            for start, columns in batches:
+                if in_flight:
+                    inserted += self._finish_insert(in_flight, total, progress_callback)
+                in_flight = (executor.submit(self._insert_with_retry, collection, columns), start + len(columns[0]))
+            if in_flight:
+                inserted += self._finish_insert(in_flight, total, progress_callback)
+        return inserted, time.time() - start_time
+
+    def _finish_insert(self, in_flight: tuple, total: int, progress_callback=None) -> int:
+        future, end = in_flight
+        count = future.result()
+        if progress_callback:
+            progress_callback(end, total)
+        return count
+
+    def _insert_with_retry(self, collection: Collection, columns: List[Any]) -> int:
+        """
+        写入一个批次，失败时按指数退避重试该批次，不影响已写入的批次
+
+        参数:
+            collection: Collection对象
+            columns: 列式数据
+
+        返回:
+            写入的向量数
+        """
+        retries = INDEX_CONFIG["insert_retries"]
+        for attempt in range(retries + 1):
+            try:
+                return len(collection.insert(columns).primary_keys)
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = INDEX_CONFIG["retry_backoff"] * (2 ** attempt)
+                logger.warning(f"Insert of {len(columns[0])} vectors failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _build_milvus_columns(self, rows: List[Dict[str, Any]], vectors, document_name, embedding_provider: str, embedding_model: str,
+                              include_hash: bool = True) -> List[Any]:
+        """
+        将一批元数据和向量转换为Milvus的列式数据，列顺序与 _create_milvus_collection 的字段定义一致（不含自增主键）
+        
+        参数:
+            rows: 每个chunk的元数据列表
+            vectors: 与 rows 对应的向量，(n, dim) 数组或向量列表
+            document_name: 文档文件名；批次包含多个文档时为与 rows 对应的文件名列表
+            embedding_provider: 嵌入提供商（来自顶层配置）
+            embedding_model: 嵌入模型（来自顶层配置）
+            include_hash: 是否包含 content_hash 列（早期创建的collection没有该字段）
+            
+        返回:
+            可直接传给 collection.insert 的列列表，向量列为连续的 float32 数组
+        """
+        count = len(rows)
+        document_names = [document_name] * count if isinstance(document_name, str) else list(document_name)
+        columns = [
+            [str(row.get("content", "")) for row in rows],
+            document_names,
+            [int(row.get("chunk_id", 0)) for row in rows],
+            [int(row.get("total_chunks", 0)) for row in rows],
+            [int(row.get("word_count", 0)) for row in rows],
+            [str(row.get("page_number", 0)) for row in rows],
+            [str(row.get("page_range", "")) for row in rows],
+            # [str(row.get("chunking_method", "")) for row in rows],
+            [embedding_provider] * count,
+            [embedding_model] * count,
+            [str(row.get("embedding_timestamp", "")) for row in rows]
+        ]
+        if include_hash:
+            columns.append([self._content_hash(row) for row in rows])
+        columns.append(np.ascontiguousarray(vectors, dtype=np.float32).reshape(count, -1))
+        return columns
+
+    @staticmethod
+    def _content_hash(row: Dict[str, Any]) -> str:
+        """
+        chunk的稳定内容哈希：由页码范围和内容计算，与写入时间、chunk编号无关，
+        页码范围计入哈希，保证保留下来的chunk页码信息仍然正确
+
+        参数:
+            row: 包含 content 和 page_range 的元数据
+
+        返回:
+            SHA-256 十六进制字符串
+        """
+        text = f"{row.get('page_range', '')}\x00{str(row.get('content', ''))}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _finalize_milvus_collection(self, collection: Collection, config: VectorDBConfig):
+        """
+        数据写入完成后创建向量索引并加载collection
+        
+        参数:
+            collection: Collection对象
+            config: 向量数据库配置对象
+        """
+        # 创建索引
+        index_params = {
+            "metric_type": "COSINE",
+            "index_type": self._get_milvus_index_type(config),
+            "params": self._get_milvus_index_params(config)
+        }
+        collection.create_index(field_name="vector", index_params=index_params)
+        collection.load()
+        collection_cache.invalidate(collection.name)
+        invalidate_raw_hits(collection.name)
+        self._build_lexical_index(collection)
+
+    def _build_lexical_index(self, collection: Collection) -> None:
+        """
+        写入完成后重建collection的词法（BM25）索引，供混合检索使用；
+        构建失败不影响向量索引，首次混合检索时会重新构建
+        
+        参数:
+            collection: 已加载的Collection对象
+        """
+        try:
+            lexical_indexes.build(collection)
+        except Exception as e:
+            logger.error(f"Error building lexical index for {collection.name}: {str(e)}")
 
     def list_collections(self, provider: str) -> List[str]:
         """
@@ -312,12 +648,8 @@ class VectorStoreService:
             集合名称列表
         """
         if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=get_milvus_config()["uri"])
-                collections = utility.list_collections()
-                return collections
-            finally:
-                connections.disconnect("default")
+            alias = milvus_connections.acquire()
+            return utility.list_collections(using=alias)
         return []
 
     def delete_collection(self, provider: str, collection_name: str) -> bool:
@@ -332,12 +664,12 @@ class VectorStoreService:
             是否删除成功
         """
         if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=get_milvus_config()["uri"])
-                utility.drop_collection(collection_name)
-                return True
-            finally:
-                connections.disconnect("default")
+            alias = milvus_connections.acquire()
+            utility.drop_collection(collection_name, using=alias)
+            collection_cache.invalidate(collection_name)
+            lexical_indexes.drop(collection_name)
+            invalidate_raw_hits(collection_name)
+            return True
         return False
 
     def get_collection_info(self, provider: str, collection_name: str) -> Dict[str, Any]:
@@ -352,14 +684,11 @@ class VectorStoreService:
             集合信息字典
         """
         if provider == VectorDBProvider.MILVUS:
-            try:
-                connections.connect(alias="default", uri=get_milvus_config()["uri"])
-                collection = Collection(collection_name)
-                return {
-                    "name": collection_name,
-                    "num_entities": collection.num_entities,
-                    "schema": collection.schema.to_dict()
-                }
-            finally:
-                connections.disconnect("default")
+            alias = milvus_connections.acquire()
+            collection = Collection(collection_name, using=alias)
+            return {
+                "name": collection_name,
+                "num_entities": collection.num_entities,
+                "schema": collection.schema.to_dict()
+            }
         return {}
\ No newline at end of file
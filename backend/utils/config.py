@@ -76,4 +76,228 @@ def get_milvus_config():
         return config
     else:
         # 默认使用本地配置
-        return MILVUS_CONFIG 
\ No newline at end of file
+        return MILVUS_CONFIG 
+
+# PDF并行加载配置（按页码区间分片，多进程提取）
+LOADING_PARALLEL_CONFIG = {
+    "max_workers": int(os.getenv("LOADING_MAX_WORKERS", os.cpu_count() or 1)),
+    "pages_per_shard": int(os.getenv("LOADING_PAGES_PER_SHARD", 16)),
+    "min_pages": int(os.getenv("LOADING_PARALLEL_MIN_PAGES", 32))
+}
+
+# 已加载文档缓存配置（按PDF内容哈希和加载参数寻址，LRU淘汰）
+LOADING_CACHE_CONFIG = {
+    "enabled": os.getenv("LOADING_CACHE_ENABLED", "true").lower() == "true",
+    "dir": os.getenv("LOADING_CACHE_DIR", "01-loaded-cache"),
+    "max_bytes": int(os.getenv("LOADING_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+}
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    """
+    解析形如 "pymupdf=8,unstructured:hi_res=1" 的环境变量
+    """
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, number = item.split("=", 1)
+            limits[key.strip()] = int(number)
+    return limits
+
+# CPU密集的加载/解析任务并发配置
+# 键为加载方法，unstructured 的 hi_res 策略单独使用 "unstructured:hi_res"
+# limits: 同时运行的任务数；max_queue: 排队等待的最大任务数，超过后返回429
+LOADING_CONCURRENCY_CONFIG = {
+    "limits": {
+        "pymupdf": 4,
+        "pypdf": 4,
+        "pdfplumber": 2,
+        "unstructured": 2,
+        "unstructured:hi_res": 1,
+        **_parse_limits(os.getenv("LOADING_CONCURRENCY_LIMITS"))
+    },
+    "max_queue": {
+        "pymupdf": 16,
+        "pypdf": 16,
+        "pdfplumber": 8,
+        "unstructured": 4,
+        "unstructured:hi_res": 2,
+        **_parse_limits(os.getenv("LOADING_QUEUE_LIMITS"))
+    },
+    "default_limit": 2,
+    "default_max_queue": 4,
+    "retry_after": int(os.getenv("LOADING_RETRY_AFTER", 30))
+}
+
+# 后台任务配置（SQLite持久化，服务重启后仍可查询任务状态）
+JOB_CONFIG = {
+    "db_path": os.getenv("JOB_DB_PATH", "07-jobs/jobs.db"),
+    "max_workers": int(os.getenv("JOB_MAX_WORKERS", 2)),
+    # 进度写入数据库的最小间隔（秒），避免逐页/逐块写库
+    "progress_interval": float(os.getenv("JOB_PROGRESS_INTERVAL", 0.5))
+}
+
+# 上传文件配置：分块流式写入临时文件，可选的大小上限（字节，未设置时不限制）
+UPLOAD_CONFIG = {
+    "temp_dir": "temp",
+    "chunk_size": int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024)),
+    "max_bytes": int(os.getenv("UPLOAD_MAX_BYTES")) if os.getenv("UPLOAD_MAX_BYTES") else None
+}
+
+# 端到端流水线配置：各阶段之间的有界队列长度，以及送往嵌入模型的每批chunk数
+PIPELINE_CONFIG = {
+    "batch_size": int(os.getenv("PIPELINE_BATCH_SIZE", 20)),
+    "queue_size": int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+}
+
+# 批量入库配置：提取进程数、跨文件共享的嵌入批大小、每次写入Milvus的向量数
+BULK_INGEST_CONFIG = {
+    "max_workers": int(os.getenv("BULK_INGEST_MAX_WORKERS", min(4, os.cpu_count() or 1))),
+    "batch_size": int(os.getenv("BULK_INGEST_BATCH_SIZE", 64)),
+    "insert_batch_size": int(os.getenv("BULK_INGEST_INSERT_BATCH_SIZE", 1000)),
+    # /jobs/bulk-ingest 的 directory 参数只能指向该目录之内，未配置时不允许按服务器目录入库
+    "root": os.getenv("BULK_INGEST_ROOT") or None
+}
+
+# 02-embedded-docs 的文件格式：npy（float32向量矩阵 + JSONL元数据，可内存映射）或 json（原有文本格式）
+EMBEDDING_STORE_CONFIG = {
+    "format": os.getenv("EMBEDDING_FILE_FORMAT", "npy")
+}
+
+# 索引写入配置：每批写入Milvus的数据按内存预算计算行数，
+# 每行按 向量字节数 + row_overhead_bytes（content等元数据的估计大小）计
+INDEX_CONFIG = {
+    "memory_budget_bytes": int(os.getenv("INDEX_MEMORY_BUDGET_BYTES", 64 * 1024 ** 2)),
+    "row_overhead_bytes": int(os.getenv("INDEX_ROW_OVERHEAD_BYTES", 4096)),
+    "max_batch_rows": int(os.getenv("INDEX_MAX_BATCH_ROWS", 10000)),
+    # 每批的字节数上限（向量 + content 的实际字节数 + 其他字段的估计大小），需低于Milvus的gRPC消息上限
+    "max_batch_bytes": int(os.getenv("INDEX_MAX_BATCH_BYTES", 16 * 1024 ** 2)),
+    "row_field_bytes": 256,
+    # 单个批次写入失败时的重试次数和初始退避时间（秒）
+    "insert_retries": int(os.getenv("INDEX_INSERT_RETRIES", 3)),
+    "retry_backoff": float(os.getenv("INDEX_RETRY_BACKOFF", 1.0)),
+    # 增量写入时读取已有chunk、删除旧chunk的批大小
+    "query_batch_size": int(os.getenv("INDEX_QUERY_BATCH_SIZE", 1000)),
+    "delete_batch_size": int(os.getenv("INDEX_DELETE_BATCH_SIZE", 1000))
+}
+
+# Milvus连接池配置：每个远程地址保持的连接别名数（本地文件数据库固定为1），
+# 以及复用连接前做健康检查的最小间隔（秒）
+MILVUS_POOL_CONFIG = {
+    "pool_size": int(os.getenv("MILVUS_POOL_SIZE", 4)),
+    "health_check_interval": float(os.getenv("MILVUS_HEALTH_CHECK_INTERVAL", 30))
+}
+
+# collection元数据缓存：缓存条目的有效期（秒），用于感知其他进程对collection的修改，0 表示不过期
+COLLECTION_CACHE_CONFIG = {
+    "ttl": float(os.getenv("COLLECTION_CACHE_TTL", 300))
+}
+
+def _parse_models(value: str) -> list:
+    """
+    解析形如 "huggingface:BAAI/bge-m3,openai:text-embedding-3-small" 的环境变量，返回 (provider, model) 列表
+    """
+    models = []
+    for item in (value or "").split(","):
+        if ":" in item:
+            provider, model = item.split(":", 1)
+            models.append((provider.strip(), model.strip()))
+    return models
+
+# 评估配置：concurrency 为同时检索的行组数，batch_size 为每组的行数（一次批量检索），
+# max_top_k 为参数扫描允许的最大 top_k（排名指标的内存占用随 top_k 的平方增长）
+EVALUATION_CONFIG = {
+    "concurrency": int(os.getenv("EVALUATION_CONCURRENCY", 4)),
+    "batch_size": int(os.getenv("EVALUATION_BATCH_SIZE", 16)),
+    "max_top_k": int(os.getenv("EVALUATION_MAX_TOP_K", 100))
+}
+
+# 检索配置：batch_size 为批量检索时每个 collection.search 请求包含的查询向量数
+SEARCH_CONFIG = {
+    "batch_size": int(os.getenv("SEARCH_BATCH_SIZE", 256))
+}
+
+# 词法（BM25）索引：每个collection的倒排索引保存在 dir 下，/index 写入完成后构建
+# k1 / b: BM25 参数；rrf_k: 混合检索倒数排名融合的平滑常数；hybrid_candidates: 混合检索时每一路召回的候选数
+LEXICAL_INDEX_CONFIG = {
+    "dir": os.getenv("LEXICAL_INDEX_DIR", "03-vector-store/lexical"),
+    "k1": float(os.getenv("BM25_K1", 1.2)),
+    "b": float(os.getenv("BM25_B", 0.75)),
+    "rrf_k": int(os.getenv("RRF_K", 60)),
+    "hybrid_candidates": int(os.getenv("HYBRID_CANDIDATES", 50))
+}
+
+# 嵌入模型注册表：常驻本地模型的内存预算（超出时按LRU淘汰），以及启动时预加载的模型
+EMBEDDING_REGISTRY_CONFIG = {
+    "memory_budget_bytes": int(os.getenv("EMBEDDING_MEMORY_BUDGET_BYTES", 4 * 1024 ** 3)),
+    "preload": _parse_models(os.getenv("EMBEDDING_PRELOAD_MODELS", ""))
+}
+
+# 嵌入批处理配置
+# window_size: create_embeddings 每次交给 embed_chunks 的chunk数（也是进度回调的粒度）
+# huggingface_batch_size: 本地模型每次前向计算的chunk数，窗口内按文本长度排序后分批以减少padding
+# bedrock_concurrency: 未启用异步执行器时 Bedrock 的并发请求数（请求数上限见 EMBEDDING_ASYNC_CONFIG 的 budgets）
+# openai_max_tokens_per_request / openai_max_items_per_request: OpenAI 每个请求按token数打包，不超过token上限和条数上限
+# openai_max_tokens_per_input: 单条输入的token上限，超过时按token分段嵌入后加权平均
+EMBEDDING_BATCH_CONFIG = {
+    "window_size": {
+        # 远程提供商的窗口由异步执行器拆成多个请求并发发送
+        "openai": int(os.getenv("OPENAI_EMBEDDING_WINDOW", 1000)),
+        "huggingface": int(os.getenv("HUGGINGFACE_EMBEDDING_WINDOW", 512)),
+        "onnx": int(os.getenv("ONNX_EMBEDDING_WINDOW", 512)),
+        "bedrock": int(os.getenv("BEDROCK_EMBEDDING_WINDOW", 1000))
+    },
+    "huggingface_batch_size": int(os.getenv("HUGGINGFACE_BATCH_SIZE", 32)),
+    "bedrock_concurrency": int(os.getenv("BEDROCK_CONCURRENCY", 8)),
+    "openai_max_tokens_per_request": int(os.getenv("OPENAI_MAX_TOKENS_PER_REQUEST", 50000)),
+    "openai_max_items_per_request": int(os.getenv("OPENAI_MAX_ITEMS_PER_REQUEST", 256)),
+    "openai_max_tokens_per_input": 8191
+}
+
+# 远程提供商（OpenAI、Bedrock）的异步嵌入配置
+# max_in_flight: 同时进行的请求数；budgets: 每个提供商的每分钟请求数和token数预算，0 表示不限制
+# max_retries / backoff_base / backoff_max: 429、5xx 和网络错误时的重试次数和指数退避参数（秒）
+# openai_base_url / bedrock_endpoint_url: 可指向代理、兼容服务或本地模拟服务；openai_base_url 同时读取 langchain 使用的 OPENAI_API_BASE，
+# 均未设置时为 None（异步客户端使用 OpenAI 官方地址，langchain 使用其默认值）
+EMBEDDING_ASYNC_CONFIG = {
+    "enabled": os.getenv("EMBEDDING_ASYNC_ENABLED", "true").lower() == "true",
+    "max_in_flight": int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", 8)),
+    "budgets": {
+        "openai": {
+            "requests_per_minute": int(os.getenv("OPENAI_EMBEDDING_RPM", 3000)),
+            "tokens_per_minute": int(os.getenv("OPENAI_EMBEDDING_TPM", 1000000))
+        },
+        "bedrock": {
+            "requests_per_minute": int(os.getenv("BEDROCK_EMBEDDING_RPM", 600)),
+            "tokens_per_minute": int(os.getenv("BEDROCK_EMBEDDING_TPM", 0))
+        }
+    },
+    "max_retries": int(os.getenv("EMBEDDING_MAX_RETRIES", 5)),
+    "backoff_base": float(os.getenv("EMBEDDING_BACKOFF_BASE", 0.5)),
+    "backoff_max": float(os.getenv("EMBEDDING_BACKOFF_MAX", 30)),
+    "timeout": float(os.getenv("EMBEDDING_REQUEST_TIMEOUT", 60)),
+    "openai_base_url": os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE") or None,
+    "bedrock_endpoint_url": os.getenv("BEDROCK_ENDPOINT_URL") or None
+}
+
+# 嵌入向量缓存：按 (提供商, 模型, 规范化文本哈希) 缓存向量，总大小超过上限（字节）时按LRU淘汰
+EMBEDDING_CACHE_CONFIG = {
+    "enabled": os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true",
+    "db_path": os.getenv("EMBEDDING_CACHE_PATH", "02-embedding-cache/embeddings.db"),
+    "max_bytes": int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 1024 ** 3))
+}
+
+# 本地 ONNX Runtime 嵌入：sentence-transformer 模型首次使用时导出到 dir，quantize 为 true 时使用 int8 动态量化模型
+# intra_op_threads: 单个算子的线程数（0 表示由 ONNX Runtime 按CPU核数决定）；batch_size: 每次推理的文本数
+# huggingface_backend: 设为 onnx 时 huggingface 提供商的模型也由 ONNX Runtime 执行（向量与原模型兼容，已有collection无需重建）
+# parity_min_cosine: 一致性校验中与 PyTorch 输出的最小余弦相似度阈值
+ONNX_EMBEDDING_CONFIG = {
+    "dir": os.getenv("ONNX_MODEL_DIR", "08-onnx-models"),
+    "quantize": os.getenv("ONNX_QUANTIZE", "false").lower() == "true",
+    "intra_op_threads": int(os.getenv("ONNX_INTRA_OP_THREADS", 0)),
+    "batch_size": int(os.getenv("ONNX_BATCH_SIZE", 32)),
+    "huggingface_backend": os.getenv("HUGGINGFACE_EMBEDDING_BACKEND", "torch"),
+    "parity_min_cosine": {
+        "fp32": float(os.getenv("ONNX_PARITY_MIN_COSINE", 0.9999)),
+        "int8": float(os.getenv("ONNX_INT8_PARITY_MIN_COSINE", 0.98))
+    }
+}
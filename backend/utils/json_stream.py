@@ -0,0 +1,41 @@
+"""
+流式JSON写出工具：逐个写出数组元素，输出格式与 json.dump(indent=2, ensure_ascii=False) 一致，
+用于在不把完整文档放入内存的情况下生成 01-loaded-docs / 01-chunked-docs 等中间文件。
+"""
+import json
+
+def write_json_fields(f, fields: dict, first: bool) -> None:
+    """
+    以与 json.dump(indent=2, ensure_ascii=False) 相同的格式写出顶层字段。
+
+    参数:
+        f: 已打开的文本文件对象
+        fields (dict): 要写出的字段
+        first (bool): 是否为对象的第一组字段（决定是否先写 "{" 或 ","）
+    """
+    for key, value in fields.items():
+        f.write("{\n" if first else ",\n")
+        first = False
+        encoded = json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        f.write(f"  {json.dumps(key, ensure_ascii=False)}: {encoded}")
+
+def write_json_array(f, key: str, items) -> int:
+    """
+    逐个写出数组字段的元素，格式与 json.dump(indent=2, ensure_ascii=False) 一致。
+
+    参数:
+        f: 已打开的文本文件对象
+        key (str): 字段名（该字段不能是对象的第一个字段）
+        items (Iterable): 数组元素，可以是生成器
+
+    返回:
+        int: 写出的元素数量
+    """
+    f.write(f",\n  {json.dumps(key, ensure_ascii=False)}: [")
+    count = 0
+    for item in items:
+        f.write("\n    " if count == 0 else ",\n    ")
+        f.write(json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+        count += 1
+    f.write("\n  ]" if count else "]")
+    return count
@@ -0,0 +1,64 @@
+import threading
+import time
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限流器
+
+    令牌以 rate 个/秒的速度补充，最多累积 burst 个。采用预约方式：reserve 立即扣除令牌（可以透支），
+    返回调用方需要等待的秒数，因此同一个限流器可以同时用于线程（acquire）和不同事件循环中的协程
+    （await asyncio.sleep(limiter.reserve(n))）。
+    """
+    def __init__(self, rate: float, burst: int = None):
+        """
+        初始化限流器
+
+        参数:
+            rate: 每秒补充的令牌数，<= 0 表示不限流
+            burst: 允许的突发令牌数，默认等于 rate（至少为1）
+        """
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "RateLimiter":
+        """按每分钟预算创建限流器（如 RPM、TPM），允许一分钟内的全部预算突发使用"""
+        return cls(limit / 60.0, burst=int(limit)) if limit and limit > 0 else cls(0)
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        预约令牌，超过桶容量的请求按桶容量计算
+
+        参数:
+            tokens: 需要的令牌数
+
+        返回:
+            获得令牌前需要等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+        tokens = min(tokens, self.burst)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        获取令牌，不足时阻塞直到补充完成
+
+        参数:
+            tokens: 需要的令牌数
+
+        返回:
+            等待的秒数
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import uuid
+from typing import Any, Dict
+from fastapi import HTTPException, UploadFile
+from utils.config import UPLOAD_CONFIG
+
+async def save_upload_file(file: UploadFile, max_bytes: int = None) -> Dict[str, Any]:
+    """
+    将上传文件分块流式写入唯一的临时文件，同时计算 SHA-256
+
+    不会把整个文件读入内存，大文件上传时 worker 的内存占用只与分块大小有关；
+    临时文件名带有唯一前缀，同名文件并发上传不会互相覆盖。
+
+    参数:
+        file: FastAPI 上传文件
+        max_bytes: 文件大小上限（字节），默认读取配置，None 表示不限制
+
+    返回:
+        包含 path（临时文件路径）、size（字节数）和 sha256 的字典
+
+    异常:
+        HTTPException: 文件超过大小上限时返回413，已写入的部分会被删除
+    """
+    max_bytes = max_bytes or UPLOAD_CONFIG["max_bytes"]
+    os.makedirs(UPLOAD_CONFIG["temp_dir"], exist_ok=True)
+    # 只保留原文件名的最后一段，防止文件名中的路径穿越；保留扩展名供解析库识别文件类型
+    filename = os.path.basename(file.filename or "upload")
+    temp_path = os.path.join(UPLOAD_CONFIG["temp_dir"], f"{uuid.uuid4().hex}_{filename}")
+    
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "xb") as buffer:
+            while True:
+                block = await file.read(UPLOAD_CONFIG["chunk_size"])
+                if not block:
+                    break
+                size += len(block)
+                if max_bytes and size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File {filename} exceeds the maximum upload size of {max_bytes} bytes"
+                    )
+                digest.update(block)
+                buffer.write(block)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return {"path": temp_path, "size": size, "sha256": digest.hexdigest()}
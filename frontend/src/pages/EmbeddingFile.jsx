@@ -2,6 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import RandomImage from '../components/RandomImage';
 import { apiBaseUrl } from '../config/config';
+import { runJob, formatJobProgress } from '../utils/jobs';
 
 const EmbeddingFile = () => {
   const [selectedDoc, setSelectedDoc] = useState('');
@@ -26,6 +27,11 @@ const EmbeddingFile = () => {
       { value: 'sentence-transformers/all-mpnet-base-v2', label: 'all-mpnet-base-v2' },
       { value: 'all-MiniLM-L6-v2', label: 'all-MiniLM-L6-v2' },
       { value: 'google-bert/bert-base-uncased', label: 'bert-base-uncased' }
+    ],
+    onnx: [
+      { value: 'sentence-transformers/all-mpnet-base-v2', label: 'all-mpnet-base-v2' },
+      { value: 'all-MiniLM-L6-v2', label: 'all-MiniLM-L6-v2' },
+      { value: 'google-bert/bert-base-uncased', label: 'bert-base-uncased' }
     ]
   };
 
@@ -95,26 +101,31 @@ const EmbeddingFile = () => {
     
     setStatus('Processing...');
     try {
-      const response = await fetch(`${apiBaseUrl}/embed`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
+      // 作为后台任务提交并轮询进度，避免大文档导致浏览器请求超时
+      const result = await runJob(
+        '/jobs/embed',
+        {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            documentId: selectedDoc,  // 使用完整的文件名
+            provider: embeddingProvider,
+            model: embeddingModel
+          }),
         },
-        body: JSON.stringify({
-          documentId: selectedDoc,  // 使用完整的文件名
-          provider: embeddingProvider,
-          model: embeddingModel
-        }),
-      });
+        (job) => setStatus(`Processing... ${formatJobProgress(job)}`)
+      );
       
+      const response = await fetch(`${apiBaseUrl}/embedded-docs/${result.document_name}`);
       if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.detail || 'Failed to create embeddings');
+        throw new Error(`HTTP error! status: ${response.status}`);
       }
       
       const data = await response.json();
       setEmbeddings(data.embeddings);
-      setStatus(`Embedding completed successfully! Saved to: ${data.filepath}`);
+      setStatus(`Embedding completed successfully! Saved to: ${result.filepath} (${result.chunks_per_second.toFixed(2)} chunks/s)`);
       fetchEmbeddedDocs(); // 刷新嵌入文档列表
     } catch (error) {
       console.error('Error:', error);
@@ -301,6 +312,7 @@ const EmbeddingFile = () => {
                 <option value="openai">OpenAI</option>
                 <option value="bedrock">Bedrock</option>
                 <option value="huggingface">HuggingFace</option>
+                <option value="onnx">ONNX Runtime (CPU)</option>
               </select>
             </div>
 
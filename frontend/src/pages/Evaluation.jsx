@@ -10,6 +10,7 @@ const Evaluation = () => {
   const [isProcessing, setIsProcessing] = useState(false);
   const [topK, setTopK] = useState(10);
   const [threshold, setThreshold] = useState(0.7);
+  const [progress, setProgress] = useState({ completed: 0, total: 0 });
 
   // 加载collections列表
   useEffect(() => {
@@ -41,13 +42,48 @@ const Evaluation = () => {
     formData.append('threshold', threshold);
 
     try {
-      const response = await fetch(`${apiBaseUrl}/evaluate`, {
+      // 流式评估：每完成一行返回一条 NDJSON 事件
+      const response = await fetch(`${apiBaseUrl}/evaluate/stream`, {
         method: 'POST',
         body: formData,
       });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
 
-      const data = await response.json();
-      setResults(data);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      const rows = [];
+      let buffer = '';
+      setResults({ results: [] });
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const event = JSON.parse(line);
+          if (event.type === 'start') {
+            setProgress({ completed: 0, total: event.total });
+          } else if (event.type === 'row') {
+            rows.push(event);
+            rows.sort((a, b) => a.index - b.index);
+            setProgress(prev => ({ ...prev, completed: rows.length }));
+            setResults({ results: [...rows] });
+          } else if (event.type === 'summary') {
+            setResults({
+              results: [...rows],
+              average_scores: event.average_scores,
+              metrics: event.metrics,
+              total_queries: event.total_queries
+            });
+          } else {
+            console.error('Evaluation error:', event);
+          }
+        }
+      }
     } catch (error) {
       console.error('Error during evaluation:', error);
     } finally {
@@ -130,9 +166,10 @@ const Evaluation = () => {
 
         {/* 右侧面板 - 结果区 */}
         <div className="col-span-9">
-          {results && results.average_scores && (
+          {results && results.results && (
             <div className="space-y-4">
               {/* 统计摘要 */}
+              {results.average_scores && (
               <div className="p-4 border rounded-lg bg-white shadow-sm">
                 <div className="mb-3">
                   <h3 className="text-lg font-semibold">统计摘要</h3>
@@ -157,7 +194,33 @@ const Evaluation = () => {
                     <div className="text-xl font-bold">{results.total_queries}</div>
                   </div>
                 </div>
+
+                {/* 各截断位置的排名指标 */}
+                {results.metrics && results.metrics.recall && (
+                  <div className="overflow-x-auto">
+                    <table className="min-w-full divide-y divide-gray-200 text-sm">
+                      <thead className="bg-gray-50">
+                        <tr>
+                          {['K', 'Recall@K', 'Precision@K', 'MRR@K', 'nDCG@K', 'Hit Rate@K'].map(title => (
+                            <th key={title} scope="col" className="px-4 py-2 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{title}</th>
+                          ))}
+                        </tr>
+                      </thead>
+                      <tbody className="bg-white divide-y divide-gray-200">
+                        {Object.keys(results.metrics.recall).map(k => (
+                          <tr key={k}>
+                            <td className="px-4 py-2 font-medium text-gray-900">{k}</td>
+                            {['recall', 'precision', 'mrr', 'ndcg', 'hit_rate'].map(name => (
+                              <td key={name} className="px-4 py-2 text-gray-500">{(results.metrics[name][k] * 100).toFixed(1)}%</td>
+                            ))}
+                          </tr>
+                        ))}
+                      </tbody>
+                    </table>
+                  </div>
+                )}
               </div>
+              )}
 
               {/* 详细结果 */}
               {results.results && results.results.length > 0 && (
@@ -179,7 +242,7 @@ const Evaluation = () => {
                         </thead>
                         <tbody className="bg-white divide-y divide-gray-200">
                           {results.results.map((result, idx) => (
-                            <tr key={idx}>
+                            <tr key={result.index ?? idx}>
                               <td className="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">{result.id}</td>
                               <td className="px-6 py-4 text-sm text-gray-500">{result.requirement}</td>
                               <td className="px-6 py-4 text-sm text-gray-500">{result.expected_pages.join(', ')}</td>
@@ -200,7 +263,9 @@ const Evaluation = () => {
 
           {isProcessing && (
             <div className="text-center p-4">
-              <div className="text-lg text-gray-600">正在处理评估...</div>
+              <div className="text-lg text-gray-600">
+                正在处理评估... {progress.total > 0 && `${progress.completed} / ${progress.total}`}
+              </div>
             </div>
           )}
 
@@ -2,11 +2,13 @@
 import React, { useState, useEffect } from 'react';
 import RandomImage from '../components/RandomImage';
 import { apiBaseUrl } from '../config/config';
+import { runJob, formatJobProgress } from '../utils/jobs';
 
 const Indexing = () => {
   const [embeddingFile, setEmbeddingFile] = useState('');
   const [vectorDb, setVectorDb] = useState('milvus');
   const [indexMode, setIndexMode] = useState('standard');
+  const [targetCollection, setTargetCollection] = useState('');
   const [status, setStatus] = useState('');
   const [embeddedFiles, setEmbeddedFiles] = useState([]);
   const [indexingResult, setIndexingResult] = useState(null);
@@ -103,19 +105,25 @@ const Indexing = () => {
 
     setStatus('Indexing...');
     try {
-      const response = await fetch(`${apiBaseUrl}/index`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
+      // 作为后台任务提交并轮询进度，避免大文档导致浏览器请求超时
+      const data = await runJob(
+        '/jobs/index',
+        {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            fileId: embeddingFile,
+            vectorDb,
+            indexMode,
+            // 选择已有collection时增量写入（upsert），否则新建collection
+            ...(targetCollection ? { collectionName: targetCollection } : {})
+          }),
         },
-        body: JSON.stringify({
-          fileId: embeddingFile,
-          vectorDb,
-          indexMode
-        }),
-      });
+        (job) => setStatus(`Indexing... ${formatJobProgress(job)}`)
+      );
       
-      const data = await response.json();
       setIndexingResult(data);
       setStatus('Indexing completed successfully');
     } catch (error) {
@@ -231,6 +239,23 @@ const Indexing = () => {
               </select>
             </div>
 
+            {/* Target Collection Selection (upsert) */}
+            <div>
+              <label className="block text-sm font-medium mb-1">Target Collection</label>
+              <select
+                value={targetCollection}
+                onChange={(e) => setTargetCollection(e.target.value)}
+                className="block w-full p-2 border rounded"
+              >
+                <option value="">New collection</option>
+                {collections.map(coll => (
+                  <option key={coll.id} value={coll.id}>
+                    Upsert into {coll.name}
+                  </option>
+                ))}
+              </select>
+            </div>
+
             {/* Action Buttons and Collection Management */}
             <div className="space-y-2">
               {/* Index Data Button */}
@@ -303,6 +328,12 @@ const Indexing = () => {
                     {indexingResult.processing_time && (
                       <p>Processing Time: {indexingResult.processing_time}s</p>
                     )}
+                    {indexingResult.mode === 'upsert' && (
+                      <p>Inserted: {indexingResult.inserted}, Unchanged: {indexingResult.unchanged}, Deleted: {indexingResult.deleted}</p>
+                    )}
+                    {indexingResult.insert_throughput && (
+                      <p>Insert Throughput: {indexingResult.insert_throughput.toFixed(1)} vectors/s</p>
+                    )}
                     <p>Collection Name: {indexingResult.collection_name}</p>
                   </div>
                 </div>
@@ -2,6 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import RandomImage from '../components/RandomImage';
 import { apiBaseUrl } from '../config/config';
+import { runJob, formatJobProgress } from '../utils/jobs';
 
 const LoadFile = () => {
   const [file, setFile] = useState(null);
@@ -56,17 +57,20 @@ const LoadFile = () => {
         formData.append('chunking_options', JSON.stringify(chunkingOptions));
       }
 
-      const response = await fetch(`${apiBaseUrl}/load`, {
-        method: 'POST',
-        body: formData
-      });
+      // 作为后台任务提交并轮询进度，避免大文档导致浏览器请求超时
+      const result = await runJob(
+        '/jobs/load',
+        { method: 'POST', body: formData },
+        (job) => setStatus(`Loading... ${formatJobProgress(job)}`)
+      );
 
+      const response = await fetch(`${apiBaseUrl}/documents/${result.document_name}?type=loaded`);
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
       const data = await response.json();
-      setLoadedContent(data.loaded_content);
+      setLoadedContent(data);
       setStatus('File loaded successfully!');
       fetchDocuments();
       setActiveTab('preview');
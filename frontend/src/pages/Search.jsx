@@ -15,6 +15,7 @@ const Search = () => {
   const [selectedProvider, setSelectedProvider] = useState('milvus');
   const [wordCountThreshold, setWordCountThreshold] = useState(100);
   const [saveResults, setSaveResults] = useState(false);
+  const [searchMode, setSearchMode] = useState('dense');
   const [status, setStatus] = useState('');
 
   // 加载向量数据库providers和collections
@@ -53,7 +54,8 @@ const Search = () => {
         top_k: topK,
         threshold,
         word_count_threshold: wordCountThreshold,
-        save_results: saveResults
+        save_results: saveResults,
+        mode: searchMode
       };
       
       console.log('发送搜索请求:', searchParams);
@@ -221,6 +223,18 @@ const Search = () => {
                 />
               </div>
 
+              <div>
+                <label className="block text-sm font-medium mb-1">Search Mode</label>
+                <select
+                  value={searchMode}
+                  onChange={(e) => setSearchMode(e.target.value)}
+                  className="block w-full p-2 border rounded"
+                >
+                  <option value="dense">Dense (vector)</option>
+                  <option value="hybrid">Hybrid (vector + BM25)</option>
+                </select>
+              </div>
+
               <div className="mt-4">
                 <label className="flex items-center space-x-2 cursor-pointer">
                   <input
@@ -0,0 +1,46 @@
+// src/utils/jobs.js
+import { apiBaseUrl } from '../config/config';
+
+const TERMINAL_STATUSES = ['succeeded', 'failed', 'cancelled', 'interrupted'];
+
+// 生成进度描述，例如 "embedding: 120/800 chunks (35.2/s, ETA 19s)"
+export const formatJobProgress = (job) => {
+  const progress = job.progress || {};
+  let text = `${job.stage}`;
+  if (progress.unit) {
+    text += `: ${progress.processed || 0}${progress.total ? `/${progress.total}` : ''} ${progress.unit}`;
+  }
+  if (job.throughput) {
+    text += ` (${job.throughput.toFixed(1)}/s`;
+    text += job.eta_seconds != null ? `, ETA ${Math.round(job.eta_seconds)}s)` : ')';
+  }
+  return text;
+};
+
+// 提交后台任务并轮询直到结束，成功时返回任务结果
+export const runJob = async (path, options, onProgress, intervalMs = 1000) => {
+  const response = await fetch(`${apiBaseUrl}${path}`, options);
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
+  }
+  const { job_id: jobId } = await response.json();
+
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    const jobResponse = await fetch(`${apiBaseUrl}/jobs/${jobId}`);
+    if (!jobResponse.ok) {
+      throw new Error(`HTTP error! status: ${jobResponse.status}`);
+    }
+    const job = await jobResponse.json();
+    if (onProgress) {
+      onProgress(job);
+    }
+    if (TERMINAL_STATUSES.includes(job.status)) {
+      if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Job ${job.status}`);
+      }
+      return job.result;
+    }
+  }
+};